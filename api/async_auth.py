@@ -0,0 +1,282 @@
+"""飞书异步认证模块：基于 asyncio + aiohttp 的 tenant_access_token 管理与请求"""
+
+import asyncio
+import time
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp 为可选依赖，仅异步批处理需要
+    aiohttp = None
+
+from api.auth import (
+    AUTO_REFRESH_RETRY,
+    TOKEN_INVALID_CODES,
+    TOKEN_PATH,
+    TOKEN_REFRESH_AHEAD,
+    FeishuAPIError,
+    FeishuAuth,
+    auto_refresh_delay,
+    check_api_response,
+    parse_token_response,
+)
+from api.ratelimit import RATE_LIMIT_CODE, RateLimiter
+from api.retry import RetryPolicy
+from utils.token_cache import clear_token, load_token, save_token
+
+
+class AsyncFeishuAuth:
+    """
+    飞书 API 异步认证管理器，接口与 FeishuAuth 一致，但 request() 需要 await。
+
+    单个事件循环线程内即可同时保持数百个请求在途，适合批量任务::
+
+        async with AsyncFeishuAuth(app_id, app_secret) as auth:
+            api = AsyncContactsAPI(auth)
+            results = await asyncio.gather(*(api.get_user_info(uid) for uid in ids))
+    """
+
+    BASE_URL = FeishuAuth.BASE_URL
+
+    def __init__(self, app_id: str, app_secret: str, limit: int = 100, limit_per_host: int = 0,
+                 keepalive_timeout: float = 60.0, auto_refresh: bool = False, use_token_cache: bool = True,
+                 rate_limiter: RateLimiter | None = None, retry_policy: RetryPolicy | None = None):
+        """
+        :param app_id: 应用 App ID
+        :param app_secret: 应用 App Secret
+        :param limit: 同时在途的最大连接数
+        :param limit_per_host: 每个主机的最大连接数，0 表示不单独限制
+        :param keepalive_timeout: 连接最大空闲秒数
+        :param auto_refresh: 是否在后台定时续期 token（首次获取 token 后生效）
+        :param use_token_cache: 是否与 FeishuAuth 共用本地加密 token 缓存（需要安装 cryptography）
+        :param rate_limiter: 接口频控器，默认按 DEFAULT_LIMITS 为每个接口族限流
+        :param retry_policy: 重试策略，默认 RetryPolicy()
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncFeishuAuth 需要安装 aiohttp: pip install aiohttp")
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self._token: str | None = None
+        self._token_expire: float = 0
+        self._use_token_cache = use_token_cache
+        self._token_from_cache = False
+        if use_token_cache:
+            self._token, self._token_expire = load_token(app_id, app_secret)
+            self._token_from_cache = self._token is not None
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._session = None  # 需在事件循环内创建，首次请求时初始化
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        # 正在进行的刷新任务，并发协程共同等待它（single-flight）
+        self._refresh_task: asyncio.Task | None = None
+        self._auto_refresh = auto_refresh
+        self._auto_refresh_task: asyncio.Task | None = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                keepalive_timeout=self._keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def get_tenant_access_token(self) -> str:
+        """
+        获取 tenant_access_token，带缓存，过期前自动刷新。
+
+        并发协程只会触发一次刷新请求；旧 token 仍未过期时直接返回旧 token，
+        刷新在后台完成。
+        """
+        now = time.time()
+        if self._token and now < self._token_expire - TOKEN_REFRESH_AHEAD:
+            return self._token
+
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._fetch_token())
+            # 无人等待时也要取走异常，避免 "exception was never retrieved" 警告
+            self._refresh_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        if self._token and now < self._token_expire:
+            return self._token
+        # shield：单个调用方被取消不应中断其他协程共享的刷新
+        return await asyncio.shield(self._refresh_task)
+
+    async def _fetch_token(self) -> str:
+        payload = {
+            "app_id": self.app_id,
+            "app_secret": self.app_secret,
+        }
+        async with self._get_session().post(
+            f"{self.BASE_URL}{TOKEN_PATH}", json=payload, timeout=aiohttp.ClientTimeout(total=10)
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json(content_type=None)
+
+        self._token, self._token_expire = parse_token_response(data)
+        self._token_from_cache = False
+        if self._use_token_cache:
+            try:
+                save_token(self.app_id, self.app_secret, self._token, self._token_expire)
+            except OSError:
+                pass
+        if self._auto_refresh and self._auto_refresh_task is None:
+            self._auto_refresh_task = asyncio.ensure_future(self._auto_refresh_loop())
+        return self._token
+
+    # ── 后台续期 ──────────────────────────
+
+    def start_auto_refresh(self):
+        """开启后台续期（需在事件循环内调用），在 token 进入刷新窗口前主动换新"""
+        self._auto_refresh = True
+        if self._auto_refresh_task is None or self._auto_refresh_task.done():
+            self._auto_refresh_task = asyncio.ensure_future(self._auto_refresh_loop())
+
+    def stop_auto_refresh(self):
+        """停止后台续期"""
+        self._auto_refresh = False
+        if self._auto_refresh_task is not None:
+            self._auto_refresh_task.cancel()
+            self._auto_refresh_task = None
+
+    async def _auto_refresh_loop(self):
+        delay = auto_refresh_delay(self._token_expire) if self._token else 0
+        while self._auto_refresh:
+            await asyncio.sleep(delay)
+            try:
+                # 与请求路径共用同一个刷新任务，避免重复换 token
+                if self._refresh_task is None or self._refresh_task.done():
+                    self._refresh_task = asyncio.ensure_future(self._fetch_token())
+                await asyncio.shield(self._refresh_task)
+                delay = auto_refresh_delay(self._token_expire)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                delay = AUTO_REFRESH_RETRY
+
+    async def request(self, method: str, path: str, idempotent: bool | None = None, **kwargs) -> dict:
+        """
+        统一异步请求方法，自动携带 Authorization 头，重试规则与 FeishuAuth.request 一致。
+
+        :param method: HTTP 方法 (GET, POST, PUT, DELETE, PATCH)
+        :param path: API 路径，如 /contact/v3/departments
+        :param idempotent: 是否可安全重发，默认按 HTTP 方法判断
+        :param kwargs: 传给 aiohttp 的额外参数 (params, json, data 等)
+        :return: 响应 JSON 字典
+        """
+        if idempotent is None:
+            idempotent = self.retry_policy.is_idempotent(method)
+        headers = kwargs.pop("headers", {})
+
+        attempt = 0
+        waited = 0.0
+        while True:
+            attempt += 1
+            try:
+                data = await self._send(method, path, headers, kwargs)
+                if attempt > 1:
+                    self.retry_policy.stats.record_result(success=True)
+                return data
+            except FeishuAPIError as e:
+                reason = self.retry_policy.api_error_reason(e.code, e.status_code)
+                safe = e.code == RATE_LIMIT_CODE or e.status_code == 429  # 被频控的请求未被服务端处理
+                error = e
+            except aiohttp.ClientConnectorError as e:
+                reason, safe = "connect_error", True  # 未建立连接，请求必然未送达
+                error = e
+            except asyncio.TimeoutError as e:
+                reason, safe = "timeout", False
+                error = e
+            except (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError) as e:
+                reason, safe = "connection_error", False
+                error = e
+
+            delay = self.retry_policy.retry_delay(reason, attempt, waited, idempotent, safe)
+            if delay is None:
+                if attempt > 1:
+                    self.retry_policy.stats.record_result(success=False)
+                raise error
+            self.retry_policy.stats.record_retry(reason, first=attempt == 1)
+            await asyncio.sleep(delay)
+            waited += delay
+
+    async def _send(self, method: str, path: str, headers: dict, kwargs: dict) -> dict:
+        """发送一次请求（含频控排队），返回校验通过的响应 JSON"""
+        url = f"{self.BASE_URL}{path}"
+
+        for requeue in range(self.rate_limiter.max_requeues + 1):
+            token = await self.get_tenant_access_token()
+            headers["Authorization"] = f"Bearer {token}"
+            family = await self.rate_limiter.acquire_async(method, path)
+
+            async with self._get_session().request(
+                method, url, headers=headers, timeout=aiohttp.ClientTimeout(total=15), **kwargs
+            ) as resp:
+                text = await resp.text()
+                # 尝试解析响应体，即使 HTTP 状态码非 200
+                try:
+                    data = await resp.json(content_type=None)
+                except Exception:
+                    data = None
+                if not isinstance(data, dict):
+                    data = None
+
+            # 被频控的请求服务端并未处理，重新排队等待令牌后重发
+            limited = self.rate_limiter.feedback(family, resp.status, resp.headers, data)
+            if not limited or requeue == self.rate_limiter.max_requeues:
+                break
+
+        if data is None and resp.status < 500:
+            resp.raise_for_status()
+            raise Exception(f"无法解析响应: {text[:500]}")
+
+        if data is not None and data.get("code") in TOKEN_INVALID_CODES and self._discard_cached_token(token):
+            return await self._send(method, path, headers, kwargs)
+
+        return check_api_response(data, resp.status, text)
+
+    def get_retry_stats(self) -> dict:
+        """返回重试统计：重试次数、重试后成功/放弃的请求数、按原因分类的次数"""
+        return self.retry_policy.stats.snapshot()
+
+    def _discard_cached_token(self, token: str) -> bool:
+        """仅当失效的是本地缓存读出的 token 才丢弃并允许重试"""
+        if token != self._token:
+            return True
+        if not self._token_from_cache:
+            return False
+        self._token = None
+        self._token_expire = 0
+        self._token_from_cache = False
+        try:
+            clear_token(self.app_id)
+        except OSError:
+            pass
+        return True
+
+    async def get_bot_info(self) -> dict:
+        """获取机器人信息，包括应用名称、头像等"""
+        data = await self.request("GET", "/bot/v3/info")
+        return data.get("bot", {})
+
+    async def verify(self) -> bool:
+        """验证凭证是否有效，成功返回 True"""
+        try:
+            await self.get_tenant_access_token()
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        """停止后台续期并关闭底层连接池"""
+        self.stop_auto_refresh()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -1,76 +1,294 @@
 """飞书认证模块：管理 tenant_access_token 的获取和刷新"""
 
+import threading
 import time
+
 import requests
 
+from api.http_pool import PoolStats, create_session
+from api.ratelimit import RATE_LIMIT_CODE, RateLimiter
+from api.retry import RetryPolicy
+from utils.token_cache import clear_token, load_token, save_token
+
+TOKEN_PATH = "/auth/v3/tenant_access_token/internal"
+TOKEN_REFRESH_AHEAD = 300  # 距过期不足 5 分钟即视为需要刷新
+AUTO_REFRESH_LEAD = 60  # 后台续期比刷新窗口再提前 1 分钟，请求线程不会撞上刷新
+AUTO_REFRESH_RETRY = 30  # 后台续期失败后的重试间隔（秒）
+TOKEN_INVALID_CODES = (99991663,)  # token 已失效（如 App Secret 被重置）
+
+
+def auto_refresh_delay(token_expire: float) -> float:
+    """计算距离下一次后台续期的秒数"""
+    return max(token_expire - TOKEN_REFRESH_AHEAD - AUTO_REFRESH_LEAD - time.time(), 0)
+
+
+def parse_token_response(data: dict) -> tuple[str, float]:
+    """解析获取 token 接口的响应，返回 (token, 过期时间戳)"""
+    if data.get("code") != 0:
+        raise Exception(f"获取 token 失败: {data.get('msg', '未知错误')}")
+    # expire 单位是秒
+    return data["tenant_access_token"], time.time() + data.get("expire", 7200)
+
+
+class FeishuAPIError(Exception):
+    """飞书接口返回的错误，携带错误码与 HTTP 状态码，供重试策略判断"""
+
+    def __init__(self, message: str, code: int | None = None, status_code: int = 0):
+        super().__init__(message)
+        self.code = code
+        self.status_code = status_code
+
+
+def check_api_response(data: dict | None, status_code: int, text: str) -> dict:
+    """
+    飞书 API 统一错误检查（同步与异步客户端共用）
+
+    :param data: 已解析的响应 JSON，解析失败传 None（仅 5xx 会走到这里）
+    :param status_code: HTTP 状态码
+    :param text: 原始响应文本，用于错误信息
+    :return: 校验通过的响应 JSON
+    """
+    if data is None:
+        raise FeishuAPIError(f"HTTP {status_code}: {text[:500]}", status_code=status_code)
+
+    code = data.get("code")
+    if code is not None and code != 0:
+        raise FeishuAPIError(
+            f"API 错误 [{code}]: {data.get('msg', '未知错误')}", code=code, status_code=status_code
+        )
+
+    # 如果没有 code 字段但 HTTP 状态码异常
+    if status_code >= 400 and code is None:
+        raise FeishuAPIError(f"HTTP {status_code}: {text[:500]}", status_code=status_code)
+
+    return data
+
 
 class FeishuAuth:
     """飞书 API 认证管理器"""
 
     BASE_URL = "https://open.feishu.cn/open-apis"
 
-    def __init__(self, app_id: str, app_secret: str):
+    def __init__(self, app_id: str, app_secret: str, pool_connections: int = 10,
+                 pool_maxsize: int = 20, keepalive_timeout: float = 60.0, auto_refresh: bool = False,
+                 use_token_cache: bool = True, rate_limiter: RateLimiter | None = None,
+                 retry_policy: RetryPolicy | None = None):
+        """
+        :param app_id: 应用 App ID
+        :param app_secret: 应用 App Secret
+        :param pool_connections: 连接池缓存的主机数量
+        :param pool_maxsize: 每个主机的最大 keep-alive 连接数（并发 worker 较多时调大）
+        :param keepalive_timeout: 连接最大空闲秒数，超过后重新建连
+        :param auto_refresh: 是否在后台定时续期 token（首次获取 token 后生效）
+        :param use_token_cache: 是否把 token 加密缓存到本地，下次启动直接复用（需要安装 cryptography）
+        :param rate_limiter: 接口频控器，默认按 DEFAULT_LIMITS 为每个接口族限流
+        :param retry_policy: 重试策略，默认 RetryPolicy()；传 RetryPolicy(max_attempts=1) 关闭重试
+        """
         self.app_id = app_id
         self.app_secret = app_secret
         self._token: str | None = None
         self._token_expire: float = 0  # token 过期的时间戳
+        self._use_token_cache = use_token_cache
+        self._token_from_cache = False
+        if use_token_cache:
+            self._token, self._token_expire = load_token(app_id, app_secret)
+            self._token_from_cache = self._token is not None
+        # 同一时刻只允许一个线程去换 token，其余线程等待它的结果
+        self._token_lock = threading.Lock()
+        self._auto_refresh = auto_refresh
+        self._refresh_timer: threading.Timer | None = None
+        self._timer_lock = threading.Lock()
+        # 飞书按应用维度频控，所有 API 类经同一个 auth 发请求，共用这一个限流器
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        # 所有 API 类共用同一个 auth 实例，也就共用这一个连接池
+        self.pool_stats = PoolStats()
+        self.session = create_session(
+            self.pool_stats, pool_connections, pool_maxsize, keepalive_timeout
+        )
+
+    def _token_fresh(self) -> bool:
+        """token 存在且未进入刷新窗口"""
+        return bool(self._token) and time.time() < self._token_expire - TOKEN_REFRESH_AHEAD
+
+    def _token_usable(self) -> bool:
+        """token 存在且尚未真正过期（刷新窗口内仍可使用）"""
+        return bool(self._token) and time.time() < self._token_expire
 
     def get_tenant_access_token(self) -> str:
-        """获取 tenant_access_token，带缓存，过期前自动刷新"""
+        """
+        获取 tenant_access_token，带缓存，过期前自动刷新。
+
+        多线程同时进入刷新窗口时只有一个线程发起请求（single-flight）；
+        旧 token 仍未过期时其余线程直接沿用旧 token，不排队等待。
+        """
         # 提前 5 分钟刷新 token
-        if self._token and time.time() < self._token_expire - 300:
+        if self._token_fresh():
+            return self._token
+
+        if not self._token_lock.acquire(blocking=not self._token_usable()):
+            return self._token  # 其他线程正在刷新，旧 token 仍有效
+        try:
+            # 等锁期间可能已被其他线程刷新
+            if not self._token_fresh():
+                self._fetch_token()
             return self._token
+        finally:
+            self._token_lock.release()
 
-        url = f"{self.BASE_URL}/auth/v3/tenant_access_token/internal"
+    def _fetch_token(self):
+        """请求新的 token，调用方需持有 _token_lock"""
+        url = f"{self.BASE_URL}{TOKEN_PATH}"
         payload = {
             "app_id": self.app_id,
             "app_secret": self.app_secret,
         }
-        resp = requests.post(url, json=payload, timeout=10)
+        resp = self.session.post(url, json=payload, timeout=10)
         resp.raise_for_status()
-        data = resp.json()
+        self._token, self._token_expire = parse_token_response(resp.json())
+        self._token_from_cache = False
+        if self._use_token_cache:
+            try:
+                save_token(self.app_id, self.app_secret, self._token, self._token_expire)
+            except OSError:
+                pass  # 缓存写不进去不影响正常使用
+        self._schedule_auto_refresh(auto_refresh_delay(self._token_expire))
+
+    def _discard_cached_token(self, token: str) -> bool:
+        """
+        请求返回 token 失效时调用：仅当失效的是本地缓存读出的 token 才丢弃并允许重试
+
+        :return: 是否应使用新 token 重试
+        """
+        with self._token_lock:
+            if token != self._token:
+                return True  # 其他线程已经换了新 token
+            if not self._token_from_cache:
+                return False
+            self._token = None
+            self._token_expire = 0
+            self._token_from_cache = False
+        try:
+            clear_token(self.app_id)
+        except OSError:
+            pass
+        return True
+
+    # ── 后台续期 ──────────────────────────
+
+    def start_auto_refresh(self):
+        """开启后台续期：在 token 进入刷新窗口前主动换新，请求线程无需等待"""
+        self._auto_refresh = True
+        self._schedule_auto_refresh(auto_refresh_delay(self._token_expire) if self._token else 0)
 
-        if data.get("code") != 0:
-            raise Exception(f"获取 token 失败: {data.get('msg', '未知错误')}")
+    def stop_auto_refresh(self):
+        """停止后台续期"""
+        self._auto_refresh = False
+        with self._timer_lock:
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
 
-        self._token = data["tenant_access_token"]
-        # expire 单位是秒
-        self._token_expire = time.time() + data.get("expire", 7200)
-        return self._token
+    def _schedule_auto_refresh(self, delay: float):
+        if not self._auto_refresh:
+            return
+        with self._timer_lock:
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+            self._refresh_timer = threading.Timer(delay, self._on_auto_refresh)
+            self._refresh_timer.daemon = True
+            self._refresh_timer.start()
+
+    def _on_auto_refresh(self):
+        try:
+            with self._token_lock:
+                self._fetch_token()  # 成功后会自动安排下一次续期
+        except Exception:
+            # 网络抖动等情况稍后重试，旧 token 在过期前仍可使用
+            self._schedule_auto_refresh(AUTO_REFRESH_RETRY)
 
-    def request(self, method: str, path: str, **kwargs) -> dict:
+    def request(self, method: str, path: str, idempotent: bool | None = None, **kwargs) -> dict:
         """
         统一请求方法，自动携带 Authorization 头。
 
+        临时性错误（5xx、连接中断、可重试错误码）按 retry_policy 自动重试，
+        但只重试幂等请求；POST 等请求确认只读或自带去重键时可传 idempotent=True。
+
         :param method: HTTP 方法 (GET, POST, PUT, DELETE, PATCH)
         :param path: API 路径，如 /contact/v3/departments
+        :param idempotent: 是否可安全重发，默认按 HTTP 方法判断
         :param kwargs: 传给 requests 的额外参数 (params, json, data 等)
         :return: 响应 JSON 字典
         """
-        token = self.get_tenant_access_token()
-        url = f"{self.BASE_URL}{path}"
+        if idempotent is None:
+            idempotent = self.retry_policy.is_idempotent(method)
         headers = kwargs.pop("headers", {})
-        headers["Authorization"] = f"Bearer {token}"
 
-        resp = requests.request(method, url, headers=headers, timeout=15, **kwargs)
+        attempt = 0
+        waited = 0.0
+        while True:
+            attempt += 1
+            try:
+                data = self._send(method, path, headers, kwargs)
+                if attempt > 1:
+                    self.retry_policy.stats.record_result(success=True)
+                return data
+            except FeishuAPIError as e:
+                reason = self.retry_policy.api_error_reason(e.code, e.status_code)
+                safe = e.code == RATE_LIMIT_CODE or e.status_code == 429  # 被频控的请求未被服务端处理
+                error = e
+            except requests.ConnectTimeout as e:
+                reason, safe = "connect_timeout", True  # 未建立连接，请求必然未送达
+                error = e
+            except requests.Timeout as e:
+                reason, safe = "timeout", False
+                error = e
+            except requests.ConnectionError as e:
+                reason, safe = "connection_error", False
+                error = e
 
-        # 尝试解析响应体，即使 HTTP 状态码非 200
-        try:
-            data = resp.json()
-        except Exception:
+            delay = self.retry_policy.retry_delay(reason, attempt, waited, idempotent, safe)
+            if delay is None:
+                if attempt > 1:
+                    self.retry_policy.stats.record_result(success=False)
+                raise error
+            self.retry_policy.stats.record_retry(reason, first=attempt == 1)
+            time.sleep(delay)
+            waited += delay
+
+    def _send(self, method: str, path: str, headers: dict, kwargs: dict) -> dict:
+        """发送一次请求（含频控排队），返回校验通过的响应 JSON"""
+        url = f"{self.BASE_URL}{path}"
+
+        for requeue in range(self.rate_limiter.max_requeues + 1):
+            token = self.get_tenant_access_token()
+            headers["Authorization"] = f"Bearer {token}"
+            family = self.rate_limiter.acquire(method, path)
+            resp = self.session.request(method, url, headers=headers, timeout=15, **kwargs)
+
+            # 尝试解析响应体，即使 HTTP 状态码非 200
+            try:
+                data = resp.json()
+            except Exception:
+                data = None
+
+            # 被频控的请求服务端并未处理，重新排队等待令牌后重发
+            limited = self.rate_limiter.feedback(family, resp.status_code, resp.headers, data)
+            if not limited or requeue == self.rate_limiter.max_requeues:
+                break
+
+        if data is None and resp.status_code < 500:
             resp.raise_for_status()
             raise Exception(f"无法解析响应: {resp.text[:500]}")
 
-        # 飞书 API 统一错误码检查
-        code = data.get("code")
-        if code is not None and code != 0:
-            raise Exception(f"API 错误 [{code}]: {data.get('msg', '未知错误')}")
+        if data is not None and data.get("code") in TOKEN_INVALID_CODES and self._discard_cached_token(token):
+            return self._send(method, path, headers, kwargs)
 
-        # 如果没有 code 字段但 HTTP 状态码异常
-        if not resp.ok and code is None:
-            raise Exception(f"HTTP {resp.status_code}: {resp.text[:500]}")
+        return check_api_response(data, resp.status_code, resp.text)
 
-        return data
+    def get_retry_stats(self) -> dict:
+        """返回重试统计：重试次数、重试后成功/放弃的请求数、按原因分类的次数"""
+        return self.retry_policy.stats.snapshot()
 
     def get_bot_info(self) -> dict:
         """
@@ -81,6 +299,15 @@ class FeishuAuth:
         data = self.request("GET", "/bot/v3/info")
         return data.get("bot", {})
 
+    def get_pool_stats(self) -> dict:
+        """返回连接池统计：新建连接数、复用连接数、复用率等"""
+        return self.pool_stats.snapshot()
+
+    def close(self):
+        """停止后台续期并关闭连接池中的所有连接"""
+        self.stop_auto_refresh()
+        self.session.close()
+
     def verify(self) -> bool:
         """验证凭证是否有效，成功返回 True"""
         try:
@@ -1,6 +1,8 @@
 """飞书多维表格 (Bitable) API 封装"""
 
 from api.auth import FeishuAuth
+from api.async_auth import AsyncFeishuAuth
+from api.paginator import acollect, apaginate, paginate
 
 
 class BitableAPI:
@@ -158,19 +160,10 @@ class BitableAPI:
         :param max_count: 最大获取条数
         :return: 记录列表
         """
-        all_records = []
-        page_token = ""
-
-        while len(all_records) < max_count:
-            data = self.list_records(app_token, table_id, page_size=500, page_token=page_token)
-            items = data.get("data", {}).get("items", [])
-            all_records.extend(items)
-
-            if not data.get("data", {}).get("has_more", False):
-                break
-            page_token = data.get("data", {}).get("page_token", "")
-
-        return all_records[:max_count]
+        return list(paginate(
+            lambda page_token: self.list_records(app_token, table_id, page_size=500, page_token=page_token),
+            max_count=max_count,
+        ))
 
     def get_record(self, app_token: str, table_id: str, record_id: str) -> dict:
         """
@@ -280,3 +273,21 @@ class BitableAPI:
             f"/bitable/v1/apps/{app_token}/tables/{table_id}/records/batch_delete",
             json=payload,
         )
+
+
+class AsyncBitableAPI(BitableAPI):
+    """
+    多维表格接口的异步版本，需配合 AsyncFeishuAuth 使用。
+
+    单次请求的方法直接复用 BitableAPI（返回值需 await），这里只重写自动分页方法。
+    """
+
+    def __init__(self, auth: AsyncFeishuAuth):
+        super().__init__(auth)
+
+    async def get_all_records(self, app_token: str, table_id: str, max_count: int = 5000) -> list[dict]:
+        """获取所有记录（自动分页）"""
+        return await acollect(apaginate(
+            lambda page_token: self.list_records(app_token, table_id, page_size=500, page_token=page_token),
+            max_count=max_count,
+        ))
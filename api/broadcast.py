@@ -0,0 +1,174 @@
+"""群发消息：向大量用户/群/部门发送同一条消息，并发执行、逐个记录结果、可中断后继续"""
+
+import json
+from typing import Callable
+from uuid import uuid4
+
+from api.contacts import ContactsAPI
+from api.jobs import JOB_WORKERS, STATUS_FAILED, STATUS_OK, JobJournal, JobRunner, new_job_path
+from api.messages import MessagesAPI, message_uuid
+
+BROADCAST_JOB = "broadcast"
+BATCH_SEND_LIMIT = 200  # /message/v4/batch_send/ 每次最多 200 个 open_id 或部门
+BATCH_SEND_TYPES = ("text", "post", "image", "share_chat", "interactive")
+
+
+class Broadcaster:
+    """
+    群发任务
+
+    - 用户 open_id 与部门在 use_batch=True 时走批量发送接口，每 200 个一批；
+    - 邮箱、群以及 use_batch=False 时的用户逐个调用发送消息接口；
+    - 部门在 use_batch=False 时先展开为成员 open_id（需要 contacts_api）。
+
+    每个条目的结果写入 jobs/ 下的任务日志，进程中断后用 resume() 继续未完成的部分。
+    逐个发送的消息带由任务和接收者决定的 uuid，恢复时不会重复送达；批量发送接口不支持去重键::
+
+        broadcaster = Broadcaster(messages_api, contacts_api)
+        journal = broadcaster.create_job("text", {"text": "通知"}, open_ids=ids, department_ids=depts)
+        report = broadcaster.run(journal)
+        print(report["succeeded"], report["failed"], report["recipients"])
+    """
+
+    def __init__(self, messages_api: MessagesAPI, contacts_api: ContactsAPI | None = None,
+                 max_workers: int = JOB_WORKERS):
+        """
+        :param messages_api: 消息接口
+        :param contacts_api: 联系人接口，仅逐个发送部门成员时需要
+        :param max_workers: 同时发送的请求数，实际速率由 auth 的频控器控制
+        """
+        self.messages_api = messages_api
+        self.contacts_api = contacts_api
+        self.max_workers = max_workers
+        self._runner: JobRunner | None = None
+
+    def create_job(self, msg_type: str, content: dict, open_ids: list[str] = (), emails: list[str] = (),
+                   chat_ids: list[str] = (), department_ids: list[str] = (), use_batch: bool = True,
+                   path: str | None = None) -> JobJournal:
+        """
+        创建群发任务（只写任务日志，不发送）
+
+        :param msg_type: 消息类型 (text / post / interactive 等)
+        :param content: 消息内容字典，如 {"text": "..."}、post 富文本、卡片
+        :param open_ids: 接收用户 open_id
+        :param emails: 接收用户邮箱
+        :param chat_ids: 接收群 chat_id
+        :param department_ids: 接收部门 ID（发给部门下所有成员）
+        :param use_batch: 符合条件时使用批量发送接口
+        :param path: 任务日志路径，默认在 jobs/ 下新建
+        :return: 任务日志
+        """
+        use_batch = use_batch and msg_type in BATCH_SEND_TYPES
+        open_ids = list(dict.fromkeys(open_ids))
+        department_ids = list(dict.fromkeys(department_ids))
+        if department_ids and not use_batch:
+            if self.contacts_api is None:
+                raise Exception("逐个发送部门成员需要提供 contacts_api")
+            for dept_id in department_ids:
+                open_ids.extend(user["open_id"] for user in self.contacts_api.get_all_department_users(dept_id))
+            open_ids = list(dict.fromkeys(open_ids))
+            department_ids = []
+
+        items = []
+        if use_batch:
+            for i in range(0, len(open_ids), BATCH_SEND_LIMIT):
+                items.append({"key": f"batch:open_id:{i}", "open_ids": open_ids[i:i + BATCH_SEND_LIMIT]})
+            for i in range(0, len(department_ids), BATCH_SEND_LIMIT):
+                items.append({"key": f"batch:department:{i}", "department_ids": department_ids[i:i + BATCH_SEND_LIMIT]})
+        else:
+            items.extend(_single_item("open_id", open_id) for open_id in open_ids)
+        items.extend(_single_item("email", email) for email in dict.fromkeys(emails))
+        items.extend(_single_item("chat_id", chat_id) for chat_id in dict.fromkeys(chat_ids))
+
+        job = {"kind": BROADCAST_JOB, "id": uuid4().hex, "msg_type": msg_type, "content": content}
+        return JobJournal.create(path or new_job_path(BROADCAST_JOB), job, items)
+
+    def run(self, journal: JobJournal, on_progress: Callable[[int, int, str, dict], None] | None = None,
+            retry_failed: bool = False) -> dict:
+        """
+        执行任务中尚未完成的条目
+
+        :param journal: create_job 或 JobJournal.load 得到的任务日志
+        :param on_progress: 进度回调 (已完成数, 本次总数, 条目 key, 结果)
+        :param retry_failed: 是否重试之前失败的条目
+        :return: 任务报告，另含 "recipients": {接收者: 结果}
+        """
+        job = journal.job
+        if job.get("kind") != BROADCAST_JOB:
+            raise Exception(f"不是群发任务: {journal.path}")
+
+        job_id = job.get("id") or journal.path
+
+        def send(item: dict) -> dict:
+            return self._send_item(job_id, job["msg_type"], job["content"], item)
+
+        self._runner = JobRunner(send, self.max_workers, on_progress)
+        report = self._runner.run(journal, retry_failed)
+        report["recipients"] = recipient_results(journal)
+        return report
+
+    def resume(self, path: str, on_progress: Callable[[int, int, str, dict], None] | None = None,
+               retry_failed: bool = False) -> dict:
+        """从任务日志继续执行中断的群发任务"""
+        journal = JobJournal.load(path)
+        try:
+            return self.run(journal, on_progress, retry_failed)
+        finally:
+            journal.close()
+
+    def cancel(self):
+        """停止发送尚未开始的条目（可稍后 resume）"""
+        if self._runner is not None:
+            self._runner.cancel()
+
+    def _send_item(self, job_id: str, msg_type: str, content: dict, item: dict) -> dict:
+        if "receive_id" in item:
+            # 去重键由任务与条目决定，恢复任务时重发中断前在途的条目不会重复送达
+            result = self.messages_api.send_message(
+                item["receive_id"], msg_type, json.dumps(content), item["receive_id_type"],
+                uuid=message_uuid(job_id, item["key"]),
+            )
+            return {"message_id": result.get("data", {}).get("message_id", "")}
+
+        result = self.messages_api.batch_send_message(
+            msg_type, content, open_ids=item.get("open_ids"), department_ids=item.get("department_ids")
+        )
+        data = result.get("data", {})
+        return {
+            "message_id": data.get("message_id", ""),
+            "invalid": data.get("invalid_open_ids", []) + data.get("invalid_department_ids", []),
+        }
+
+
+def _single_item(receive_id_type: str, receive_id: str) -> dict:
+    return {"key": f"{receive_id_type}:{receive_id}", "receive_id": receive_id, "receive_id_type": receive_id_type}
+
+
+def recipient_results(journal: JobJournal) -> dict[str, dict]:
+    """
+    把条目结果展开为每个接收者的结果
+
+    :return: {"open_id:ou_xxx" / "department:od_xxx" / "email:..." / "chat_id:...": {"status", "message_id" | "error"}}
+    """
+    recipients = {}
+    for item in journal.items:
+        result = journal.results.get(item["key"])
+        if "receive_id" in item:
+            recipients[item["key"]] = _recipient_result(result)
+            continue
+        invalid = set((result or {}).get("invalid", []))
+        for kind, ids in (("open_id", item.get("open_ids", [])), ("department", item.get("department_ids", []))):
+            for receive_id in ids:
+                if result and result.get("status") == STATUS_OK and receive_id in invalid:
+                    recipients[f"{kind}:{receive_id}"] = {"status": STATUS_FAILED, "error": "无效的接收者 ID"}
+                else:
+                    recipients[f"{kind}:{receive_id}"] = _recipient_result(result)
+    return recipients
+
+
+def _recipient_result(result: dict | None) -> dict:
+    if result is None:
+        return {"status": "pending"}
+    if result.get("status") == STATUS_OK:
+        return {"status": STATUS_OK, "message_id": result.get("message_id", "")}
+    return {"status": STATUS_FAILED, "error": result.get("error", "")}
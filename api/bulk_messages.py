@@ -0,0 +1,142 @@
+"""批量撤回与批量回复：对大量 message_id 并发执行，逐条记录结果，可中断后继续"""
+
+import json
+from typing import Callable
+from uuid import uuid4
+
+from api.auth import FeishuAPIError
+from api.broadcast import BROADCAST_JOB
+from api.jobs import JOB_WORKERS, STATUS_OK, JobJournal, JobRunner, new_job_path
+from api.messages import MessagesAPI, message_uuid
+
+RECALL_JOB = "recall"
+REPLY_JOB = "reply"
+ALREADY_RECALLED_CODE = 230011  # 消息已被撤回
+
+
+def is_batch_message_id(message_id: str) -> bool:
+    """是否为批量发送接口返回的批量消息 ID（bm_ 开头）"""
+    return message_id.startswith("bm_")
+
+
+def broadcast_message_ids(journal: JobJournal) -> list[str]:
+    """
+    群发任务中已发出的消息 ID（逐个发送的消息与批量消息），用于批量撤回
+
+    :param journal: 群发任务日志
+    :return: 去重后的消息 ID 列表
+    """
+    if journal.job.get("kind") != BROADCAST_JOB:
+        raise Exception(f"不是群发任务: {journal.path}")
+    ids = (result.get("message_id") for result in journal.results.values() if result.get("status") == STATUS_OK)
+    return list(dict.fromkeys(message_id for message_id in ids if message_id))
+
+
+class BulkMessageOps:
+    """
+    批量撤回 / 批量回复
+
+    与群发任务一样，每个 message_id 作为一个条目写入 jobs/ 下的任务日志，
+    并发执行（速率由 auth 的频控器按接口族控制），逐条记录结果，中断后 resume() 继续。
+    回复带由任务和原消息决定的 uuid，恢复任务时不会重复回复；已被撤回的消息视为撤回成功::
+
+        ops = BulkMessageOps(messages_api)
+        with JobJournal.load(path) as broadcast:
+            message_ids = broadcast_message_ids(broadcast)
+        with ops.create_recall_job(message_ids) as journal:
+            report = ops.run(journal)
+        print(report["succeeded"], report["failed"], report["elapsed"])
+    """
+
+    def __init__(self, messages_api: MessagesAPI, max_workers: int = JOB_WORKERS):
+        """
+        :param messages_api: 消息接口
+        :param max_workers: 同时执行的请求数，实际速率由 auth 的频控器控制
+        """
+        self.messages_api = messages_api
+        self.max_workers = max_workers
+        self._runner: JobRunner | None = None
+
+    def create_recall_job(self, message_ids: list[str], path: str | None = None) -> JobJournal:
+        """
+        创建批量撤回任务（只写任务日志，不执行）
+
+        :param message_ids: 要撤回的消息 ID，可包含批量消息 ID（bm_ 开头）
+        :param path: 任务日志路径，默认在 jobs/ 下新建
+        :return: 任务日志
+        """
+        items = [{"key": message_id, "message_id": message_id} for message_id in dict.fromkeys(message_ids)]
+        job = {"kind": RECALL_JOB, "id": uuid4().hex}
+        return JobJournal.create(path or new_job_path(RECALL_JOB), job, items)
+
+    def create_reply_job(self, message_ids: list[str], msg_type: str, content: dict,
+                         path: str | None = None) -> JobJournal:
+        """
+        创建批量回复任务：对每条消息回复同样的内容（只写任务日志，不执行）
+
+        :param message_ids: 要回复的消息 ID
+        :param msg_type: 消息类型 (text / post / interactive)
+        :param content: 消息内容字典，如 {"text": "..."}
+        :param path: 任务日志路径，默认在 jobs/ 下新建
+        :return: 任务日志
+        """
+        items = [{"key": message_id, "message_id": message_id} for message_id in dict.fromkeys(message_ids)]
+        job = {"kind": REPLY_JOB, "id": uuid4().hex, "msg_type": msg_type, "content": content}
+        return JobJournal.create(path or new_job_path(REPLY_JOB), job, items)
+
+    def run(self, journal: JobJournal, on_progress: Callable[[int, int, str, dict], None] | None = None,
+            retry_failed: bool = False) -> dict:
+        """
+        执行任务中尚未完成的条目
+
+        :param journal: create_*_job 或 JobJournal.load 得到的任务日志
+        :param on_progress: 进度回调 (已完成数, 本次总数, 条目 key, 结果)
+        :param retry_failed: 是否重试之前失败的条目
+        :return: 任务报告，见 job_report
+        """
+        job = journal.job
+        if job.get("kind") == RECALL_JOB:
+            handler = self._recall_item
+        elif job.get("kind") == REPLY_JOB:
+            job_id = job.get("id") or journal.path
+            content = json.dumps(job["content"])
+
+            def handler(item: dict) -> dict:
+                return self._reply_item(job_id, job["msg_type"], content, item)
+        else:
+            raise Exception(f"不是批量撤回或回复任务: {journal.path}")
+
+        self._runner = JobRunner(handler, self.max_workers, on_progress)
+        return self._runner.run(journal, retry_failed)
+
+    def resume(self, path: str, on_progress: Callable[[int, int, str, dict], None] | None = None,
+               retry_failed: bool = False) -> dict:
+        """从任务日志继续执行中断的任务"""
+        with JobJournal.load(path) as journal:
+            return self.run(journal, on_progress, retry_failed)
+
+    def cancel(self):
+        """停止尚未开始的条目（可稍后 resume）"""
+        if self._runner is not None:
+            self._runner.cancel()
+
+    def _recall_item(self, item: dict) -> dict:
+        message_id = item["message_id"]
+        try:
+            if is_batch_message_id(message_id):
+                self.messages_api.recall_batch_message(message_id)
+            else:
+                self.messages_api.delete_message(message_id)
+        except FeishuAPIError as e:
+            # 之前撤回过（或中断前已撤回但没来得及记录）
+            if e.code == ALREADY_RECALLED_CODE:
+                return {"already_recalled": True}
+            raise
+        return {}
+
+    def _reply_item(self, job_id: str, msg_type: str, content: str, item: dict) -> dict:
+        # 去重键由任务与原消息决定，恢复任务时重发中断前在途的回复不会重复送达
+        result = self.messages_api.reply_message(
+            item["message_id"], msg_type, content, uuid=message_uuid(job_id, item["key"])
+        )
+        return {"reply_message_id": result.get("data", {}).get("message_id", "")}
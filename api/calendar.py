@@ -1,7 +1,10 @@
 """飞书日历 (Calendar) API 封装"""
 
+import asyncio
 from datetime import datetime, timezone, timedelta
 from api.auth import FeishuAuth
+from api.async_auth import AsyncFeishuAuth
+from api.paginator import acollect, apaginate, paginate
 
 
 class CalendarAPI:
@@ -32,21 +35,7 @@ class CalendarAPI:
 
         :return: 日历列表
         """
-        all_calendars = []
-        page_token = ""
-
-        while True:
-            data = self.list_calendars(page_token=page_token)
-            items = data.get("data", {}).get("calendar_list", [])
-            all_calendars.extend(items)
-
-            if not data.get("data", {}).get("has_more", False):
-                break
-            page_token = data.get("data", {}).get("page_token", "")
-            if not page_token:
-                break
-
-        return all_calendars
+        return list(paginate(lambda page_token: self.list_calendars(page_token=page_token), "calendar_list"))
 
     def get_primary_calendar_id(self) -> str:
         """获取主日历 ID"""
@@ -139,24 +128,10 @@ class CalendarAPI:
         if not calendar_id:
             calendar_id = self.get_primary_calendar_id()
 
-        event_data = {
-            "summary": summary,
-            "description": description,
-            "need_notification": True,
-            "start_time": {"timestamp": str(start_time)},
-            "end_time": {"timestamp": str(end_time)},
-            "visibility": "default",
-            "attendee_ability": "can_modify_event",
-            "free_busy_status": "busy",
-        }
-
-        if with_video:
-            event_data["vchat"] = {"vc_type": "vc"}
-
         result = self.auth.request(
             "POST",
             f"/calendar/v4/calendars/{calendar_id}/events",
-            json=event_data,
+            json=self._build_event_data(summary, start_time, end_time, description, with_video),
             params={"user_id_type": "open_id"},
         )
 
@@ -170,6 +145,25 @@ class CalendarAPI:
 
         return result
 
+    @staticmethod
+    def _build_event_data(summary: str, start_time: str, end_time: str,
+                          description: str = "", with_video: bool = False) -> dict:
+        """构建创建日程的请求体"""
+        event_data = {
+            "summary": summary,
+            "description": description,
+            "need_notification": True,
+            "start_time": {"timestamp": str(start_time)},
+            "end_time": {"timestamp": str(end_time)},
+            "visibility": "default",
+            "attendee_ability": "can_modify_event",
+            "free_busy_status": "busy",
+        }
+
+        if with_video:
+            event_data["vchat"] = {"vc_type": "vc"}
+        return event_data
+
     def update_event(self, event_id: str, calendar_id: str = "", **kwargs) -> dict:
         """
         更新日程
@@ -266,6 +260,7 @@ class CalendarAPI:
             "/calendar/v4/freebusy/list",
             json=payload,
             params={"user_id_type": "open_id"},
+            idempotent=True,  # 只读查询
         )
 
     def find_free_slots(
@@ -298,6 +293,25 @@ class CalendarAPI:
             except Exception:
                 pass
 
+        return self._compute_free_slots(all_busy, start_hour, end_hour, duration_minutes)
+
+    @staticmethod
+    def _compute_free_slots(
+        all_busy: list[tuple[str, str]],
+        start_hour: int,
+        end_hour: int,
+        duration_minutes: int,
+    ) -> list[dict]:
+        """
+        根据忙碌区间计算空闲时段
+
+        :param all_busy: 忙碌区间列表 [(start_time, end_time)]，RFC 3339 格式
+        :param start_hour: 起始小时 (24h)
+        :param end_hour: 结束小时 (24h)
+        :param duration_minutes: 所需空闲时长（分钟）
+        :return: 空闲时段列表
+        """
+
         def _time_to_minutes(t: str) -> int:
             return int(t[11:13]) * 60 + int(t[14:16])
 
@@ -339,3 +353,122 @@ class CalendarAPI:
                 })
 
         return free_slots
+
+
+class AsyncCalendarAPI(CalendarAPI):
+    """
+    日历接口的异步版本，需配合 AsyncFeishuAuth 使用。
+
+    请求构建复用 CalendarAPI（返回值需 await）；需要先解析主日历 ID 的方法在这里
+    先 await 出 calendar_id 再交给父类构建请求。
+    """
+
+    def __init__(self, auth: AsyncFeishuAuth):
+        super().__init__(auth)
+
+    async def get_all_calendars(self) -> list[dict]:
+        """获取所有日历（自动分页）"""
+        return await acollect(apaginate(lambda page_token: self.list_calendars(page_token=page_token), "calendar_list"))
+
+    async def get_primary_calendar_id(self) -> str:
+        """获取主日历 ID"""
+        if self._calendar_id:
+            return self._calendar_id
+
+        calendars = await self.get_all_calendars()
+        for cal in calendars:
+            if cal.get("type") == "primary":
+                self._calendar_id = cal["calendar_id"]
+                return self._calendar_id
+
+        raise Exception("找不到主日历")
+
+    async def _resolve_calendar_id(self, calendar_id: str) -> str:
+        return calendar_id or await self.get_primary_calendar_id()
+
+    async def list_events(
+        self,
+        calendar_id: str = "",
+        start_time: str = "",
+        end_time: str = "",
+        page_token: str = "",
+        page_size: int = 50,
+    ) -> dict:
+        """获取日程列表，calendar_id 为空则使用主日历"""
+        calendar_id = await self._resolve_calendar_id(calendar_id)
+        return await super().list_events(calendar_id, start_time, end_time, page_token, page_size)
+
+    async def get_event(self, event_id: str, calendar_id: str = "") -> dict:
+        """获取单个日程详情"""
+        calendar_id = await self._resolve_calendar_id(calendar_id)
+        return await super().get_event(event_id, calendar_id)
+
+    async def create_event(
+        self,
+        summary: str,
+        start_time: str,
+        end_time: str,
+        description: str = "",
+        attendee_ids: list[str] = None,
+        with_video: bool = False,
+        calendar_id: str = "",
+    ) -> dict:
+        """创建日程/会议，参会人添加失败不影响日程创建"""
+        calendar_id = await self._resolve_calendar_id(calendar_id)
+
+        result = await self.auth.request(
+            "POST",
+            f"/calendar/v4/calendars/{calendar_id}/events",
+            json=self._build_event_data(summary, start_time, end_time, description, with_video),
+            params={"user_id_type": "open_id"},
+        )
+
+        if attendee_ids and result.get("data", {}).get("event", {}).get("event_id"):
+            event_id = result["data"]["event"]["event_id"]
+            try:
+                await self.add_attendees(calendar_id, event_id, attendee_ids)
+            except Exception:
+                pass
+
+        return result
+
+    async def update_event(self, event_id: str, calendar_id: str = "", **kwargs) -> dict:
+        """更新日程"""
+        calendar_id = await self._resolve_calendar_id(calendar_id)
+        return await super().update_event(event_id, calendar_id, **kwargs)
+
+    async def delete_event(self, event_id: str, calendar_id: str = "") -> dict:
+        """删除日程"""
+        calendar_id = await self._resolve_calendar_id(calendar_id)
+        return await super().delete_event(event_id, calendar_id)
+
+    async def list_attendees(self, event_id: str, calendar_id: str = "") -> dict:
+        """获取参会人列表"""
+        calendar_id = await self._resolve_calendar_id(calendar_id)
+        return await super().list_attendees(event_id, calendar_id)
+
+    async def find_free_slots(
+        self,
+        user_ids: list[str],
+        date: str,
+        start_hour: int = 9,
+        end_hour: int = 18,
+        duration_minutes: int = 30,
+    ) -> list[dict]:
+        """查找多个用户的共同空闲时段，各用户忙闲并发查询"""
+        time_min = f"{date}T{start_hour:02d}:00:00+08:00"
+        time_max = f"{date}T{end_hour:02d}:00:00+08:00"
+
+        results = await asyncio.gather(
+            *(self.get_freebusy(user_id, time_min, time_max) for user_id in user_ids),
+            return_exceptions=True,
+        )
+
+        all_busy = []
+        for result in results:
+            if isinstance(result, Exception):
+                continue
+            for item in result.get("data", {}).get("freebusy_list", []):
+                all_busy.append((item["start_time"], item["end_time"]))
+
+        return self._compute_free_slots(all_busy, start_hour, end_hour, duration_minutes)
@@ -0,0 +1,99 @@
+"""卡片模板：卡片预先序列化为 JSON 片段，渲染时只把变量值转义后拼接进去，按变量值缓存渲染结果"""
+
+import json
+import re
+import threading
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，安装后转义更快
+    orjson = None
+
+TEMPLATE_CACHE_SIZE = 4096  # 每个模板缓存的渲染结果条数
+
+# 占位符 {{name}}：只能出现在卡片的字符串值中
+_PLACEHOLDER = re.compile(r"\{\{([A-Za-z_][A-Za-z0-9_]*)\}\}")
+
+
+if orjson is not None:
+    def _escape(value) -> str:
+        return orjson.dumps(str(value)).decode()[1:-1]
+else:
+    def _escape(value) -> str:
+        return json.dumps(str(value), ensure_ascii=False)[1:-1]
+
+
+class CardTemplate:
+    """
+    预编译的卡片模板（线程安全）
+
+    用带 {{变量}} 占位符的卡片（通常由 CardBuilder.build 生成）编译一次，之后每次 render()
+    只对变量值做 JSON 转义并与预先序列化好的片段拼接，直接得到 send_message 需要的 content 字符串，
+    不再逐条构建嵌套字典再 json.dumps。变量值统一按字符串代入（替换在 JSON 字符串内部进行）。
+
+    例如群发个性化卡片：
+        template = CardBuilder.compile(title="{{title}}", content="{{name}}，你好：\\n{{body}}")
+        content = template.render(title="通知", name="张三", body="...")
+        messages_api.send_message(open_id, "interactive", content)
+    """
+
+    def __init__(self, card: dict, cache_size: int = TEMPLATE_CACHE_SIZE):
+        """
+        :param card: 含 {{变量}} 占位符的卡片内容
+        :param cache_size: 渲染结果缓存条数，0 表示不缓存
+        """
+        text = json.dumps(card, ensure_ascii=False, separators=(",", ":"))
+        pieces = _PLACEHOLDER.split(text)
+        # split 的结果是 [片段, 变量, 片段, 变量, ..., 片段]
+        self._fragments: list[str] = pieces[0::2]
+        self._slots: list[str] = pieces[1::2]
+        self.variables: tuple[str, ...] = tuple(dict.fromkeys(self._slots))
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache: dict[tuple, str] = {}  # 变量值 -> 渲染结果，按加入顺序
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, **values) -> str:
+        """
+        渲染卡片
+
+        :param values: 变量值，模板中的每个变量都必须提供
+        :return: 卡片 JSON 字符串（send_message 的 content）
+        """
+        try:
+            key = tuple(values[name] for name in self.variables)
+        except KeyError as e:
+            raise Exception(f"卡片模板缺少变量: {e.args[0]}") from None
+        if self.cache_size:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+        self.misses += 1
+        escaped = dict(zip(self.variables, map(_escape, key)))
+        fragments = self._fragments
+        parts = [fragments[0]]
+        for i, name in enumerate(self._slots, 1):
+            parts.append(escaped[name])
+            parts.append(fragments[i])
+        text = "".join(parts)
+
+        if self.cache_size:
+            with self._lock:
+                self._cache[key] = text
+                if len(self._cache) > self.cache_size:
+                    del self._cache[next(iter(self._cache))]
+        return text
+
+    def render_card(self, **values) -> dict:
+        """渲染为卡片字典（用于 batch_send_message 等需要字典的接口）"""
+        return json.loads(self.render(**values))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,235 @@
+"""聊天记录导出：并发导出多个会话的完整历史到压缩 JSONL 或 Parquet，边拉取边写盘，可中断后继续"""
+
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 为可选依赖，仅导出 Parquet 需要
+    pa = pq = None
+
+from api.messages import MessagesAPI
+from api.paginator import next_page_token
+
+FORMAT_JSONL = "jsonl.gz"
+FORMAT_PARQUET = "parquet"
+EXPORT_WORKERS = 8  # 同时导出的会话数，实际速率由 auth 的频控器控制
+CHUNK_PAGES = 20  # 每攒够这么多页（约 1000 条）写盘并记录一次进度
+STATE_FILE = "export_state.json"
+
+
+def _safe_name(chat_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", chat_id) or "chat"
+
+
+def _message_row(chat_id: str, msg: dict) -> dict:
+    """Parquet 的一行：常用字段展开成列，完整消息保留在 raw 列"""
+    sender = msg.get("sender") or {}
+    return {
+        "chat_id": chat_id,
+        "message_id": msg.get("message_id", ""),
+        "msg_type": msg.get("msg_type", ""),
+        "create_time": int(msg.get("create_time") or 0),
+        "update_time": int(msg.get("update_time") or 0),
+        "sender_id": sender.get("id", ""),
+        "sender_type": sender.get("sender_type", ""),
+        "parent_id": msg.get("parent_id", ""),
+        "root_id": msg.get("root_id", ""),
+        "deleted": bool(msg.get("deleted", False)),
+        "content": (msg.get("body") or {}).get("content", ""),
+        "raw": json.dumps(msg, ensure_ascii=False),
+    }
+
+
+class ChatExporter:
+    """
+    会话历史导出器
+
+    每个会话按时间正序逐页拉取，攒够 CHUNK_PAGES 页就写出一块并把下一页的 page_token
+    记入导出目录下的 export_state.json，内存中最多只有一块数据。
+
+    - jsonl.gz：每个会话一个 <chat_id>.jsonl.gz，每块是一个独立的 gzip 成员，
+      整个文件可直接用 gzip 读取；恢复时截掉最后一块写了一半的数据
+    - parquet：每块一个 <chat_id>.part-00000.parquet 文件（需要 pyarrow）
+
+    中断后用相同参数和目录再次调用 export()，已完成的会话跳过，未完成的从记录的 page_token 继续::
+
+        exporter = ChatExporter(messages_api, "export/2024")
+        report = exporter.export(chat_ids)
+        print(report["messages_per_sec"], report["bytes_per_sec"])
+    """
+
+    def __init__(self, messages_api: MessagesAPI, out_dir: str, fmt: str = FORMAT_JSONL,
+                 start_time: str = "", end_time: str = "", max_workers: int = EXPORT_WORKERS,
+                 on_progress: Callable[[str, int, bool], None] | None = None):
+        """
+        :param messages_api: 消息接口
+        :param out_dir: 导出目录，同时保存导出进度
+        :param fmt: 导出格式 jsonl.gz / parquet
+        :param start_time: 起始时间戳（秒级），可选
+        :param end_time: 结束时间戳（秒级），可选
+        :param max_workers: 同时导出的会话数
+        :param on_progress: 每写出一块回调 (chat_id, 该会话已导出条数, 是否完成)，在工作线程中调用
+        """
+        if fmt not in (FORMAT_JSONL, FORMAT_PARQUET):
+            raise Exception(f"不支持的导出格式: {fmt}")
+        if fmt == FORMAT_PARQUET and pq is None:
+            raise ImportError("导出 Parquet 需要安装 pyarrow: pip install pyarrow")
+        self.api = messages_api
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.start_time = start_time
+        self.end_time = end_time
+        self.max_workers = max_workers
+        self.on_progress = on_progress
+        self._lock = threading.Lock()
+        self._run_messages = 0
+        self._run_bytes = 0
+
+        os.makedirs(out_dir, exist_ok=True)
+        self._state_path = os.path.join(out_dir, STATE_FILE)
+        self._state = self._load_state()
+
+    # ── 进度 ──────────────────────────
+
+    def _options(self) -> dict:
+        return {"format": self.fmt, "start_time": self.start_time, "end_time": self.end_time}
+
+    def _load_state(self) -> dict:
+        if not os.path.exists(self._state_path):
+            return {"options": self._options(), "chats": {}}
+        with open(self._state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("options") != self._options():
+            raise Exception(f"导出目录中已有参数不同的导出进度: {self._state_path}")
+        return state
+
+    def _save_state(self):
+        """调用方需持锁；先写临时文件再替换，崩溃时不会留下半个进度文件"""
+        tmp_path = self._state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, ensure_ascii=False)
+        os.replace(tmp_path, self._state_path)
+
+    def progress(self) -> dict[str, dict]:
+        """各会话的导出进度 {chat_id: {"page_token", "messages", "bytes", "parts", "done"}}"""
+        with self._lock:
+            return {chat_id: dict(chat) for chat_id, chat in self._state["chats"].items()}
+
+    # ── 导出 ──────────────────────────
+
+    def export(self, chat_ids: list[str]) -> dict:
+        """
+        导出多个会话，已完成的会话跳过
+
+        :param chat_ids: 会话 ID 列表
+        :return: {"out_dir", "format", "chats", "completed", "failed": {chat_id: 错误},
+                  "messages", "bytes", "elapsed", "messages_per_sec", "bytes_per_sec"}
+                 其中 messages / bytes 及速率只统计本次运行
+        """
+        started = time.time()
+        self._run_messages = self._run_bytes = 0
+        failed = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export") as pool:
+            futures = {pool.submit(self.export_chat, chat_id): chat_id for chat_id in dict.fromkeys(chat_ids)}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed[futures[future]] = str(e)
+
+        elapsed = max(time.time() - started, 1e-6)
+        progress = self.progress()
+        return {
+            "out_dir": self.out_dir,
+            "format": self.fmt,
+            "chats": len(futures),
+            "completed": sum(1 for chat_id in futures.values() if progress.get(chat_id, {}).get("done")),
+            "failed": failed,
+            "messages": self._run_messages,
+            "bytes": self._run_bytes,
+            "elapsed": round(elapsed, 2),
+            "messages_per_sec": round(self._run_messages / elapsed, 1),
+            "bytes_per_sec": round(self._run_bytes / elapsed, 1),
+        }
+
+    def export_chat(self, chat_id: str) -> dict:
+        """
+        导出单个会话（从上次记录的进度继续）
+
+        :return: 该会话的导出进度
+        """
+        with self._lock:
+            chat = self._state["chats"].setdefault(
+                chat_id, {"page_token": "", "messages": 0, "bytes": 0, "parts": 0, "done": False}
+            )
+            chat = dict(chat)
+        if chat["done"]:
+            return chat
+        if self.fmt == FORMAT_JSONL:
+            self._truncate_partial(chat_id, chat["bytes"])
+
+        page_token = chat["page_token"]
+        buffer: list[dict] = []
+        pages = 0
+        while True:
+            data = self.api.get_chat_messages(
+                chat_id, self.start_time, self.end_time, page_token, sort_type="ByCreateTimeAsc"
+            )
+            buffer.extend(data.get("data", {}).get("items") or [])
+            pages += 1
+            page_token = next_page_token(data)
+            if page_token and pages < CHUNK_PAGES:
+                continue
+            chat = self._write_chunk(chat_id, chat, buffer, page_token)
+            buffer = []
+            pages = 0
+            if not page_token:
+                return chat
+
+    def _write_chunk(self, chat_id: str, chat: dict, messages: list[dict], page_token: str) -> dict:
+        """写出一块数据并记录进度，返回新的会话进度"""
+        written = 0
+        if messages and self.fmt == FORMAT_JSONL:
+            lines = "".join(json.dumps(msg, ensure_ascii=False) + "\n" for msg in messages)
+            data = gzip.compress(lines.encode("utf-8"))
+            with open(self._jsonl_path(chat_id), "ab") as f:
+                f.write(data)
+            written = len(data)
+        elif messages:
+            path = os.path.join(self.out_dir, f"{_safe_name(chat_id)}.part-{chat['parts']:05d}.parquet")
+            pq.write_table(pa.Table.from_pylist([_message_row(chat_id, msg) for msg in messages]), path)
+            written = os.path.getsize(path)
+
+        chat = {
+            "page_token": page_token,
+            "messages": chat["messages"] + len(messages),
+            "bytes": chat["bytes"] + written,
+            "parts": chat["parts"] + (1 if messages else 0),
+            "done": not page_token,
+        }
+        with self._lock:
+            self._state["chats"][chat_id] = chat
+            self._save_state()
+            self._run_messages += len(messages)
+            self._run_bytes += written
+        if self.on_progress is not None:
+            self.on_progress(chat_id, chat["messages"], chat["done"])
+        return chat
+
+    def _jsonl_path(self, chat_id: str) -> str:
+        return os.path.join(self.out_dir, f"{_safe_name(chat_id)}.jsonl.gz")
+
+    def _truncate_partial(self, chat_id: str, size: int):
+        """截掉上次中断时已写入但未记入进度的数据"""
+        path = self._jsonl_path(chat_id)
+        if os.path.exists(path) and os.path.getsize(path) != size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
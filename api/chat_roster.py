@@ -0,0 +1,233 @@
+"""会话成员名册：并发拉取机器人所在全部会话的成员，跨会话去重，并记录每个用户所在的会话"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.messages import MessagesAPI
+
+ROSTER_WORKERS = 8  # 同时拉取成员列表的会话数
+ROSTER_TTL = 30 * 60  # 会话成员列表的有效期（秒），过期的会话在 refresh 时重新拉取
+
+# apply_event 可处理的会话成员事件
+ROSTER_EVENTS = (
+    "im.chat.member.user.added_v1",
+    "im.chat.member.user.deleted_v1",
+    "im.chat.member.user.withdrawn_v1",
+    "im.chat.member.bot.added_v1",
+    "im.chat.member.bot.deleted_v1",
+    "im.chat.disbanded_v1",
+)
+
+
+def _iter_bits(bits: int):
+    """依次返回位图中为 1 的位的序号"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class ChatRoster:
+    """
+    机器人可触达的用户名册（线程安全）
+
+    每个成员的 open_id 映射为一个整数序号，会话成员保存为以序号为位的整数位图：
+    刷新时新旧位图做一次位运算即可得到加入、退出的成员，只更新变化的部分。
+    倒排表记录 序号 -> 所在会话，用于查询某个用户所在的会话以及跨会话去重后的全部成员。
+
+    refresh() 只重新拉取新出现的会话和成员列表已过期的会话；
+    接入事件订阅后 apply_event 就地更新进出群的成员。
+    """
+
+    def __init__(self, messages_api: MessagesAPI, max_workers: int = ROSTER_WORKERS, ttl: float = ROSTER_TTL):
+        """
+        :param messages_api: 消息接口
+        :param max_workers: 同时拉取成员列表的会话数
+        :param ttl: 会话成员列表的有效期（秒）
+        """
+        self.api = messages_api
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._open_ids: list[str] = []  # 序号 -> open_id
+        self._names: list[str] = []  # 序号 -> 成员名称
+        self._seq: dict[str, int] = {}  # open_id -> 序号
+        self._chats: dict[str, dict] = {}  # chat_id -> 会话信息，按会话列表顺序
+        self._chat_bits: dict[str, int] = {}  # chat_id -> 成员位图
+        self._fetched_at: dict[str, float] = {}  # chat_id -> 成员列表拉取时间
+        self._user_chats: dict[int, set[str]] = {}  # 序号 -> 所在会话（只保留至少在一个会话中的成员）
+
+    # ── 刷新 ──────────────────────────
+
+    def refresh(self, force: bool = False, chats: list[dict] | None = None) -> dict:
+        """
+        刷新会话列表，并发拉取新会话与过期会话的成员
+
+        单个会话拉取失败不影响其他会话，该会话保留原有成员，下次刷新时重试。
+
+        :param force: 忽略有效期，重新拉取全部会话的成员
+        :param chats: 调用方刚拉取的会话列表，传入时不再请求会话列表
+        :return: {"chats", "fetched", "removed", "failed", "members", "elapsed"}
+        """
+        start = time.time()
+        if chats is None:
+            chats = self.api.get_all_chats()
+        current = {chat["chat_id"]: chat for chat in chats if chat.get("chat_id")}
+        with self._lock:
+            removed = [chat_id for chat_id in self._chats if chat_id not in current]
+            for chat_id in removed:
+                self._drop_chat(chat_id)
+            self._chats = current
+            now = time.time()
+            stale = [
+                chat_id for chat_id in current
+                if force or now - self._fetched_at.get(chat_id, 0) > self.ttl
+            ]
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="roster") as pool:
+            futures = {chat_id: pool.submit(self.api.get_all_chat_members, chat_id) for chat_id in stale}
+            for chat_id, future in futures.items():
+                try:
+                    members = future.result()
+                except Exception:
+                    failed += 1
+                    continue
+                self._set_members(chat_id, members)
+
+        return {
+            "chats": len(current),
+            "fetched": len(stale) - failed,
+            "removed": len(removed),
+            "failed": failed,
+            "members": len(self),
+            "elapsed": time.time() - start,
+        }
+
+    def _intern(self, open_id: str, name: str) -> int:
+        seq = self._seq.get(open_id)
+        if seq is None:
+            seq = self._seq[open_id] = len(self._open_ids)
+            self._open_ids.append(open_id)
+            self._names.append(name)
+        elif name:
+            self._names[seq] = name
+        return seq
+
+    def _set_members(self, chat_id: str, members: list[dict]):
+        with self._lock:
+            if chat_id not in self._chats:
+                return  # 刷新期间会话已被移除
+            bits = 0
+            for member in members:
+                if member.get("member_id_type", "open_id") != "open_id" or not member.get("member_id"):
+                    continue
+                bits |= 1 << self._intern(member["member_id"], member.get("name", ""))
+            self._update_bits(chat_id, bits)
+            self._fetched_at[chat_id] = time.time()
+
+    def _update_bits(self, chat_id: str, bits: int):
+        """替换会话的成员位图，只更新加入和退出的成员的倒排表（调用方持有锁）"""
+        old = self._chat_bits.get(chat_id, 0)
+        for seq in _iter_bits(bits & ~old):
+            self._user_chats.setdefault(seq, set()).add(chat_id)
+        for seq in _iter_bits(old & ~bits):
+            chats = self._user_chats.get(seq)
+            if chats is not None:
+                chats.discard(chat_id)
+                if not chats:
+                    del self._user_chats[seq]
+        if bits:
+            self._chat_bits[chat_id] = bits
+        else:
+            self._chat_bits.pop(chat_id, None)
+
+    def _drop_chat(self, chat_id: str):
+        """移除会话及其成员关系（调用方持有锁）"""
+        self._update_bits(chat_id, 0)
+        self._chats.pop(chat_id, None)
+        self._fetched_at.pop(chat_id, None)
+
+    # ── 查询 ──────────────────────────
+
+    def __len__(self) -> int:
+        """去重后的成员数"""
+        return len(self._user_chats)
+
+    def __contains__(self, open_id: str) -> bool:
+        seq = self._seq.get(open_id)
+        return seq is not None and seq in self._user_chats
+
+    def chats(self) -> list[dict]:
+        """最近一次刷新得到的会话列表"""
+        with self._lock:
+            return list(self._chats.values())
+
+    def members(self) -> list[dict]:
+        """
+        跨会话去重后的全部成员
+
+        :return: [{"open_id", "name", "chat_ids"}]，按首次出现的顺序
+        """
+        with self._lock:
+            return [
+                {"open_id": self._open_ids[seq], "name": self._names[seq], "chat_ids": sorted(chats)}
+                for seq, chats in sorted(self._user_chats.items())
+            ]
+
+    def member_ids(self) -> list[str]:
+        """跨会话去重后的全部成员 open_id"""
+        with self._lock:
+            return [self._open_ids[seq] for seq in sorted(self._user_chats)]
+
+    def chat_members(self, chat_id: str) -> list[str]:
+        """会话成员的 open_id"""
+        with self._lock:
+            return [self._open_ids[seq] for seq in _iter_bits(self._chat_bits.get(chat_id, 0))]
+
+    def chats_of(self, open_id: str) -> list[str]:
+        """用户所在的会话 ID"""
+        with self._lock:
+            seq = self._seq.get(open_id)
+            return sorted(self._user_chats.get(seq, ())) if seq is not None else []
+
+    def common_members(self, chat_ids: list[str]) -> list[str]:
+        """同时在所有给定会话中的成员 open_id"""
+        with self._lock:
+            if not chat_ids:
+                return []
+            bits = -1
+            for chat_id in chat_ids:
+                bits &= self._chat_bits.get(chat_id, 0)
+            return [self._open_ids[seq] for seq in _iter_bits(bits)]
+
+    # ── 变更事件 ──────────────────────────
+
+    def apply_event(self, event_type: str, event: dict) -> bool:
+        """
+        应用会话成员事件（im.chat.member.* / im.chat.disbanded_v1）
+
+        :param event_type: 事件类型
+        :param event: 事件体
+        :return: 是否为可识别的会话成员事件
+        """
+        chat_id = event.get("chat_id", "")
+        if event_type not in ROSTER_EVENTS or not chat_id:
+            return False
+        with self._lock:
+            if event_type in ("im.chat.member.bot.deleted_v1", "im.chat.disbanded_v1"):
+                self._drop_chat(chat_id)
+            elif event_type == "im.chat.member.bot.added_v1":
+                # 新加入的会话：下次 refresh 时出现在会话列表中并拉取成员
+                self._fetched_at.pop(chat_id, None)
+            elif chat_id in self._chats:
+                bits = self._chat_bits.get(chat_id, 0)
+                for user in event.get("users") or []:
+                    open_id = (user.get("user_id") or {}).get("open_id", "")
+                    if not open_id:
+                        continue
+                    bit = 1 << self._intern(open_id, user.get("name", ""))
+                    bits = bits | bit if event_type == "im.chat.member.user.added_v1" else bits & ~bit
+                self._update_bits(chat_id, bits)
+        return True
@@ -1,6 +1,20 @@
 """飞书联系人 API 封装"""
 
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import AsyncIterator, Iterator
+
 from api.auth import FeishuAuth
+from api.async_auth import AsyncFeishuAuth
+from api.paginator import acollect, aiter_pages, apaginate, paginate
+from utils.directory_store import normalize_email, normalize_mobile
+
+CRAWL_WORKERS = 8  # 遍历部门树时同时展开的父部门数
+BATCH_ID_LIMIT = 50  # batch_get_id 每次最多 50 个邮箱 + 50 个手机号
+RESOLVE_WORKERS = 8  # 批量解析 ID 时同时在途的请求数
+USER_ID_CACHE_SIZE = 10000  # 邮箱/手机号 -> open_id 缓存的最大条数，超出后淘汰最久未使用的
 
 
 class ContactsAPI:
@@ -8,13 +22,18 @@ class ContactsAPI:
 
     def __init__(self, auth: FeishuAuth):
         self.auth = auth
+        # ("email" | "mobile", 规范化后的值) -> open_id，只缓存解析成功的结果（LRU）
+        self._user_id_cache: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._user_id_lock = threading.Lock()
 
-    def get_departments(self, parent_department_id: str = "0", page_token: str = "") -> dict:
+    def get_departments(self, parent_department_id: str = "0", page_token: str = "",
+                        fetch_child: bool = False) -> dict:
         """
         获取子部门列表
 
         :param parent_department_id: 父部门 ID，根部门为 "0"
         :param page_token: 分页 token
+        :param fetch_child: 是否一并返回所有层级的子孙部门
         :return: API 响应数据
         """
         params = {
@@ -23,6 +42,8 @@ class ContactsAPI:
         }
         if page_token:
             params["page_token"] = page_token
+        if fetch_child:
+            params["fetch_child"] = "true"
 
         return self.auth.request(
             "GET",
@@ -30,29 +51,57 @@ class ContactsAPI:
             params=params,
         )
 
-    def get_all_departments(self, parent_department_id: str = "0") -> list[dict]:
-        """递归获取所有子部门（包括嵌套子部门）"""
-        all_departments = []
-        self._recursive_get_departments(parent_department_id, all_departments)
-        return all_departments
+    def get_all_departments(self, parent_department_id: str = "0", max_workers: int = CRAWL_WORKERS,
+                            fetch_child: bool = False) -> list[dict]:
+        """获取所有子部门（包括嵌套子部门），参数见 iter_departments"""
+        return list(self.iter_departments(parent_department_id, max_workers, fetch_child))
 
-    def _recursive_get_departments(self, parent_id: str, result: list[dict]):
-        """递归获取所有层级的部门"""
-        page_token = ""
-        while True:
-            data = self.get_departments(parent_id, page_token)
-            items = data.get("data", {}).get("items", [])
+    def iter_departments(self, parent_department_id: str = "0", max_workers: int = CRAWL_WORKERS,
+                         fetch_child: bool = False) -> Iterator[dict]:
+        """
+        广度优先遍历部门树，逐个返回部门
+
+        最多 max_workers 个父部门同时展开，某个父部门的子部门一到就返回给调用方，
+        并立即把这些子部门加入待展开队列。返回顺序不保证父部门在子部门之前。
+
+        :param parent_department_id: 起始父部门 ID，根部门为 "0"
+        :param max_workers: 同时请求的父部门数
+        :param fetch_child: 使用 fetch_child=true 一次分页拉取全部子孙部门（需应用有全员通讯录权限）
+        :return: 部门生成器
+        """
+        if fetch_child:
+            yield from paginate(
+                lambda page_token: self.get_departments(parent_department_id, page_token, fetch_child=True)
+            )
+            return
 
-            for dept in items:
-                result.append(dept)
-                # 递归获取子部门
-                dept_id = dept.get("department_id", "")
-                if dept_id:
-                    self._recursive_get_departments(dept_id, result)
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dept-crawl")
+        try:
+            pending = {pool.submit(self._list_child_departments, parent_department_id)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for dept in future.result():
+                        dept_id = dept.get("department_id", "")
+                        if dept_id:
+                            pending.add(pool.submit(self._list_child_departments, dept_id))
+                        yield dept
+        finally:
+            # 调用方提前结束或出错时，排队中的请求不再发出
+            pool.shutdown(wait=False, cancel_futures=True)
 
-            if not data.get("data", {}).get("has_more", False):
-                break
-            page_token = data.get("data", {}).get("page_token", "")
+    def _list_child_departments(self, parent_id: str) -> list[dict]:
+        """获取一个父部门的直接子部门（已由遍历的线程池并发，这里不再预取）"""
+        return list(paginate(lambda page_token: self.get_departments(parent_id, page_token), prefetch=False))
+
+    def _recursive_get_departments(self, parent_id: str, result: list[dict]):
+        """深度优先逐个请求获取所有层级的部门（保留作为 iter_departments 的对照实现）"""
+        for dept in paginate(lambda page_token: self.get_departments(parent_id, page_token)):
+            result.append(dept)
+            # 递归获取子部门
+            dept_id = dept.get("department_id", "")
+            if dept_id:
+                self._recursive_get_departments(dept_id, result)
 
     def get_department_users(self, department_id: str, page_token: str = "") -> dict:
         """
@@ -78,19 +127,7 @@ class ContactsAPI:
 
     def get_all_department_users(self, department_id: str) -> list[dict]:
         """获取部门下所有用户（自动分页）"""
-        all_users = []
-        page_token = ""
-
-        while True:
-            data = self.get_department_users(department_id, page_token)
-            items = data.get("data", {}).get("items", [])
-            all_users.extend(items)
-
-            if not data.get("data", {}).get("has_more", False):
-                break
-            page_token = data.get("data", {}).get("page_token", "")
-
-        return all_users
+        return list(paginate(lambda page_token: self.get_department_users(department_id, page_token)))
 
     def search_user(self, query: str, page_token: str = "") -> dict:
         """
@@ -111,6 +148,7 @@ class ContactsAPI:
             "/search/v1/user",
             params=params,
             json={"query": query},
+            idempotent=True,  # 只读查询
         )
 
     def get_user_info(self, user_id: str, user_id_type: str = "open_id") -> dict:
@@ -124,6 +162,17 @@ class ContactsAPI:
         params = {"user_id_type": user_id_type}
         return self.auth.request("GET", f"/contact/v3/users/{user_id}", params=params)
 
+    def batch_get_users(self, user_ids: list[str], user_id_type: str = "open_id") -> dict:
+        """
+        批量获取用户详细信息
+
+        :param user_ids: 用户 ID 列表，最多 50 个
+        :param user_id_type: ID 类型 (open_id, union_id, user_id)
+        :return: API 响应数据，data.items 为用户列表
+        """
+        params = [("user_id_type", user_id_type)] + [("user_ids", user_id) for user_id in user_ids]
+        return self.auth.request("GET", "/contact/v3/users/batch", params=params)
+
     def batch_get_user_by_id(self, emails: list[str] = None, mobiles: list[str] = None) -> dict:
         """
         通过邮箱或手机号批量获取用户 ID
@@ -143,4 +192,243 @@ class ContactsAPI:
             "/contact/v3/users/batch_get_id",
             params={"user_id_type": "open_id"},
             json=payload,
+            idempotent=True,  # 只读查询
         )
+
+    # ── 批量解析用户 ID ──────────────────────────
+
+    def resolve_user_ids(self, emails: list[str] = None, mobiles: list[str] = None,
+                         max_workers: int = RESOLVE_WORKERS) -> tuple[dict[str, str], list[str], dict[str, str]]:
+        """
+        批量把邮箱/手机号解析为 open_id，数量不限
+
+        某一批请求失败不影响其他批，该批的输入记入失败列表。
+
+        :param emails: 邮箱列表
+        :param mobiles: 手机号列表
+        :param max_workers: 同时在途的请求数
+        :return: (原始输入 -> open_id, 查无此人的原始输入列表, 请求失败的原始输入 -> 错误信息)
+        """
+        mapping, unresolved, failed = {}, [], {}
+        for value, open_id in self.iter_resolve_user_ids(emails, mobiles, max_workers, errors=failed):
+            if open_id:
+                mapping[value] = open_id
+            elif value not in failed:
+                unresolved.append(value)
+        return mapping, unresolved, failed
+
+    def iter_resolve_user_ids(self, emails: list[str] = None, mobiles: list[str] = None,
+                              max_workers: int = RESOLVE_WORKERS,
+                              errors: dict[str, str] | None = None) -> Iterator[tuple[str, str | None]]:
+        """
+        批量解析 open_id，每批结果一到就逐条返回
+
+        输入先规范化去重，已缓存的直接返回；其余按每批 50 个邮箱 + 50 个手机号拆分，
+        多批并发请求（速率由 auth 的频控器控制）。某一批请求失败时，该批的输入以 open_id 为 None 返回，
+        其余批照常返回。
+
+        :param errors: 传入时记录请求失败的原始输入 -> 错误信息（用于区分查无此人与请求失败）
+        :return: (原始输入, open_id) 的生成器，未解析到或请求失败时 open_id 为 None
+        """
+        originals, chunks = self._plan_id_chunks(emails, mobiles)
+        for key, open_id in self._cached_user_ids(originals):
+            for value in originals.pop(key):
+                yield value, open_id
+        if not chunks:
+            return
+
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resolve-id")
+        try:
+            futures = {
+                pool.submit(self.batch_get_user_by_id, chunk_emails, chunk_mobiles): (chunk_emails, chunk_mobiles)
+                for chunk_emails, chunk_mobiles in chunks
+            }
+            for future in as_completed(futures):
+                try:
+                    pairs = self._parse_id_chunk(*futures[future], future.result())
+                except Exception as e:
+                    pairs = self._failed_id_chunk(*futures[future], originals, e, errors)
+                for key, open_id in pairs:
+                    for value in originals[key]:
+                        yield value, open_id
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _plan_id_chunks(self, emails: list[str] | None, mobiles: list[str] | None):
+        """
+        规范化去重，并把未缓存的 key 拆批
+
+        :return: (规范化 key -> 原始输入列表, [(邮箱批, 手机号批)])
+        """
+        originals: dict[tuple[str, str], list[str]] = {}
+        for kind, values, normalize in (("email", emails, normalize_email), ("mobile", mobiles, normalize_mobile)):
+            for value in values or []:
+                normalized = normalize(value)
+                if normalized:
+                    originals.setdefault((kind, normalized), []).append(value)
+
+        with self._user_id_lock:
+            missing = [key for key in originals if key not in self._user_id_cache]
+        unique_emails = [value for kind, value in missing if kind == "email"]
+        unique_mobiles = [value for kind, value in missing if kind == "mobile"]
+        chunks = [
+            (unique_emails[i:i + BATCH_ID_LIMIT], unique_mobiles[i:i + BATCH_ID_LIMIT])
+            for i in range(0, max(len(unique_emails), len(unique_mobiles)), BATCH_ID_LIMIT)
+        ]
+        return originals, chunks
+
+    def _parse_id_chunk(self, emails: list[str], mobiles: list[str],
+                        result: dict) -> list[tuple[tuple[str, str], str | None]]:
+        """把一批的响应对应回请求的每个 key，并写入缓存"""
+        found = {}
+        for item in result.get("data", {}).get("user_list", []):
+            if not item.get("user_id"):
+                continue
+            if item.get("email"):
+                found[("email", normalize_email(item["email"]))] = item["user_id"]
+            if item.get("mobile"):
+                found[("mobile", normalize_mobile(item["mobile"]))] = item["user_id"]
+
+        pairs = []
+        with self._user_id_lock:
+            for key in [("email", value) for value in emails] + [("mobile", value) for value in mobiles]:
+                open_id = found.get(key)
+                if open_id:
+                    self._user_id_cache[key] = open_id
+                    self._user_id_cache.move_to_end(key)
+                pairs.append((key, open_id))
+            while len(self._user_id_cache) > USER_ID_CACHE_SIZE:
+                self._user_id_cache.popitem(last=False)
+        return pairs
+
+    @staticmethod
+    def _failed_id_chunk(emails: list[str], mobiles: list[str], originals: dict, error: Exception,
+                         errors: dict[str, str] | None) -> list[tuple[tuple[str, str], None]]:
+        """请求失败的一批：每个 key 返回 None，并把对应的原始输入记入 errors"""
+        keys = [("email", value) for value in emails] + [("mobile", value) for value in mobiles]
+        if errors is not None:
+            for key in keys:
+                for value in originals[key]:
+                    errors[value] = str(error)
+        return [(key, None) for key in keys]
+
+    def _cached_user_ids(self, originals: dict) -> list[tuple[tuple[str, str], str]]:
+        """已缓存的 key 及其 open_id（同时刷新其 LRU 位置）"""
+        cached = []
+        with self._user_id_lock:
+            for key in originals:
+                open_id = self._user_id_cache.get(key)
+                if open_id is not None:
+                    self._user_id_cache.move_to_end(key)
+                    cached.append((key, open_id))
+        return cached
+
+
+class AsyncContactsAPI(ContactsAPI):
+    """
+    联系人接口的异步版本，需配合 AsyncFeishuAuth 使用。
+
+    单页接口直接复用 ContactsAPI 的路径与参数构建（返回值需 await），
+    这里只重写内部串联多次请求的方法。
+    """
+
+    def __init__(self, auth: AsyncFeishuAuth):
+        super().__init__(auth)
+
+    async def get_all_departments(self, parent_department_id: str = "0", max_workers: int = CRAWL_WORKERS,
+                                  fetch_child: bool = False) -> list[dict]:
+        """获取所有子部门（包括嵌套子部门），参数见 iter_departments"""
+        return await acollect(self.iter_departments(parent_department_id, max_workers, fetch_child))
+
+    async def iter_departments(self, parent_department_id: str = "0", max_workers: int = CRAWL_WORKERS,
+                               fetch_child: bool = False) -> AsyncIterator[dict]:
+        """广度优先遍历部门树，最多 max_workers 个父部门同时展开"""
+        if fetch_child:
+            async for dept in apaginate(
+                lambda page_token: self.get_departments(parent_department_id, page_token, fetch_child=True)
+            ):
+                yield dept
+            return
+
+        queue = deque([parent_department_id])
+        running = set()
+        try:
+            while queue or running:
+                while queue and len(running) < max_workers:
+                    running.add(asyncio.ensure_future(self._list_child_departments(queue.popleft())))
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for dept in task.result():
+                        if dept.get("department_id"):
+                            queue.append(dept["department_id"])
+                        yield dept
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def _list_child_departments(self, parent_id: str) -> list[dict]:
+        return await acollect(apaginate(
+            lambda page_token: self.get_departments(parent_id, page_token), prefetch=False
+        ))
+
+    async def _recursive_get_departments(self, parent_id: str, result: list[dict]):
+        async for data in aiter_pages(lambda page_token: self.get_departments(parent_id, page_token)):
+            items = data.get("data", {}).get("items", [])
+            result.extend(items)
+
+            # 各子部门互不依赖，并发递归
+            children = [[] for _ in items]
+            await asyncio.gather(*(
+                self._recursive_get_departments(dept["department_id"], sub)
+                for dept, sub in zip(items, children) if dept.get("department_id")
+            ))
+            for sub in children:
+                result.extend(sub)
+
+    async def get_all_department_users(self, department_id: str) -> list[dict]:
+        """获取部门下所有用户（自动分页）"""
+        return await acollect(apaginate(lambda page_token: self.get_department_users(department_id, page_token)))
+
+    async def resolve_user_ids(self, emails: list[str] = None, mobiles: list[str] = None,
+                               max_workers: int = RESOLVE_WORKERS) -> tuple[dict[str, str], list[str], dict[str, str]]:
+        """
+        批量把邮箱/手机号解析为 open_id
+
+        :return: (原始输入 -> open_id, 查无此人的原始输入列表, 请求失败的原始输入 -> 错误信息)
+        """
+        mapping, unresolved, failed = {}, [], {}
+        async for value, open_id in self.iter_resolve_user_ids(emails, mobiles, max_workers, errors=failed):
+            if open_id:
+                mapping[value] = open_id
+            elif value not in failed:
+                unresolved.append(value)
+        return mapping, unresolved, failed
+
+    async def iter_resolve_user_ids(self, emails: list[str] = None, mobiles: list[str] = None,
+                                    max_workers: int = RESOLVE_WORKERS,
+                                    errors: dict[str, str] | None = None) -> AsyncIterator[tuple[str, str | None]]:
+        """批量解析 open_id，每批结果一到就逐条返回，参数见 ContactsAPI.iter_resolve_user_ids"""
+        originals, chunks = self._plan_id_chunks(emails, mobiles)
+        for key, open_id in self._cached_user_ids(originals):
+            for value in originals.pop(key):
+                yield value, open_id
+
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def run(chunk_emails, chunk_mobiles):
+            try:
+                async with semaphore:
+                    result = await self.batch_get_user_by_id(chunk_emails, chunk_mobiles)
+            except Exception as e:
+                return self._failed_id_chunk(chunk_emails, chunk_mobiles, originals, e, errors)
+            return self._parse_id_chunk(chunk_emails, chunk_mobiles, result)
+
+        tasks = [asyncio.ensure_future(run(*chunk)) for chunk in chunks]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for key, open_id in await next_done:
+                    for value in originals[key]:
+                        yield value, open_id
+        finally:
+            for task in tasks:
+                task.cancel()
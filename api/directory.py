@@ -0,0 +1,200 @@
+"""通讯录同步：从 ContactsAPI 拉取部门与用户写入本地 DirectoryStore，按 TTL 或变更事件增量刷新"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from api.contacts import CRAWL_WORKERS, ContactsAPI
+from utils.directory_store import (
+    DEPARTMENT_USERS_PREFIX,
+    DEPARTMENTS_KEY,
+    DirectoryStore,
+    department_users_key,
+    directory_db_file,
+)
+
+DIRECTORY_TTL = 6 * 3600  # 本地通讯录数据的有效期（秒）
+
+# apply_event 可处理的通讯录事件
+DIRECTORY_EVENTS = (
+    "contact.user.created_v3",
+    "contact.user.updated_v3",
+    "contact.user.deleted_v3",
+    "contact.department.created_v3",
+    "contact.department.updated_v3",
+    "contact.department.deleted_v3",
+)
+
+
+class DirectoryCache:
+    """
+    本地通讯录缓存
+
+    读取时数据在 TTL 内直接返回本地结果；过期或强制刷新时才请求接口并写回本地。
+    收到通讯录变更事件时调用 apply_event 就地更新，无需整体重拉。
+    """
+
+    def __init__(self, contacts_api: ContactsAPI, store: DirectoryStore | None = None,
+                 ttl: float = DIRECTORY_TTL):
+        """
+        :param contacts_api: 联系人接口
+        :param store: 本地存储，默认按 app_id 使用 config.json 同目录的数据库
+        :param ttl: 数据有效期（秒）
+        """
+        self.api = contacts_api
+        self.store = store or DirectoryStore(directory_db_file(contacts_api.auth.app_id))
+        self.ttl = ttl
+
+    # ── 部门 ──────────────────────────
+
+    def cached_departments(self) -> list[dict] | None:
+        """本地部门数据未过期时返回，否则返回 None（不发请求，可在 UI 线程调用）"""
+        if not self.store.is_fresh(DEPARTMENTS_KEY, self.ttl):
+            return None
+        return self.store.get_departments()
+
+    def get_departments(self, force: bool = False) -> list[dict]:
+        """
+        获取全部部门
+
+        :param force: 忽略本地数据，强制从接口重新拉取
+        :return: 部门列表
+        """
+        if not force:
+            cached = self.cached_departments()
+            if cached is not None:
+                return cached
+        departments = self.api.get_all_departments("0")
+        self.store.replace_departments(departments)
+        return departments
+
+    # ── 部门成员 ──────────────────────────
+
+    def cached_department_users(self, department_id: str) -> list[dict] | None:
+        """本地部门成员未过期时返回，否则返回 None（不发请求，可在 UI 线程调用）"""
+        if not self.store.is_fresh(department_users_key(department_id), self.ttl):
+            return None
+        return self.store.get_department_users(department_id)
+
+    def get_department_users(self, department_id: str, force: bool = False) -> list[dict]:
+        """
+        获取部门成员
+
+        :param department_id: 部门 ID
+        :param force: 忽略本地数据，强制从接口重新拉取
+        :return: 用户列表
+        """
+        if not force:
+            cached = self.cached_department_users(department_id)
+            if cached is not None:
+                return cached
+        users = self.api.get_all_department_users(department_id)
+        self.store.replace_department_users(department_id, users)
+        return users
+
+    def sync_all_users(self, max_workers: int = CRAWL_WORKERS) -> list[dict]:
+        """
+        拉取所有部门（含根部门）中已过期的成员列表，返回本地全部用户
+
+        :param max_workers: 同时请求的部门数
+        :return: 用户列表
+        """
+        department_ids = ["0"] + [dept["department_id"] for dept in self.get_departments()]
+        stale = [
+            dept_id for dept_id in department_ids
+            if not self.store.is_fresh(department_users_key(dept_id), self.ttl)
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="directory-sync") as pool:
+            # list() 取出结果，任一部门失败时抛出异常
+            list(pool.map(lambda dept_id: self.get_department_users(dept_id, force=True), stale))
+        return self.store.get_all_users()
+
+    def refresh_stale(self) -> int:
+        """
+        增量刷新：只重新拉取已过期的部分（部门树、曾经加载过的部门成员）
+
+        :return: 刷新的数据块数量
+        """
+        refreshed = 0
+        if not self.store.is_fresh(DEPARTMENTS_KEY, self.ttl):
+            self.get_departments(force=True)
+            refreshed += 1
+        for key in self.store.stale_keys(DEPARTMENT_USERS_PREFIX, self.ttl):
+            self.get_department_users(key[len(DEPARTMENT_USERS_PREFIX):], force=True)
+            refreshed += 1
+        return refreshed
+
+    # ── 本地查询 ──────────────────────────
+
+    def find_user(self, open_id: str = "", email: str = "", mobile: str = "") -> dict | None:
+        """按 open_id / 邮箱 / 手机号在本地查找用户"""
+        if open_id:
+            return self.store.get_user(open_id)
+        if email:
+            return self.store.find_user_by_email(email)
+        if mobile:
+            return self.store.find_user_by_mobile(mobile)
+        return None
+
+    # ── 变更事件 ──────────────────────────
+
+    def apply_event(self, event_type: str, event: dict) -> bool:
+        """
+        应用通讯录变更事件（contact.user.* / contact.department.* v3）
+
+        事件中的部门 ID 为 open_department_id，而本地按 department_id 保存，写入前经本地部门表转换；
+        涉及本地还没有的部门时不写入部门关系，改为把相关数据标记为过期，下次读取时从接口重新拉取。
+
+        :param event_type: 事件类型，如 contact.user.updated_v3
+        :param event: 事件体（header 之外的 event 字段）
+        :return: 是否为可识别的通讯录事件
+        """
+        obj = dict(event.get("object") or {})
+        if event_type in ("contact.user.created_v3", "contact.user.updated_v3"):
+            if "department_ids" in obj:
+                department_ids = self._local_department_ids(obj["department_ids"] or [])
+                if department_ids is None:
+                    self._invalidate_user_departments(obj.get("open_id", ""))
+                    del obj["department_ids"]  # 保留原有部门关系，等重新拉取
+                else:
+                    obj["department_ids"] = department_ids
+            self.store.upsert_users([obj])
+        elif event_type == "contact.user.deleted_v3":
+            self.store.delete_user(obj.get("open_id", ""))
+        elif event_type in ("contact.department.created_v3", "contact.department.updated_v3"):
+            department_id = obj.get("department_id") or self._local_department_id(obj.get("open_department_id", ""))
+            parent_id = self._local_department_id(obj.get("parent_department_id") or "0")
+            if not department_id or parent_id is None:
+                self.store.invalidate(DEPARTMENTS_KEY)
+            else:
+                obj["department_id"] = department_id
+                obj["parent_department_id"] = parent_id
+                self.store.upsert_department(obj)
+        elif event_type == "contact.department.deleted_v3":
+            department_id = obj.get("department_id") or self._local_department_id(obj.get("open_department_id", ""))
+            if department_id:
+                self.store.delete_department(department_id)
+        else:
+            return False
+        return True
+
+    def _local_department_id(self, open_department_id: str) -> str | None:
+        """open_department_id 转为本地的 department_id，根部门为 "0"，本地没有时返回 None"""
+        if open_department_id in ("", "0"):
+            return "0" if open_department_id else None
+        return self.store.department_ids_by_open_id([open_department_id]).get(open_department_id)
+
+    def _local_department_ids(self, open_department_ids: list[str]) -> list[str] | None:
+        """批量转换，有任一部门本地没有时返回 None"""
+        ids = [dept_id for dept_id in open_department_ids if dept_id != "0"]
+        mapping = self.store.department_ids_by_open_id(ids)
+        if len(mapping) < len(set(ids)):
+            return None
+        return [mapping.get(dept_id, "0") for dept_id in open_department_ids]
+
+    def _invalidate_user_departments(self, open_id: str):
+        """用户加入了本地未知的部门：部门树与其原有部门的成员列表下次读取时重新拉取"""
+        self.store.invalidate(DEPARTMENTS_KEY)
+        for department_id in self.store.get_user_department_ids(open_id):
+            self.store.invalidate(department_users_key(department_id))
+
+    def close(self):
+        self.store.close()
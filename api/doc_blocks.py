@@ -0,0 +1,102 @@
+"""文档块构建：把纯文本或简单 Markdown 转换为 docx 块（段落、标题、列表、待办、引用、代码、分割线）"""
+
+import re
+
+BLOCK_TEXT = 2
+BLOCK_HEADING1 = 3  # heading1 ~ heading9 为 3 ~ 11
+BLOCK_BULLET = 12
+BLOCK_ORDERED = 13
+BLOCK_CODE = 14
+BLOCK_QUOTE = 15
+BLOCK_TODO = 17
+BLOCK_DIVIDER = 22
+
+CODE_LANGUAGE_PLAIN = 1  # 代码块语言：纯文本
+
+_HEADING = re.compile(r"^(#{1,9})\s+(.*)$")
+_TODO = re.compile(r"^[-*+]\s+\[([ xX])\]\s+(.*)$")
+_BULLET = re.compile(r"^[-*+]\s+(.*)$")
+_ORDERED = re.compile(r"^\d+[.)]\s+(.*)$")
+_QUOTE = re.compile(r"^>\s?(.*)$")
+_DIVIDER = re.compile(r"^(-{3,}|\*{3,}|_{3,})$")
+
+
+def _elements(text: str) -> list[dict]:
+    return [{"text_run": {"content": text}}]
+
+
+def text_block(text: str) -> dict:
+    return {"block_type": BLOCK_TEXT, "text": {"elements": _elements(text)}}
+
+
+def heading_block(text: str, level: int = 1) -> dict:
+    level = min(max(level, 1), 9)
+    return {"block_type": BLOCK_HEADING1 + level - 1, f"heading{level}": {"elements": _elements(text)}}
+
+
+def bullet_block(text: str) -> dict:
+    return {"block_type": BLOCK_BULLET, "bullet": {"elements": _elements(text)}}
+
+
+def ordered_block(text: str) -> dict:
+    return {"block_type": BLOCK_ORDERED, "ordered": {"elements": _elements(text)}}
+
+
+def quote_block(text: str) -> dict:
+    return {"block_type": BLOCK_QUOTE, "quote": {"elements": _elements(text)}}
+
+
+def todo_block(text: str, done: bool = False) -> dict:
+    return {"block_type": BLOCK_TODO, "todo": {"elements": _elements(text), "style": {"done": done}}}
+
+
+def code_block(code: str, language: int = CODE_LANGUAGE_PLAIN) -> dict:
+    return {"block_type": BLOCK_CODE, "code": {"elements": _elements(code), "style": {"language": language}}}
+
+
+def divider_block() -> dict:
+    return {"block_type": BLOCK_DIVIDER, "divider": {}}
+
+
+def text_blocks(content: str) -> list[dict]:
+    """纯文本：每行一个段落"""
+    return [text_block(line) for line in content.split("\n")]
+
+
+def markdown_blocks(content: str) -> list[dict]:
+    """
+    简单 Markdown：# 标题、- / * / + 无序列表、1. 有序列表、- [ ] 待办、> 引用、``` 代码块、--- 分割线，
+    其余每行一个段落（空行保留为空段落）。代码块整体作为一个块，语言统一为纯文本。
+    """
+    blocks = []
+    code_lines: list[str] | None = None  # 正在读取的代码块
+    for line in content.split("\n"):
+        stripped = line.strip()
+        if code_lines is not None:
+            if stripped.startswith("```"):
+                blocks.append(code_block("\n".join(code_lines)))
+                code_lines = None
+            else:
+                code_lines.append(line)
+            continue
+        if stripped.startswith("```"):
+            code_lines = []
+            continue
+
+        if match := _HEADING.match(stripped):
+            blocks.append(heading_block(match.group(2), len(match.group(1))))
+        elif _DIVIDER.match(stripped):
+            blocks.append(divider_block())
+        elif match := _TODO.match(stripped):
+            blocks.append(todo_block(match.group(2), match.group(1) != " "))
+        elif match := _BULLET.match(stripped):
+            blocks.append(bullet_block(match.group(1)))
+        elif match := _ORDERED.match(stripped):
+            blocks.append(ordered_block(match.group(1)))
+        elif match := _QUOTE.match(stripped):
+            blocks.append(quote_block(match.group(1)))
+        else:
+            blocks.append(text_block(line))
+    if code_lines is not None:
+        blocks.append(code_block("\n".join(code_lines)))  # 未闭合的代码块
+    return blocks
@@ -1,7 +1,32 @@
 """飞书文档 API 封装"""
 
 import json
+import time
+from typing import Callable
+from uuid import NAMESPACE_URL, uuid4, uuid5
+
 from api.auth import FeishuAuth
+from api.async_auth import AsyncFeishuAuth
+from api.doc_blocks import markdown_blocks, text_blocks
+from api.paginator import acollect, apaginate, paginate
+
+CHILDREN_BATCH_LIMIT = 50  # 创建子块接口每次最多 50 个子块
+
+
+def _batch_client_token(write_id: str, batch: int) -> str:
+    """同一次写入中第 batch 批的去重键，重发同一批时服务端不会重复创建"""
+    return str(uuid5(NAMESPACE_URL, f"{write_id}:{batch}"))
+
+
+def _write_report(blocks: int, batches: int, revision: int, started: float) -> dict:
+    elapsed = time.time() - started
+    return {
+        "blocks": blocks,
+        "batches": batches,
+        "document_revision_id": revision,
+        "elapsed": round(elapsed, 3),
+        "blocks_per_sec": round(blocks / elapsed, 1) if elapsed > 0 else 0.0,
+    }
 
 
 class DocumentsAPI:
@@ -32,19 +57,7 @@ class DocumentsAPI:
 
     def get_all_files(self, folder_token: str = "") -> list[dict]:
         """获取所有文件（自动分页）"""
-        all_files = []
-        page_token = ""
-
-        while True:
-            data = self.list_files(folder_token, page_token)
-            items = data.get("data", {}).get("files", [])
-            all_files.extend(items)
-
-            if not data.get("data", {}).get("has_more", False):
-                break
-            page_token = data.get("data", {}).get("next_page_token", "")
-
-        return all_files
+        return list(paginate(lambda page_token: self.list_files(folder_token, page_token), "files"))
 
     def get_document_content(self, document_id: str, page_token: str = "") -> dict:
         """
@@ -99,7 +112,7 @@ class DocumentsAPI:
         if docs_token:
             payload["docs_token"] = docs_token
 
-        return self.auth.request("POST", "/suite/docs-api/search/object", json=payload)
+        return self.auth.request("POST", "/suite/docs-api/search/object", json=payload, idempotent=True)
 
     def get_file_meta(self, file_token: str, file_type: str) -> dict:
         """
@@ -137,13 +150,15 @@ class DocumentsAPI:
             payload["folder_token"] = folder_token
         return self.auth.request("POST", "/docx/v1/documents", json=payload)
 
-    def create_document_with_content(self, title: str, content: str, folder_token: str = "") -> dict:
+    def create_document_with_content(self, title: str, content: str, folder_token: str = "",
+                                     markdown: bool = False) -> dict:
         """
         创建文档并写入文本内容
 
         :param title: 文档标题
         :param content: 文本内容（多行会自动按行创建文本块）
         :param folder_token: 目标文件夹 token
+        :param markdown: 按简单 Markdown 解析标题、列表、代码块等
         :return: 包含 document_id 和 url 的结果
         """
         # 1. 创建文档
@@ -154,7 +169,7 @@ class DocumentsAPI:
 
         # 2. 写入内容
         if content:
-            self._append_text_blocks(doc_id, content)
+            self._append_text_blocks(doc_id, content, markdown)
 
         return {
             "code": 0,
@@ -165,42 +180,83 @@ class DocumentsAPI:
             },
         }
 
-    def append_content(self, document_id: str, content: str) -> dict:
+    def append_content(self, document_id: str, content: str, markdown: bool = False) -> dict:
         """
         向文档追加文本内容
 
         :param document_id: 文档 ID
         :param content: 要追加的文本内容
-        :return: API 响应数据
+        :param markdown: 按简单 Markdown 解析标题、列表、代码块等
+        :return: 写入报告，见 append_blocks
         """
-        return self._append_text_blocks(document_id, content)
+        return self._append_text_blocks(document_id, content, markdown)
 
-    def _append_text_blocks(self, document_id: str, content: str) -> dict:
+    def _append_text_blocks(self, document_id: str, content: str, markdown: bool = False) -> dict:
         """
-        向文档追加文本块（每行一个段落）
+        向文档追加文本块（默认每行一个段落）
 
         :param document_id: 文档 ID
         :param content: 文本内容
-        :return: API 响应数据
+        :param markdown: 按简单 Markdown 解析
+        :return: 写入报告，见 append_blocks
+        """
+        blocks = markdown_blocks(content) if markdown else text_blocks(content)
+        return self.append_blocks(document_id, blocks)
+
+    def create_children(self, document_id: str, block_id: str, children: list[dict], index: int = -1,
+                        document_revision_id: int = -1, client_token: str = "") -> dict:
+        """
+        在指定块下创建子块（每次最多 50 个）
+
+        :param document_id: 文档 ID
+        :param block_id: 父块 ID，文档根块的 ID 即 document_id
+        :param children: 子块列表
+        :param index: 插入位置，-1 表示追加到末尾
+        :param document_revision_id: 基于的文档版本，-1 表示最新版本
+        :param client_token: 去重键，带上时重发请求不会重复创建
+        :return: API 响应数据（含 children 与新的 document_revision_id）
         """
-        children = []
-        for line in content.split("\n"):
-            children.append({
-                "block_type": 2,  # text block
-                "text": {
-                    "elements": [
-                        {"text_run": {"content": line}}
-                    ]
-                },
-            })
-
-        payload = {"children": children}
+        params = {"document_revision_id": document_revision_id}
+        if client_token:
+            params["client_token"] = client_token
         return self.auth.request(
             "POST",
-            f"/docx/v1/documents/{document_id}/blocks/{document_id}/children",
-            json=payload,
+            f"/docx/v1/documents/{document_id}/blocks/{block_id}/children",
+            idempotent=bool(client_token),
+            params=params,
+            json={"children": children, "index": index},
         )
 
+    def append_blocks(self, document_id: str, blocks: list[dict], block_id: str = "",
+                      on_progress: Callable[[int, int], None] | None = None) -> dict:
+        """
+        按顺序追加任意数量的块
+
+        按接口上限每 50 个一批依次提交，每批基于上一批返回的文档版本，保证块的先后顺序；
+        每批带固定的去重键，超时重发不会重复创建。该接口按应用限频，批次之间由频控器排队。
+
+        :param document_id: 文档 ID
+        :param blocks: 块列表（见 api/doc_blocks.py）
+        :param block_id: 父块 ID，默认为文档根块
+        :param on_progress: 每批完成后回调 (已写入块数, 总块数)
+        :return: {"blocks", "batches", "document_revision_id", "elapsed", "blocks_per_sec"}
+        """
+        block_id = block_id or document_id
+        write_id = uuid4().hex
+        started = time.time()
+        revision = -1
+        batches = 0
+        for start in range(0, len(blocks), CHILDREN_BATCH_LIMIT):
+            result = self.create_children(
+                document_id, block_id, blocks[start:start + CHILDREN_BATCH_LIMIT],
+                document_revision_id=revision, client_token=_batch_client_token(write_id, batches),
+            )
+            revision = result.get("data", {}).get("document_revision_id", -1)
+            batches += 1
+            if on_progress is not None:
+                on_progress(min(start + CHILDREN_BATCH_LIMIT, len(blocks)), len(blocks))
+        return _write_report(len(blocks), batches, revision, started)
+
     def get_document_blocks(self, document_id: str, page_token: str = "") -> dict:
         """
         获取文档的所有块（分页）
@@ -226,19 +282,7 @@ class DocumentsAPI:
         :param document_id: 文档 ID
         :return: 块列表
         """
-        all_blocks = []
-        page_token = ""
-
-        while True:
-            data = self.get_document_blocks(document_id, page_token)
-            items = data.get("data", {}).get("items", [])
-            all_blocks.extend(items)
-
-            if not data.get("data", {}).get("has_more", False):
-                break
-            page_token = data.get("data", {}).get("page_token", "")
-
-        return all_blocks
+        return list(paginate(lambda page_token: self.get_document_blocks(document_id, page_token)))
 
     def delete_block(self, document_id: str, block_id: str) -> dict:
         """
@@ -253,3 +297,66 @@ class DocumentsAPI:
             f"/docx/v1/documents/{document_id}/blocks/{block_id}",
             params={"document_revision_id": -1},
         )
+
+
+class AsyncDocumentsAPI(DocumentsAPI):
+    """
+    文档接口的异步版本，需配合 AsyncFeishuAuth 使用。
+
+    单次请求的方法直接复用 DocumentsAPI（返回值需 await），这里只重写串联多次请求的方法。
+    """
+
+    def __init__(self, auth: AsyncFeishuAuth):
+        super().__init__(auth)
+
+    async def get_all_files(self, folder_token: str = "") -> list[dict]:
+        """获取所有文件（自动分页）"""
+        return await acollect(apaginate(lambda page_token: self.list_files(folder_token, page_token), "files"))
+
+    async def create_document_with_content(self, title: str, content: str, folder_token: str = "",
+                                           markdown: bool = False) -> dict:
+        """创建文档并写入文本内容"""
+        result = await self.create_document(title, folder_token)
+        doc_id = result.get("data", {}).get("document", {}).get("document_id", "")
+        if not doc_id:
+            return result
+
+        if content:
+            await self._append_text_blocks(doc_id, content, markdown)
+
+        return {
+            "code": 0,
+            "data": {
+                "document_id": doc_id,
+                "url": f"https://feishu.cn/docx/{doc_id}",
+                "title": title,
+            },
+        }
+
+    async def _append_text_blocks(self, document_id: str, content: str, markdown: bool = False) -> dict:
+        """向文档追加文本块（默认每行一个段落）"""
+        blocks = markdown_blocks(content) if markdown else text_blocks(content)
+        return await self.append_blocks(document_id, blocks)
+
+    async def append_blocks(self, document_id: str, blocks: list[dict], block_id: str = "",
+                            on_progress: Callable[[int, int], None] | None = None) -> dict:
+        """按顺序追加任意数量的块，见 DocumentsAPI.append_blocks"""
+        block_id = block_id or document_id
+        write_id = uuid4().hex
+        started = time.time()
+        revision = -1
+        batches = 0
+        for start in range(0, len(blocks), CHILDREN_BATCH_LIMIT):
+            result = await self.create_children(
+                document_id, block_id, blocks[start:start + CHILDREN_BATCH_LIMIT],
+                document_revision_id=revision, client_token=_batch_client_token(write_id, batches),
+            )
+            revision = result.get("data", {}).get("document_revision_id", -1)
+            batches += 1
+            if on_progress is not None:
+                on_progress(min(start + CHILDREN_BATCH_LIMIT, len(blocks)), len(blocks))
+        return _write_report(len(blocks), batches, revision, started)
+
+    async def get_all_blocks(self, document_id: str) -> list[dict]:
+        """获取文档所有块（自动分页）"""
+        return await acollect(apaginate(lambda page_token: self.get_document_blocks(document_id, page_token)))
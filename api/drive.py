@@ -1,6 +1,9 @@
 """飞书云盘 (Drive) API 封装 —— 文件夹管理与权限管理"""
 
+import asyncio
+
 from api.auth import FeishuAuth
+from api.async_auth import AsyncFeishuAuth
 
 
 class DriveAPI:
@@ -246,3 +249,47 @@ class DriveAPI:
             json=settings,
             params={"type": doc_type},
         )
+
+
+class AsyncDriveAPI(DriveAPI):
+    """
+    云盘接口的异步版本，需配合 AsyncFeishuAuth 使用。
+
+    单次请求的方法直接复用 DriveAPI（返回值需 await），这里只重写串联多次请求的方法。
+    """
+
+    def __init__(self, auth: AsyncFeishuAuth):
+        super().__init__(auth)
+
+    async def get_root_folder_token(self) -> str:
+        """返回根文件夹 token"""
+        data = await self.get_root_folder_meta()
+        return data.get("data", {}).get("token", "")
+
+    async def create_folder(self, name: str, parent_token: str = "") -> dict:
+        """创建文件夹，parent_token 为空则在根目录"""
+        if not parent_token:
+            parent_token = await self.get_root_folder_token()
+        return await super().create_folder(name, parent_token)
+
+    async def batch_add_permissions(
+        self,
+        token: str,
+        doc_type: str,
+        member_ids: list[str],
+        member_type: str = "openid",
+        perm: str = "view",
+    ) -> list[dict]:
+        """批量添加权限（并发调用），结果顺序与 member_ids 一致"""
+
+        async def add_one(mid: str) -> dict:
+            try:
+                result = await self.add_permission(
+                    token, doc_type, mid,
+                    member_type=member_type, perm=perm, notify=False,
+                )
+                return {"member_id": mid, "success": True, "data": result}
+            except Exception as e:
+                return {"member_id": mid, "success": False, "error": str(e)}
+
+        return list(await asyncio.gather(*(add_one(mid) for mid in member_ids)))
@@ -0,0 +1,366 @@
+"""
+事件接收：以 HTTP 回调或长连接方式接收飞书事件推送，校验后投递到 EventBus
+
+- HTTP 回调：本地起一个 HTTP 服务作为开放平台“请求地址”，处理 URL 校验、
+  Verification Token 校验、签名校验与 Encrypt Key 解密（解密需要安装 cryptography）
+- 长连接：通过 lark-oapi 的 WebSocket 客户端接收事件，无需公网地址（需要安装 lark-oapi）
+- EventReplayer：把录制的事件按开放平台的格式（加密、签名）推送到本地 HTTP 回调，用于离线测试
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from api.events import EventBus, event_type_of, load_events
+
+try:
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:  # cryptography 为可选依赖，仅配置了 Encrypt Key 时需要
+    Cipher = None
+
+try:
+    import lark_oapi as lark
+    from lark_oapi.ws import client as lark_ws_client
+except ImportError:  # lark-oapi 为可选依赖，仅长连接模式需要
+    lark = None
+
+EVENT_HOST = "127.0.0.1"
+EVENT_PORT = 9000
+EVENT_PATH = "/webhook/event"
+LONG_CONNECTION_STOP_TIMEOUT = 5  # 断开长连接的最长等待（秒）
+MAX_EVENT_BODY = 1024 * 1024  # 单个事件请求体上限（字节）
+EVENT_MAX_AGE = 300  # 请求时间戳与本机时间允许的最大偏差（秒），超出视为重放
+
+
+# ── 校验与加解密 ──────────────────────────
+
+def _aes_key(encrypt_key: str) -> bytes:
+    return hashlib.sha256(encrypt_key.encode()).digest()
+
+
+def decrypt_event(encrypt_key: str, encrypted: str) -> dict:
+    """
+    解密 {"encrypt": ...} 形式的事件（AES-256-CBC，密钥为 Encrypt Key 的 SHA256，前 16 字节为 IV）
+
+    :return: 解密后的事件
+    """
+    if Cipher is None:
+        raise ImportError("解密事件需要安装 cryptography: pip install cryptography")
+    data = base64.b64decode(encrypted)
+    decryptor = Cipher(algorithms.AES(_aes_key(encrypt_key)), modes.CBC(data[:16])).decryptor()
+    padded = decryptor.update(data[16:]) + decryptor.finalize()
+    unpadder = padding.PKCS7(128).unpadder()
+    return json.loads(unpadder.update(padded) + unpadder.finalize())
+
+
+def encrypt_event(encrypt_key: str, payload: dict) -> str:
+    """decrypt_event 的逆过程，供 EventReplayer 模拟开放平台推送"""
+    if Cipher is None:
+        raise ImportError("加密事件需要安装 cryptography: pip install cryptography")
+    iv = secrets.token_bytes(16)
+    padder = padding.PKCS7(128).padder()
+    padded = padder.update(json.dumps(payload, ensure_ascii=False).encode()) + padder.finalize()
+    encryptor = Cipher(algorithms.AES(_aes_key(encrypt_key)), modes.CBC(iv)).encryptor()
+    return base64.b64encode(iv + encryptor.update(padded) + encryptor.finalize()).decode()
+
+
+def event_signature(timestamp: str, nonce: str, encrypt_key: str, body: bytes) -> str:
+    """请求签名：sha256(timestamp + nonce + encrypt_key + body)"""
+    return hashlib.sha256((timestamp + nonce + encrypt_key).encode() + body).hexdigest()
+
+
+def _timestamp_fresh(timestamp: str) -> bool:
+    """请求头中的时间戳（秒）与本机时间相差不超过 EVENT_MAX_AGE"""
+    try:
+        return abs(time.time() - int(timestamp)) <= EVENT_MAX_AGE
+    except ValueError:
+        return False
+
+
+def _event_token(payload: dict) -> str:
+    header = payload.get("header")
+    return header.get("token", "") if header else payload.get("token", "")
+
+
+# ── HTTP 回调 ──────────────────────────
+
+class EventReceiver:
+    """
+    HTTP 回调方式的事件接收服务
+
+    在开放平台“事件订阅”中把请求地址配置为指向本服务（通常经反向代理或内网穿透）。
+    每个请求校验通过后立即返回 200，事件交给 EventBus.post 在后台分发，
+    避免处理耗时导致开放平台超时重推。
+    Verification Token 与 Encrypt Key 至少配置一个，否则任何本机进程都能伪造事件；
+    请求时间戳偏离本机时间超过 EVENT_MAX_AGE 的一律拒绝，窗口内的重放由 EventBus 按 event_id 去重。
+    只有配置了 Encrypt Key 时时间戳才在签名范围内。
+    """
+
+    def __init__(self, bus: EventBus, verification_token: str = "", encrypt_key: str = "",
+                 host: str = EVENT_HOST, port: int = EVENT_PORT, path: str = EVENT_PATH):
+        """
+        :param bus: 事件总线
+        :param verification_token: 开放平台的 Verification Token，为空时不校验
+        :param encrypt_key: 开放平台的 Encrypt Key，配置后校验签名并解密；与 verification_token 不能都为空
+        :param host: 监听地址
+        :param port: 监听端口，0 表示随机端口
+        :param path: 回调路径
+        """
+        self.bus = bus
+        self.verification_token = verification_token
+        self.encrypt_key = encrypt_key
+        self.host = host
+        self.port = port
+        self.path = path
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+        self.received = 0
+        self.rejected = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}{self.path}"
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    def handle(self, headers: dict, body: bytes) -> tuple[int, dict]:
+        """
+        处理一次回调请求（与 HTTP 服务解耦，便于直接调用）
+
+        :param headers: 请求头（键不区分大小写时请先转为小写）
+        :param body: 请求体
+        :return: (HTTP 状态码, 响应 JSON)
+        """
+        try:
+            payload = json.loads(body)
+            if not isinstance(payload, dict):
+                raise Exception("事件不是 JSON 对象")
+            if "encrypt" in payload:
+                if not self.encrypt_key:
+                    raise Exception("收到加密事件，但未配置 Encrypt Key")
+                payload = decrypt_event(self.encrypt_key, payload["encrypt"])
+        except Exception as e:
+            self.rejected += 1
+            return 400, {"msg": f"无法解析事件: {e}"}
+
+        if self.verification_token and not hmac.compare_digest(_event_token(payload), self.verification_token):
+            self.rejected += 1
+            return 401, {"msg": "Verification Token 不匹配"}
+
+        # 配置 URL 时的校验请求，不带签名头
+        if payload.get("type") == "url_verification":
+            return 200, {"challenge": payload.get("challenge", "")}
+
+        timestamp = headers.get("x-lark-request-timestamp", "")
+        if not _timestamp_fresh(timestamp):
+            self.rejected += 1
+            return 401, {"msg": "请求时间戳无效或已过期"}
+
+        if self.encrypt_key:
+            nonce = headers.get("x-lark-request-nonce", "")
+            expected = event_signature(timestamp, nonce, self.encrypt_key, body)
+            if not hmac.compare_digest(headers.get("x-lark-signature", ""), expected):
+                self.rejected += 1
+                return 401, {"msg": "签名校验失败"}
+
+        self.received += 1
+        self.bus.post(payload)
+        return 200, {}
+
+    def start(self):
+        """在后台线程启动 HTTP 服务"""
+        if self._server is not None:
+            return
+        if not self.verification_token and not self.encrypt_key:
+            raise Exception("HTTP 回调需要配置 Verification Token 或 Encrypt Key，否则任何本机进程都能伪造事件")
+        if self.encrypt_key and Cipher is None:
+            raise ImportError("配置了 Encrypt Key 时需要安装 cryptography: pip install cryptography")
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.split("?", 1)[0] != receiver.path:
+                    self._reply(404, {"msg": "not found"})
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_EVENT_BODY:
+                    self._reply(413, {"msg": "请求体过大"})
+                    return
+                body = self.rfile.read(length)
+                headers = {k.lower(): v for k, v in self.headers.items()}
+                self._reply(*receiver.handle(headers, body))
+
+            def _reply(self, status: int, data: dict):
+                raw = json.dumps(data, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="event-receiver")
+        self._thread.start()
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+
+# ── 长连接 ──────────────────────────
+
+class LongConnectionReceiver:
+    """
+    长连接方式的事件接收（基于 lark-oapi 的 WebSocket 客户端）
+
+    需在开放平台把订阅方式设为“使用长连接接收事件”。连接由 SDK 维护并自动重连，
+    事件已由 SDK 完成解密与校验，这里转成与 HTTP 回调相同的结构后投递到 EventBus。
+    SDK 的客户端共用一个模块级事件循环，同一进程只能运行一个客户端，所以应在各次认证间复用同一个实例：
+    stop() 关闭自动重连并断开 WebSocket（事件循环线程保留），再次 start() 时按当前 app_id/app_secret 重新连接。
+    SDK 没有公开的断开与重连接口，这里调用的是其内部方法。
+    """
+
+    def __init__(self, bus: EventBus, app_id: str, app_secret: str, event_types: list[str] | None = None):
+        """
+        :param bus: 事件总线
+        :param app_id: 应用 App ID
+        :param app_secret: 应用 App Secret
+        :param event_types: 接收的事件类型，默认为 bus 上已订阅的类型
+        """
+        self.bus = bus
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.event_types = event_types
+        self._client = None
+        self._thread: threading.Thread | None = None
+        self._stopped = False
+        self.received = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._stopped
+
+    def start(self):
+        if lark is None:
+            raise ImportError("长连接模式需要安装 lark-oapi: pip install lark-oapi")
+        if self._thread is not None:
+            if self._stopped:
+                self._stopped = False
+                self._client._app_id = self.app_id
+                self._client._app_secret = self.app_secret
+                self._client._auto_reconnect = True
+                asyncio.run_coroutine_threadsafe(self._client._connect(), lark_ws_client.loop)
+            return
+        event_types = self.event_types or self.bus.event_types()
+        if not event_types:
+            raise Exception("没有要接收的事件类型，请先在 EventBus 上订阅")
+
+        builder = lark.EventDispatcherHandler.builder("", "")
+        for event_type in event_types:
+            builder.register_p2_customized_event(event_type, self._on_event)
+        self._client = lark.ws.Client(self.app_id, self.app_secret, event_handler=builder.build(),
+                                      log_level=lark.LogLevel.WARNING)
+        self._thread = threading.Thread(target=self._client.start, daemon=True, name="event-long-connection")
+        self._thread.start()
+
+    def _on_event(self, data):
+        if self._stopped:
+            return
+        self.received += 1
+        self.bus.post(json.loads(lark.JSON.marshal(data)))
+
+    def stop(self):
+        """关闭自动重连并断开 WebSocket；断开前到达的事件也会被丢弃"""
+        if self._thread is None or self._stopped:
+            return
+        self._stopped = True
+        self._client._auto_reconnect = False
+        future = asyncio.run_coroutine_threadsafe(self._client._disconnect(), lark_ws_client.loop)
+        try:
+            future.result(LONG_CONNECTION_STOP_TIMEOUT)
+        except Exception:
+            future.cancel()
+
+
+# ── 离线回放 ──────────────────────────
+
+class EventReplayer:
+    """
+    模拟开放平台向 HTTP 回调推送事件：按录制文件逐个 POST，
+    配置了 Encrypt Key 时与开放平台一样加密并签名，可以离线验证整条接收链路
+    """
+
+    def __init__(self, url: str, verification_token: str = "", encrypt_key: str = ""):
+        """
+        :param url: EventReceiver.url
+        :param verification_token: 写入事件的 Verification Token
+        :param encrypt_key: Encrypt Key，为空时发送明文
+        """
+        self.url = url
+        self.verification_token = verification_token
+        self.encrypt_key = encrypt_key
+
+    def send(self, payload: dict) -> requests.Response:
+        payload = json.loads(json.dumps(payload))
+        if self.verification_token:
+            if payload.get("header"):
+                payload["header"]["token"] = self.verification_token
+            else:
+                payload["token"] = self.verification_token
+        if self.encrypt_key:
+            body = json.dumps({"encrypt": encrypt_event(self.encrypt_key, payload)}).encode()
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode()
+
+        timestamp = str(int(time.time()))
+        nonce = os.urandom(8).hex()
+        headers = {
+            "Content-Type": "application/json; charset=utf-8",
+            "X-Lark-Request-Timestamp": timestamp,
+            "X-Lark-Request-Nonce": nonce,
+        }
+        if self.encrypt_key:
+            headers["X-Lark-Signature"] = event_signature(timestamp, nonce, self.encrypt_key, body)
+        return requests.post(self.url, data=body, headers=headers, timeout=10)
+
+    def replay(self, path: str, interval: float = 0) -> dict:
+        """
+        推送录制文件中的全部事件
+
+        :param path: EventBus.set_recorder 录制的 JSONL 文件
+        :param interval: 相邻两个事件的间隔（秒）
+        :return: {"sent": 推送数, "failed": 未返回 200 的数量, "types": {事件类型: 数量}}
+        """
+        report = {"sent": 0, "failed": 0, "types": {}}
+        for payload in load_events(path):
+            resp = self.send(payload)
+            report["sent"] += 1
+            if resp.status_code != 200:
+                report["failed"] += 1
+            event_type = event_type_of(payload)
+            report["types"][event_type] = report["types"].get(event_type, 0) + 1
+            if interval:
+                time.sleep(interval)
+        return report
@@ -0,0 +1,187 @@
+"""事件总线：事件订阅接收到的飞书事件在进程内分发给各模块，可录制为 JSONL 并回放"""
+
+import json
+import queue
+import threading
+from collections import deque
+from typing import Callable, Iterator
+
+ALL_EVENTS = "*"  # 订阅全部事件
+EVENT_DEDUPE_SIZE = 10000  # 记住最近多少个 event_id 用于去重
+
+EventHandler = Callable[[str, dict], None]
+
+
+def event_type_of(payload: dict) -> str:
+    """事件类型：2.0 版本在 header.event_type，1.0 版本在 event.type"""
+    header = payload.get("header")
+    if header:
+        return header.get("event_type", "")
+    return (payload.get("event") or {}).get("type", "")
+
+
+def event_id_of(payload: dict) -> str:
+    """事件 ID：2.0 版本在 header.event_id，1.0 版本为 uuid"""
+    header = payload.get("header")
+    if header:
+        return header.get("event_id", "")
+    return payload.get("uuid", "")
+
+
+class EventBus:
+    """
+    进程内事件总线（线程安全）
+
+    订阅者按事件类型注册 handler(event_type, event)，event 为事件体（header 之外的 event 字段），
+    与 DirectoryCache.apply_event 等方法的签名一致，可直接注册。
+
+    飞书在未及时收到响应时会重复推送同一事件，总线按 event_id 去重，每个事件只分发一次。
+    publish() 在调用线程内同步分发；post() 放入队列由后台线程按顺序分发，接收端可以立即响应。
+    handler 抛出的异常不会影响其他订阅者，计入 errors 并交给 on_error。
+    """
+
+    def __init__(self, dedupe_size: int = EVENT_DEDUPE_SIZE,
+                 on_error: Callable[[str, Exception], None] | None = None):
+        """
+        :param dedupe_size: 记住的最近 event_id 数
+        :param on_error: handler 出错时回调 (事件类型, 异常)，在分发线程中调用
+        """
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        self._handlers: dict[str, list[EventHandler]] = {}
+        self._seen: set[str] = set()
+        self._seen_order: deque[str] = deque(maxlen=dedupe_size)
+        self._recorder = None
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self.published = 0
+        self.duplicates = 0
+        self.errors = 0
+
+    # ── 订阅 ──────────────────────────
+
+    def subscribe(self, event_type: str, handler: EventHandler) -> Callable[[], None]:
+        """
+        订阅事件
+
+        :param event_type: 事件类型，如 im.message.receive_v1；ALL_EVENTS 订阅全部
+        :param handler: 回调 (事件类型, 事件体)，在分发线程中调用
+        :return: 取消订阅的函数
+        """
+        with self._lock:
+            self._handlers.setdefault(event_type, []).append(handler)
+        return lambda: self.unsubscribe(event_type, handler)
+
+    def unsubscribe(self, event_type: str, handler: EventHandler):
+        with self._lock:
+            handlers = self._handlers.get(event_type, [])
+            if handler in handlers:
+                handlers.remove(handler)
+            if not handlers:
+                self._handlers.pop(event_type, None)
+
+    def event_types(self) -> list[str]:
+        """已订阅的具体事件类型（不含 ALL_EVENTS），长连接模式据此注册"""
+        with self._lock:
+            return [t for t in self._handlers if t != ALL_EVENTS]
+
+    # ── 分发 ──────────────────────────
+
+    def publish(self, payload: dict) -> bool:
+        """
+        在当前线程分发一个事件
+
+        :param payload: 完整的事件（含 schema / header / event）
+        :return: 是否分发（重复的事件返回 False）
+        """
+        event_id = event_id_of(payload)
+        event_type = event_type_of(payload)
+        with self._lock:
+            if event_id:
+                if event_id in self._seen:
+                    self.duplicates += 1
+                    return False
+                if len(self._seen_order) == self._seen_order.maxlen:
+                    self._seen.discard(self._seen_order[0])
+                self._seen_order.append(event_id)
+                self._seen.add(event_id)
+            self.published += 1
+            handlers = self._handlers.get(event_type, []) + self._handlers.get(ALL_EVENTS, [])
+            if self._recorder is not None:
+                self._recorder.write(json.dumps(payload, ensure_ascii=False) + "\n")
+                self._recorder.flush()
+
+        event = payload.get("event") or {}
+        for handler in handlers:
+            try:
+                handler(event_type, event)
+            except Exception as e:
+                self.errors += 1
+                if self.on_error is not None:
+                    self.on_error(event_type, e)
+        return True
+
+    def post(self, payload: dict):
+        """放入分发队列，由后台线程按接收顺序分发（接收端调用，不阻塞响应）"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch_loop, daemon=True, name="event-bus")
+                self._thread.start()
+        self._queue.put(payload)
+
+    def _dispatch_loop(self):
+        while True:
+            payload = self._queue.get()
+            try:
+                if payload is None:
+                    return
+                self.publish(payload)
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """等待队列中的事件全部分发完成"""
+        self._queue.join()
+
+    def close(self):
+        """停止后台分发线程并关闭录制文件"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+        self.set_recorder(None)
+
+    def stats(self) -> dict:
+        return {"published": self.published, "duplicates": self.duplicates, "errors": self.errors,
+                "pending": self._queue.qsize()}
+
+    # ── 录制与回放 ──────────────────────────
+
+    def set_recorder(self, path: str | None):
+        """
+        把之后分发的每个事件追加写入 JSONL 文件，用 replay_events 回放；传 None 停止录制
+
+        :param path: 录制文件路径
+        """
+        with self._lock:
+            if self._recorder is not None:
+                self._recorder.close()
+            self._recorder = open(path, "a", encoding="utf-8") if path else None
+
+
+def load_events(path: str) -> Iterator[dict]:
+    """逐个读取录制文件中的事件"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def replay_events(path: str, bus: EventBus) -> int:
+    """
+    把录制的事件重新分发到事件总线（同步）
+
+    :return: 分发的事件数（不含重复事件）
+    """
+    return sum(1 for payload in load_events(path) if bus.publish(payload))
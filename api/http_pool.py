@@ -0,0 +1,110 @@
+"""HTTP 连接池：所有 API 调用共享 keep-alive 连接，并统计连接复用情况"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class PoolStats:
+    """连接池计数器（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.new_connections = 0  # 需要新建 TCP/TLS 连接的请求数
+        self.reused_connections = 0  # 复用已有 keep-alive 连接的请求数
+        self.expired_connections = 0  # 因空闲超时被主动关闭的连接数
+
+    def record(self, reused: bool, expired: bool = False):
+        with self._lock:
+            if reused:
+                self.reused_connections += 1
+            else:
+                self.new_connections += 1
+            if expired:
+                self.expired_connections += 1
+
+    def reset(self):
+        with self._lock:
+            self.new_connections = 0
+            self.reused_connections = 0
+            self.expired_connections = 0
+
+    def snapshot(self) -> dict:
+        """返回当前计数的快照"""
+        with self._lock:
+            total = self.new_connections + self.reused_connections
+            return {
+                "requests": total,
+                "new_connections": self.new_connections,
+                "reused_connections": self.reused_connections,
+                "expired_connections": self.expired_connections,
+                "reuse_ratio": self.reused_connections / total if total else 0.0,
+            }
+
+
+class _CountingPoolMixin:
+    """
+    挂在 urllib3 连接池上的计数逻辑。
+
+    取出连接时 sock 仍存在即为复用；超过空闲时间的连接先关闭再交给 urllib3 重连，
+    避免使用已被服务端悄悄断开的长连接。
+    """
+
+    stats: PoolStats = None
+    idle_timeout: float = 0
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        expired = False
+        if getattr(conn, "sock", None) is not None and self.idle_timeout:
+            last_used = getattr(conn, "_feishu_last_used", None)
+            if last_used is not None and time.monotonic() - last_used > self.idle_timeout:
+                conn.close()
+                expired = True
+        self.stats.record(reused=getattr(conn, "sock", None) is not None, expired=expired)
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn._feishu_last_used = time.monotonic()
+        super()._put_conn(conn)
+
+
+class PooledAdapter(HTTPAdapter):
+    """带计数与空闲超时的 HTTPAdapter"""
+
+    def __init__(self, stats: PoolStats, pool_connections: int = 10, pool_maxsize: int = 20,
+                 idle_timeout: float = 60.0):
+        # HTTPAdapter.__init__ 内部会调用 init_poolmanager，需先设置属性
+        self._stats = stats
+        self._idle_timeout = idle_timeout
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {"stats": self._stats, "idle_timeout": self._idle_timeout}
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("CountingHTTPConnectionPool", (_CountingPoolMixin, HTTPConnectionPool), attrs),
+            "https": type("CountingHTTPSConnectionPool", (_CountingPoolMixin, HTTPSConnectionPool), attrs),
+        }
+
+
+def create_session(stats: PoolStats, pool_connections: int = 10, pool_maxsize: int = 20,
+                   idle_timeout: float = 60.0) -> requests.Session:
+    """
+    创建挂载连接池的 requests.Session
+
+    :param stats: 连接计数器
+    :param pool_connections: 缓存的主机连接池数量
+    :param pool_maxsize: 每个主机的最大连接数
+    :param idle_timeout: keep-alive 连接的最大空闲秒数，0 表示不限制
+    :return: Session 实例
+    """
+    session = requests.Session()
+    adapter = PooledAdapter(stats, pool_connections, pool_maxsize, idle_timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
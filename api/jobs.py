@@ -0,0 +1,187 @@
+"""批量任务：并发执行大量独立条目，逐条记录结果到任务日志，进程中断后可从日志继续"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from utils.config_manager import data_file
+
+JOBS_DIR = data_file("jobs")
+JOB_WORKERS = 16  # 同时执行的条目数，实际速率由 auth 的频控器控制
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+
+def new_job_path(kind: str) -> str:
+    """为新任务生成日志路径：jobs/<类型>-<时间>-<随机串>.jsonl"""
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    name = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}.jsonl"
+    return os.path.join(JOBS_DIR, name)
+
+
+class JobJournal:
+    """
+    任务日志（JSON Lines，只追加）
+
+    首行是任务描述 {"job": {...}, "items": [...]}，之后每行是一个条目的结果
+    {"key": ..., "status": "ok" | "failed", ...}。每条结果写入后立即 flush，
+    进程崩溃最多丢失正在执行的条目，恢复时这些条目会重新执行。
+    """
+
+    def __init__(self, path: str, job: dict, items: list[dict], results: dict[str, dict]):
+        self.path = path
+        self.job = job
+        self.items = items
+        self.results = results  # key -> 最后一次结果
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    @classmethod
+    def create(cls, path: str, job: dict, items: list[dict]) -> "JobJournal":
+        """
+        新建任务日志
+
+        :param path: 日志文件路径
+        :param job: 任务描述（类型、参数等），恢复任务时原样取回
+        :param items: 条目列表，每个条目必须有唯一的 "key"
+        """
+        keys = [item["key"] for item in items]
+        if len(set(keys)) != len(keys):
+            raise Exception("任务条目的 key 不能重复")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"job": job, "items": items}, ensure_ascii=False) + "\n")
+        return cls(path, job, items, {})
+
+    @classmethod
+    def load(cls, path: str) -> "JobJournal":
+        """
+        读取已有任务日志
+
+        崩溃时写了一半的末行会从文件中截掉，否则之后追加的结果会接在这半行后面，
+        下次读取时连同新结果一起被丢弃；该条目保持待执行状态，恢复时重新执行。
+        """
+        with open(path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                f.truncate(end)
+        lines = data[:end].decode("utf-8").splitlines()
+        if not lines:
+            raise Exception(f"任务日志缺少任务描述: {path}")
+        header = json.loads(lines[0])
+        results = {}
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results[record["key"]] = record
+        return cls(path, header["job"], header["items"], results)
+
+    def pending_items(self, retry_failed: bool = False) -> list[dict]:
+        """尚未完成的条目；retry_failed 为 True 时包括失败的条目"""
+        done = {STATUS_OK} if retry_failed else {STATUS_OK, STATUS_FAILED}
+        return [item for item in self.items if self.results.get(item["key"], {}).get("status") not in done]
+
+    def record(self, key: str, result: dict):
+        record = {"key": key, **result}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.results[key] = record
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "JobJournal":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JobRunner:
+    """
+    并发执行任务条目
+
+    handler 接收一个条目，返回结果字典（可带 "status"，默认成功）；抛出异常视为失败，
+    异常信息记入结果。cancel() 之后尚未开始的条目不再执行，保持待执行状态，可稍后恢复。
+    """
+
+    def __init__(self, handler: Callable[[dict], dict], max_workers: int = JOB_WORKERS,
+                 on_progress: Callable[[int, int, str, dict], None] | None = None):
+        """
+        :param handler: 单个条目的处理函数
+        :param max_workers: 同时执行的条目数
+        :param on_progress: 每完成一个条目回调 (已完成数, 本次总数, key, 结果)，在工作线程中调用
+        """
+        self.handler = handler
+        self.max_workers = max_workers
+        self.on_progress = on_progress
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self, journal: JobJournal, retry_failed: bool = False) -> dict:
+        """
+        执行日志中尚未完成的条目
+
+        :param journal: 任务日志
+        :param retry_failed: 是否重新执行之前失败的条目
+        :return: 任务报告，见 job_report
+        """
+        items = journal.pending_items(retry_failed)
+        total = len(items)
+        done = 0
+        done_lock = threading.Lock()
+        started = time.time()
+
+        def run_item(item: dict):
+            nonlocal done
+            if self._cancelled.is_set():
+                return
+            try:
+                result = self.handler(item) or {}
+                result.setdefault("status", STATUS_OK)
+            except Exception as e:
+                result = {"status": STATUS_FAILED, "error": str(e)}
+            journal.record(item["key"], result)
+            with done_lock:
+                done += 1
+                count = done
+            if self.on_progress is not None:
+                self.on_progress(count, total, item["key"], result)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job") as pool:
+            list(pool.map(run_item, items))
+
+        report = job_report(journal)
+        report["elapsed"] = round(time.time() - started, 2)
+        report["cancelled"] = self._cancelled.is_set()
+        return report
+
+
+def job_report(journal: JobJournal) -> dict:
+    """
+    汇总任务结果
+
+    :return: {"path", "job", "total", "succeeded", "failed", "pending", "results": {key: 结果}}
+    """
+    statuses = [journal.results.get(item["key"], {}).get("status") for item in journal.items]
+    return {
+        "path": journal.path,
+        "job": journal.job,
+        "total": len(journal.items),
+        "succeeded": statuses.count(STATUS_OK),
+        "failed": statuses.count(STATUS_FAILED),
+        "pending": sum(1 for status in statuses if status is None),
+        "results": dict(journal.results),
+    }
@@ -0,0 +1,159 @@
+"""聊天记录归档：会话消息保存在本地 MessageStore，刷新时只请求上次同步之后的新消息"""
+
+from api.messages import MessagesAPI
+from api.paginator import paginate
+from utils.message_store import MessageStore, message_db_file
+
+ARCHIVE_INITIAL_COUNT = 200  # 首次打开会话时拉取的最近消息数
+
+MESSAGE_RECEIVE_EVENT = "im.message.receive_v1"
+MESSAGE_RECALLED_EVENT = "im.message.recalled_v1"
+ARCHIVE_EVENTS = (MESSAGE_RECEIVE_EVENT, MESSAGE_RECALLED_EVENT)
+
+
+def event_message(event: dict) -> dict:
+    """把 im.message.receive_v1 事件体转换为与历史消息接口相同结构的消息"""
+    msg = event.get("message") or {}
+    sender = event.get("sender") or {}
+    sender_id = sender.get("sender_id") or {}
+    return {
+        "message_id": msg.get("message_id", ""),
+        "root_id": msg.get("root_id", ""),
+        "parent_id": msg.get("parent_id", ""),
+        "msg_type": msg.get("message_type", ""),
+        "create_time": msg.get("create_time", ""),
+        "update_time": msg.get("update_time") or msg.get("create_time", ""),
+        "deleted": False,
+        "updated": False,
+        "chat_id": msg.get("chat_id", ""),
+        "sender": {
+            "id": sender_id.get("open_id", ""),
+            "id_type": "open_id",
+            "sender_type": sender.get("sender_type", ""),
+            "tenant_key": sender.get("tenant_key", ""),
+        },
+        "body": {"content": msg.get("content", "{}")},
+        "mentions": [
+            {
+                "key": mention.get("key", ""),
+                "id": (mention.get("id") or {}).get("open_id", ""),
+                "id_type": "open_id",
+                "name": mention.get("name", ""),
+                "tenant_key": mention.get("tenant_key", ""),
+            }
+            for mention in msg.get("mentions") or []
+        ],
+    }
+
+
+class MessageArchive:
+    """
+    本地聊天记录
+
+    首次同步只拉取最近 initial_count 条消息；之后以本地最新消息的时间为 start_time
+    增量拉取，通常一次请求即可。更早的记录通过 fetch_older 按需向前补齐。
+
+    增量同步只会取到新消息，已同步消息的撤回、编辑不会自动反映，
+    可用 mark_deleted 或 resync 处理；接入事件订阅后由 apply_event 实时写入新消息与撤回。
+    """
+
+    def __init__(self, messages_api: MessagesAPI, store: MessageStore | None = None,
+                 initial_count: int = ARCHIVE_INITIAL_COUNT):
+        """
+        :param messages_api: 消息接口
+        :param store: 本地存储，默认按 app_id 使用 config.json 同目录的数据库
+        :param initial_count: 首次同步拉取的最近消息数
+        """
+        self.api = messages_api
+        self.store = store or MessageStore(message_db_file(messages_api.auth.app_id))
+        self.initial_count = initial_count
+
+    def cached_messages(self, chat_id: str, limit: int = 100) -> list[dict] | None:
+        """本地已同步过该会话时返回最近 limit 条消息，否则返回 None（不发请求，可在 UI 线程调用）"""
+        if self.store.latest_time(chat_id) is None:
+            return None
+        return self.store.get_messages(chat_id, limit)
+
+    def sync(self, chat_id: str) -> int:
+        """
+        拉取会话的新消息写入本地
+
+        :param chat_id: 会话 ID
+        :return: 新增的消息数
+        """
+        latest = self.store.latest_time(chat_id)
+        if not latest:
+            messages = paginate(
+                lambda page_token: self.api.get_chat_messages(
+                    chat_id, page_token=page_token, sort_type="ByCreateTimeDesc"
+                ),
+                max_count=self.initial_count,
+            )
+        else:
+            # start_time 为秒级，同一秒内已有的消息会再取到一次，写入时按 message_id 去重
+            start_time = str(latest // 1000)
+            messages = paginate(
+                lambda page_token: self.api.get_chat_messages(
+                    chat_id, start_time, page_token=page_token, sort_type="ByCreateTimeAsc"
+                )
+            )
+        return self.store.save_messages(chat_id, list(messages))
+
+    def get_messages(self, chat_id: str, limit: int = 100) -> list[dict]:
+        """
+        增量同步后返回会话最近 limit 条消息（按时间正序）
+
+        :param chat_id: 会话 ID
+        :param limit: 最多条数
+        :return: 消息列表
+        """
+        self.sync(chat_id)
+        return self.store.get_messages(chat_id, limit)
+
+    def fetch_older(self, chat_id: str, count: int = ARCHIVE_INITIAL_COUNT) -> int:
+        """
+        向前补齐本地最早一条消息之前的 count 条记录
+
+        :return: 新增的消息数，0 表示已到会话开头
+        """
+        earliest = self.store.earliest_time(chat_id)
+        end_time = str(earliest // 1000) if earliest else ""
+        messages = paginate(
+            lambda page_token: self.api.get_chat_messages(
+                chat_id, end_time=end_time, page_token=page_token, sort_type="ByCreateTimeDesc"
+            ),
+            max_count=count,
+        )
+        return self.store.save_messages(chat_id, list(messages))
+
+    def mark_deleted(self, message_id: str):
+        self.store.mark_deleted(message_id)
+
+    def apply_event(self, event_type: str, event: dict) -> dict | None:
+        """
+        应用消息事件（im.message.receive_v1 / im.message.recalled_v1）
+
+        推送的消息只写入本地，不推进会话的同步时间：事件可能丢失或乱序，
+        下次 sync 仍从上次完整同步的位置拉取，补上遗漏的消息。
+
+        :param event_type: 事件类型
+        :param event: 事件体
+        :return: 写入或更新后的消息，无关事件或本地没有被撤回的消息时返回 None
+        """
+        if event_type == MESSAGE_RECEIVE_EVENT:
+            msg = event_message(event)
+            if not msg["message_id"] or not msg["chat_id"]:
+                return None
+            self.store.save_messages(msg["chat_id"], [msg], advance_sync=False)
+            return msg
+        if event_type == MESSAGE_RECALLED_EVENT:
+            return self.store.mark_deleted(event.get("message_id", ""))
+        return None
+
+    def resync(self, chat_id: str) -> int:
+        """丢弃会话的本地记录并重新同步"""
+        self.store.clear_chat(chat_id)
+        return self.sync(chat_id)
+
+    def close(self):
+        self.store.close()
@@ -0,0 +1,159 @@
+"""消息内容解析：按 msg_type 查表把消息体转换为可读文本，按 message_id 缓存结果"""
+
+import json
+import threading
+from typing import Callable
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，安装后解析更快
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+CONTENT_CACHE_SIZE = 20000  # 缓存的消息文本条数
+
+# 不需要解析 content 的消息类型
+_FIXED_TEXT = {
+    "image": "[图片消息]",
+    "audio": "[语音消息]",
+    "sticker": "[表情]",
+    "share_user": "[分享名片]",
+    "system": "[系统消息]",
+    "merge_forward": "[合并转发]",
+}
+
+
+def _decode_text(content: dict, raw: str) -> str:
+    return content.get("text", raw)
+
+
+def _decode_post(content: dict, raw: str) -> str:
+    # 富文本：提取所有 text 标签的文本
+    parts = []
+    zh = content.get("zh_cn", content.get("en_us", {}))
+    title = zh.get("title", "")
+    if title:
+        parts.append(f"[{title}]")
+    for paragraph in zh.get("content", []):
+        line_parts = []
+        for elem in paragraph:
+            render = _POST_TAGS.get(elem.get("tag", ""))
+            if render is not None:
+                line_parts.append(render(elem))
+        parts.append("".join(line_parts))
+    return "\n".join(parts)
+
+
+_POST_TAGS: dict[str, Callable[[dict], str]] = {
+    "text": lambda elem: elem.get("text", ""),
+    "a": lambda elem: elem.get("text", "") + f"({elem.get('href', '')})",
+    "at": lambda elem: f"@{elem.get('user_name', elem.get('user_id', ''))}",
+    "img": lambda elem: "[图片]",
+    "media": lambda elem: "[媒体]",
+}
+
+
+def _decode_file(content: dict, raw: str) -> str:
+    return f"[文件] {content.get('file_name', '')}"
+
+
+def _decode_interactive(content: dict, raw: str) -> str:
+    # 卡片消息
+    title = content.get("header", {}).get("title", {}).get("content", "")
+    return f"[卡片] {title}" if title else "[卡片消息]"
+
+
+def _decode_share_chat(content: dict, raw: str) -> str:
+    return f"[分享群聊] {content.get('chat_name', '')}"
+
+
+# msg_type -> 解析函数 (content 字典, 原始 content 字符串) -> 文本
+DECODERS: dict[str, Callable[[dict, str], str]] = {
+    "text": _decode_text,
+    "post": _decode_post,
+    "file": _decode_file,
+    "interactive": _decode_interactive,
+    "share_chat": _decode_share_chat,
+}
+
+
+def register_decoder(msg_type: str, decoder: Callable[[dict, str], str]):
+    """注册或替换某种消息类型的解析函数"""
+    DECODERS[msg_type] = decoder
+
+
+def decode_content(msg_type: str, content_str: str) -> str:
+    """
+    把消息体 content 转换为可读文本（不缓存）
+
+    :param msg_type: 消息类型
+    :param content_str: body.content 原始 JSON 字符串
+    :return: 可读文本，未知类型返回 "[msg_type]"
+    """
+    fixed = _FIXED_TEXT.get(msg_type)
+    if fixed is not None:
+        return fixed
+    decoder = DECODERS.get(msg_type)
+    if decoder is None:
+        return f"[{msg_type}]"
+    try:
+        content = _loads(content_str)
+    except (ValueError, TypeError):
+        content = {}
+    if not isinstance(content, dict):
+        content = {}
+    return decoder(content, content_str)
+
+
+class MessageContentCache:
+    """
+    消息文本缓存（线程安全）
+
+    消息除编辑外不会变化，按 message_id 缓存解析结果，并记录 update_time，
+    消息被编辑后 update_time 变化时重新解析。超出容量时淘汰最早加入的条目。
+    命中时只做一次字典读取（GIL 保证原子性），写入才加锁；hits / misses 为近似计数。
+    """
+
+    def __init__(self, max_size: int = CONTENT_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[str, str]] = {}  # message_id -> (update_time, 文本)，按加入顺序
+        self.hits = 0
+        self.misses = 0
+
+    def text(self, msg: dict) -> str:
+        """消息的可读文本"""
+        message_id = msg.get("message_id")
+        version = msg.get("update_time") or ""
+        entry = self._entries.get(message_id)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        body = msg.get("body") or {}
+        text = decode_content(msg.get("msg_type", ""), body.get("content", "{}"))
+        if message_id:
+            with self._lock:
+                self._entries.pop(message_id, None)
+                self._entries[message_id] = (version, text)
+                if len(self._entries) > self.max_size:
+                    del self._entries[next(iter(self._entries))]
+        return text
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_default_cache = MessageContentCache()
+
+
+def message_text(msg: dict) -> str:
+    """消息的可读文本（使用全局缓存）"""
+    return _default_cache.text(msg)
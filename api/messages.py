@@ -1,7 +1,21 @@
 """飞书消息 API 封装"""
 
 import json
+from uuid import NAMESPACE_URL, uuid4, uuid5
+
 from api.auth import FeishuAuth
+from api.async_auth import AsyncFeishuAuth
+from api.card_template import TEMPLATE_CACHE_SIZE, CardTemplate
+from api.paginator import acollect, apaginate, paginate
+
+
+def message_uuid(*parts: str) -> str:
+    """
+    由业务字段生成固定的消息去重键，同样的输入总是得到同样的 uuid
+
+    例如 message_uuid(任务 ID, 接收者 ID)：任务重跑时同一接收者不会收到两条消息。
+    """
+    return uuid5(NAMESPACE_URL, "\x1f".join(parts)).hex
 
 
 class MessagesAPI:
@@ -10,69 +24,100 @@ class MessagesAPI:
     def __init__(self, auth: FeishuAuth):
         self.auth = auth
 
-    def send_text_message(self, receive_id: str, text: str, receive_id_type: str = "open_id") -> dict:
+    def send_text_message(self, receive_id: str, text: str, receive_id_type: str = "open_id",
+                          uuid: str | None = None) -> dict:
         """
         发送文本消息
 
         :param receive_id: 接收者 ID (open_id / chat_id / user_id / union_id / email)
         :param text: 消息文本
         :param receive_id_type: ID 类型
+        :param uuid: 去重键，见 send_message
         :return: API 响应数据
         """
-        payload = {
-            "receive_id": receive_id,
-            "msg_type": "text",
-            "content": json.dumps({"text": text}),
-        }
-        return self.auth.request(
-            "POST",
-            "/im/v1/messages",
-            params={"receive_id_type": receive_id_type},
-            json=payload,
-        )
+        return self.send_message(receive_id, "text", json.dumps({"text": text}), receive_id_type, uuid)
 
-    def send_rich_text_message(self, receive_id: str, content: dict, receive_id_type: str = "open_id") -> dict:
+    def send_rich_text_message(self, receive_id: str, content: dict, receive_id_type: str = "open_id",
+                               uuid: str | None = None) -> dict:
         """
         发送富文本消息
 
         :param receive_id: 接收者 ID
         :param content: 富文本内容 (post 格式)
         :param receive_id_type: ID 类型
+        :param uuid: 去重键，见 send_message
         :return: API 响应数据
         """
-        payload = {
-            "receive_id": receive_id,
-            "msg_type": "post",
-            "content": json.dumps(content),
-        }
-        return self.auth.request(
-            "POST",
-            "/im/v1/messages",
-            params={"receive_id_type": receive_id_type},
-            json=payload,
-        )
+        return self.send_message(receive_id, "post", json.dumps(content), receive_id_type, uuid)
 
-    def send_interactive_message(self, receive_id: str, card: dict, receive_id_type: str = "open_id") -> dict:
+    def send_interactive_message(self, receive_id: str, card: dict | str, receive_id_type: str = "open_id",
+                                 uuid: str | None = None) -> dict:
         """
         发送卡片消息
 
         :param receive_id: 接收者 ID
-        :param card: 卡片内容
+        :param card: 卡片内容，或已序列化的卡片 JSON（如 CardTemplate.render 的结果）
+        :param receive_id_type: ID 类型
+        :param uuid: 去重键，见 send_message
+        :return: API 响应数据
+        """
+        content = card if isinstance(card, str) else json.dumps(card)
+        return self.send_message(receive_id, "interactive", content, receive_id_type, uuid)
+
+    def send_message(self, receive_id: str, msg_type: str, content: str, receive_id_type: str = "open_id",
+                     uuid: str | None = None) -> dict:
+        """
+        发送任意类型的消息
+
+        请求体带去重键 uuid，服务端 1 小时内对同一 uuid 只发送一次，因此超时、断线后可以放心重发。
+        不传时每次调用生成新的 uuid（只保护本次调用内部的自动重试）；跨调用、跨进程重发同一条消息时，
+        传入 message_uuid() 生成的固定值。
+
+        :param receive_id: 接收者 ID
+        :param msg_type: 消息类型 (text / post / interactive 等)
+        :param content: 消息内容（JSON 字符串）
         :param receive_id_type: ID 类型
+        :param uuid: 去重键，最长 50 字符
         :return: API 响应数据
         """
         payload = {
             "receive_id": receive_id,
-            "msg_type": "interactive",
-            "content": json.dumps(card),
+            "msg_type": msg_type,
+            "content": content,
+            "uuid": uuid or uuid4().hex,
         }
         return self.auth.request(
             "POST",
             "/im/v1/messages",
+            idempotent=True,
             params={"receive_id_type": receive_id_type},
             json=payload,
         )
 
+    def batch_send_message(self, msg_type: str, content: dict, open_ids: list[str] = None,
+                           department_ids: list[str] = None) -> dict:
+        """
+        批量发送消息（服务端异步投递，每次最多 200 个用户和 200 个部门）
+
+        :param msg_type: 消息类型 (text / post / interactive 等)
+        :param content: 与 send_message 相同结构的内容字典，卡片消息传卡片本身
+        :param open_ids: 接收用户 open_id 列表
+        :param department_ids: 接收部门 ID 列表（发给部门下所有成员）
+        :return: API 响应数据，含 message_id 与 invalid_open_ids / invalid_department_ids
+        """
+        payload = {"msg_type": msg_type}
+        if msg_type == "interactive":
+            payload["card"] = content
+        elif msg_type == "post":
+            payload["content"] = {"post": content}
+        else:
+            payload["content"] = content
+        if open_ids:
+            payload["open_ids"] = open_ids
+        if department_ids:
+            payload["department_ids"] = department_ids
+        return self.auth.request("POST", "/message/v4/batch_send/", json=payload)
+
     def get_chat_list(self, page_token: str = "") -> dict:
         """
         获取机器人所在的群列表
@@ -88,19 +133,7 @@ class MessagesAPI:
 
     def get_all_chats(self) -> list[dict]:
         """获取所有群列表（自动分页）"""
-        all_chats = []
-        page_token = ""
-
-        while True:
-            data = self.get_chat_list(page_token)
-            items = data.get("data", {}).get("items", [])
-            all_chats.extend(items)
-
-            if not data.get("data", {}).get("has_more", False):
-                break
-            page_token = data.get("data", {}).get("page_token", "")
-
-        return all_chats
+        return list(paginate(self.get_chat_list))
 
     def get_chat_members(self, chat_id: str, page_token: str = "") -> dict:
         """
@@ -155,22 +188,12 @@ class MessagesAPI:
         :param max_count: 最大获取条数
         :return: 消息列表
         """
-        all_messages = []
-        page_token = ""
-
-        while len(all_messages) < max_count:
-            data = self.get_chat_messages(
-                container_id, start_time, end_time, page_token,
-                sort_type="ByCreateTimeAsc"
-            )
-            items = data.get("data", {}).get("items", [])
-            all_messages.extend(items)
-
-            if not data.get("data", {}).get("has_more", False):
-                break
-            page_token = data.get("data", {}).get("page_token", "")
-
-        return all_messages[:max_count]
+        return list(paginate(
+            lambda page_token: self.get_chat_messages(
+                container_id, start_time, end_time, page_token, sort_type="ByCreateTimeAsc"
+            ),
+            max_count=max_count,
+        ))
 
     def get_chat_info(self, chat_id: str) -> dict:
         """
@@ -188,19 +211,7 @@ class MessagesAPI:
         :param chat_id: 群 ID
         :return: 成员列表
         """
-        all_members = []
-        page_token = ""
-
-        while True:
-            data = self.get_chat_members(chat_id, page_token)
-            items = data.get("data", {}).get("items", [])
-            all_members.extend(items)
-
-            if not data.get("data", {}).get("has_more", False):
-                break
-            page_token = data.get("data", {}).get("page_token", "")
-
-        return all_members
+        return list(paginate(lambda page_token: self.get_chat_members(chat_id, page_token)))
 
     def delete_message(self, message_id: str) -> dict:
         """
@@ -211,26 +222,67 @@ class MessagesAPI:
         """
         return self.auth.request("DELETE", f"/im/v1/messages/{message_id}")
 
-    def reply_message(self, message_id: str, msg_type: str, content: str) -> dict:
+    def recall_batch_message(self, batch_message_id: str) -> dict:
+        """
+        撤回批量发送的消息（batch_send_message 返回的 message_id）
+
+        :param batch_message_id: 批量消息 ID
+        :return: API 响应数据
+        """
+        return self.auth.request("DELETE", f"/im/v1/batch_messages/{batch_message_id}")
+
+    def reply_message(self, message_id: str, msg_type: str, content: str, uuid: str | None = None) -> dict:
         """
         回复消息
 
         :param message_id: 要回复的消息 ID
         :param msg_type: 消息类型 (text / post / interactive)
         :param content: 消息内容（JSON 字符串）
+        :param uuid: 去重键，见 send_message
         :return: API 响应数据
         """
         payload = {
             "msg_type": msg_type,
             "content": content,
+            "uuid": uuid or uuid4().hex,
         }
         return self.auth.request(
             "POST",
             f"/im/v1/messages/{message_id}/reply",
+            idempotent=True,
             json=payload,
         )
 
 
+class AsyncMessagesAPI(MessagesAPI):
+    """
+    消息接口的异步版本，需配合 AsyncFeishuAuth 使用。
+
+    单次请求的方法直接复用 MessagesAPI（返回值需 await），这里只重写自动分页方法。
+    """
+
+    def __init__(self, auth: AsyncFeishuAuth):
+        super().__init__(auth)
+
+    async def get_all_chats(self) -> list[dict]:
+        """获取所有群列表（自动分页）"""
+        return await acollect(apaginate(self.get_chat_list))
+
+    async def get_all_chat_messages(self, container_id: str, start_time: str = "", end_time: str = "",
+                                    max_count: int = 200) -> list[dict]:
+        """获取会话的所有历史消息（自动分页，限制最大条数）"""
+        return await acollect(apaginate(
+            lambda page_token: self.get_chat_messages(
+                container_id, start_time, end_time, page_token, sort_type="ByCreateTimeAsc"
+            ),
+            max_count=max_count,
+        ))
+
+    async def get_all_chat_members(self, chat_id: str) -> list[dict]:
+        """获取群所有成员（自动分页）"""
+        return await acollect(apaginate(lambda page_token: self.get_chat_members(chat_id, page_token)))
+
+
 class CardBuilder:
     """飞书卡片消息构建器"""
 
@@ -331,6 +383,22 @@ class CardBuilder:
 
         return card
 
+    @staticmethod
+    def compile(images: list = None, cache_size: int = TEMPLATE_CACHE_SIZE, **kwargs) -> CardTemplate:
+        """
+        构建卡片并编译为模板，文本中可使用 {{变量}} 占位符，之后用 render(变量=值) 快速生成卡片 JSON
+
+        :param images: 图片列表，传入时按 build_with_images 构建，否则按 build 构建
+        :param cache_size: 渲染结果缓存条数，0 表示不缓存
+        :param kwargs: 其余参数同 build / build_with_images
+        :return: 卡片模板
+        """
+        if images:
+            card = CardBuilder.build_with_images(images=images, **kwargs)
+        else:
+            card = CardBuilder.build(**kwargs)
+        return CardTemplate(card, cache_size)
+
     @staticmethod
     def build_with_images(
         title: str,
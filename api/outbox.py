@@ -0,0 +1,177 @@
+"""发件箱：消息先写入本地 SQLite 再由后台线程发送，失败自动重试，进程重启后继续，靠 uuid 去重不会重复发送"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from uuid import uuid4
+
+from api.auth import FeishuAPIError
+from api.messages import MessagesAPI
+from api.retry import RetryPolicy
+from utils.outbox_store import OutboxStore, outbox_db_file
+
+OUTBOX_WORKERS = 8  # 同时发送的消息数，实际速率由 auth 的频控器控制
+OUTBOX_IDLE_WAIT = 5.0  # 没有到期消息时后台线程最长等待秒数
+DEDUPE_WINDOW = 3300  # 服务端对 uuid 去重 1 小时，超过后不再自动重发，留 5 分钟余量
+
+
+class Outbox:
+    """
+    持久化发件箱（线程安全）
+
+    send() 只把消息写入本地数据库并立即返回去重键；start() 启动后台线程持续发送，
+    也可以调用 drain() 在当前线程发完为止。每条消息始终带同一个 uuid 发送，
+    因此超时、断线、进程崩溃后重发都不会让接收者收到两条::
+
+        outbox = Outbox(messages_api)
+        outbox.start()
+        outbox.send(open_id, "text", json.dumps({"text": "hi"}), uuid=message_uuid("日报", open_id, date))
+
+    发送失败时：飞书明确拒绝（如接收者无效、无权限）的消息直接标记失败；
+    网络错误、5xx、频控等按 retry_policy 退避后重试，直到达到最大次数或超出去重有效期。
+    """
+
+    def __init__(self, messages_api: MessagesAPI, store: OutboxStore | None = None,
+                 max_workers: int = OUTBOX_WORKERS, retry_policy: RetryPolicy | None = None,
+                 on_result: Callable[[dict], None] | None = None):
+        """
+        :param messages_api: 消息接口
+        :param store: 本地存储，默认按 app_id 使用 config.json 同目录的数据库
+        :param max_workers: 同时发送的消息数
+        :param retry_policy: 消息级重试策略（请求级重试仍由 auth 负责）
+        :param on_result: 每条消息发送成功或最终失败后回调，参数为该消息的记录，在工作线程中调用
+        """
+        self.api = messages_api
+        self.store = store or OutboxStore(outbox_db_file(messages_api.auth.app_id))
+        self.max_workers = max_workers
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=8, base_delay=2.0, max_delay=300.0)
+        self.on_result = on_result
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        # 上次进程退出时正在发送的消息，结果未知：去重有效期内带原 uuid 重发，超出的标记失败
+        self.store.requeue_sending(DEDUPE_WINDOW)
+
+    # ── 入队 ──────────────────────────
+
+    def send(self, receive_id: str, msg_type: str, content: str, receive_id_type: str = "open_id",
+             uuid: str | None = None) -> str:
+        """
+        加入发件箱
+
+        :param receive_id: 接收者 ID
+        :param msg_type: 消息类型 (text / post / interactive 等)
+        :param content: 消息内容（JSON 字符串）
+        :param receive_id_type: ID 类型
+        :param uuid: 去重键，同一 uuid 重复加入会被忽略；批量或可能重跑的发送应传 message_uuid() 的结果
+        :return: 去重键，可用于 status() 查询
+        """
+        uuid = uuid or uuid4().hex
+        self.store.enqueue(uuid, receive_id, receive_id_type, msg_type, content)
+        self._wake.set()
+        return uuid
+
+    def status(self, uuid: str) -> dict | None:
+        """查询消息记录：status、attempts、last_error、message_id 等"""
+        return self.store.get(uuid)
+
+    def stats(self) -> dict[str, int]:
+        """各状态的消息数"""
+        return self.store.counts()
+
+    def retry_failed(self) -> int:
+        """把失败的消息重新加入发送，返回条数"""
+        count = self.store.retry_failed()
+        self._wake.set()
+        return count
+
+    # ── 发送 ──────────────────────────
+
+    def start(self):
+        """启动后台发送线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        """停止后台线程，正在发送的一批会发完"""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def drain(self, timeout: float | None = None) -> dict[str, int]:
+        """
+        在当前线程发送，直到没有待发送消息（包括等待中的重试）或超时
+
+        :param timeout: 最长秒数，None 为不限
+        :return: 各状态的消息数
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="outbox") as pool:
+            while True:
+                if self._send_due(pool):
+                    continue
+                next_due = self.store.next_due()
+                if next_due is None:
+                    break
+                now = time.time()
+                if deadline is not None and next_due > deadline:
+                    break
+                time.sleep(max(0.0, next_due - now))
+        return self.store.counts()
+
+    def close(self):
+        self.stop()
+        self.store.close()
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="outbox") as pool:
+            while not self._stopping.is_set():
+                if self._send_due(pool):
+                    continue
+                next_due = self.store.next_due()
+                wait = OUTBOX_IDLE_WAIT if next_due is None else min(OUTBOX_IDLE_WAIT, next_due - time.time())
+                self._wake.wait(max(0.0, wait))
+                self._wake.clear()
+
+    def _send_due(self, pool: ThreadPoolExecutor) -> int:
+        """发送一批到期消息，返回条数"""
+        rows = self.store.claim(self.max_workers * 4)
+        list(pool.map(self._deliver, rows))
+        return len(rows)
+
+    def _deliver(self, row: dict):
+        uuid = row["uuid"]
+        try:
+            result = self.api.send_message(
+                row["receive_id"], row["msg_type"], row["content"], row["receive_id_type"], uuid
+            )
+        except Exception as e:
+            self._on_error(row, e)
+        else:
+            self.store.mark_sent(uuid, result.get("data", {}).get("message_id", ""))
+            self._notify(uuid)
+
+    def _on_error(self, row: dict, error: Exception):
+        uuid = row["uuid"]
+        if isinstance(error, FeishuAPIError) and error.status_code < 500 \
+                and self.retry_policy.api_error_reason(error.code, error.status_code) is None:
+            self.store.mark_failed(uuid, str(error))
+        elif row["attempts"] >= self.retry_policy.max_attempts:
+            self.store.mark_failed(uuid, f"重试 {row['attempts']} 次仍失败: {error}")
+        elif time.time() - row["created_at"] > DEDUPE_WINDOW:
+            self.store.mark_failed(uuid, f"超过去重有效期，不再自动重发: {error}")
+        else:
+            delay = self.retry_policy.backoff(row["attempts"])
+            self.store.mark_retry(uuid, str(error), time.time() + delay)
+            return
+        self._notify(uuid)
+
+    def _notify(self, uuid: str):
+        if self.on_result is not None:
+            self.on_result(self.store.get(uuid))
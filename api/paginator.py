@@ -0,0 +1,163 @@
+"""分页模块：统一处理飞书列表接口的 has_more / page_token 翻页，并预取下一页"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+
+# 预取下一页用的共享线程池；请求本身受 auth 的连接池与频控器约束，这里只需少量线程
+_PREFETCH_WORKERS = 8
+_prefetch_pool: ThreadPoolExecutor | None = None
+
+
+def _get_prefetch_pool() -> ThreadPoolExecutor:
+    global _prefetch_pool
+    if _prefetch_pool is None:
+        _prefetch_pool = ThreadPoolExecutor(max_workers=_PREFETCH_WORKERS, thread_name_prefix="paginate")
+    return _prefetch_pool
+
+
+def next_page_token(data: dict) -> str:
+    """
+    从响应中取出下一页的 token，没有下一页时返回空字符串
+
+    多数接口用 page_token，云空间文件列表等接口用 next_page_token，两者都兼容。
+    """
+    body = data.get("data", {})
+    if not body.get("has_more", False):
+        return ""
+    return body.get("page_token") or body.get("next_page_token") or ""
+
+
+def _remaining(max_count: int | None, count: int) -> bool:
+    return max_count is None or count < max_count
+
+
+def iter_pages(fetch: Callable[[str], dict], prefetch: bool = True) -> Iterator[dict]:
+    """
+    逐页返回响应数据
+
+    拿到第 N 页后立即在后台请求第 N+1 页，调用方处理第 N 页的同时下一页已在路上。
+
+    :param fetch: 单页请求函数，参数为 page_token（首页为空字符串），返回响应 JSON
+    :param prefetch: 是否预取下一页
+    :return: 每页响应 JSON 的生成器
+    """
+    data = fetch("")
+    while True:
+        page_token = next_page_token(data)
+        future = None
+        if page_token and prefetch:
+            future = _get_prefetch_pool().submit(fetch, page_token)
+        try:
+            yield data
+        except GeneratorExit:
+            if future is not None:
+                future.cancel()  # 调用方提前结束，尚未开始的预取不再发出
+            raise
+        if not page_token:
+            return
+        data = future.result() if future is not None else fetch(page_token)
+
+
+def paginate(fetch: Callable[[str], dict], items_key: str = "items", max_count: int | None = None,
+             prefetch: bool = True) -> Iterator[dict]:
+    """
+    逐条返回列表接口的所有条目（自动翻页）
+
+    :param fetch: 单页请求函数，参数为 page_token，返回响应 JSON
+    :param items_key: 条目在 data 中的字段名，如 items / files / calendar_list
+    :param max_count: 最多返回条数，已取到的条目够数后不再请求（也不预取）后续页
+    :param prefetch: 是否预取下一页
+    :return: 条目生成器
+    """
+    if not _remaining(max_count, 0):
+        return
+    count = 0
+    fetched = 0
+    data = fetch("")
+    while True:
+        items = data.get("data", {}).get(items_key) or []
+        fetched += len(items)
+        page_token = next_page_token(data) if _remaining(max_count, fetched) else ""
+        future = _get_prefetch_pool().submit(fetch, page_token) if page_token and prefetch else None
+        consumed = False
+        try:
+            for item in items:
+                yield item
+                count += 1
+                if not _remaining(max_count, count):
+                    return
+            consumed = True
+        finally:
+            if future is not None and not consumed:
+                future.cancel()  # 调用方提前结束，尚未开始的预取不再发出
+        if not page_token:
+            return
+        data = future.result() if future is not None else fetch(page_token)
+
+
+async def aiter_pages(fetch: Callable[[str], Awaitable[dict]], prefetch: bool = True) -> AsyncIterator[dict]:
+    """
+    iter_pages 的异步版本，下一页作为任务在事件循环中并发请求
+
+    :param fetch: 单页请求协程函数，参数为 page_token，返回响应 JSON
+    :param prefetch: 是否预取下一页
+    :return: 每页响应 JSON 的异步迭代器
+    """
+    data = await fetch("")
+    while True:
+        page_token = next_page_token(data)
+        task = None
+        if page_token and prefetch:
+            task = asyncio.ensure_future(fetch(page_token))
+        try:
+            yield data
+        except GeneratorExit:
+            if task is not None:
+                task.cancel()
+            raise
+        if not page_token:
+            return
+        data = await task if task is not None else await fetch(page_token)
+
+
+async def apaginate(fetch: Callable[[str], Awaitable[dict]], items_key: str = "items",
+                    max_count: int | None = None, prefetch: bool = True) -> AsyncIterator[dict]:
+    """
+    paginate 的异步版本
+
+    :param fetch: 单页请求协程函数，参数为 page_token，返回响应 JSON
+    :param items_key: 条目在 data 中的字段名
+    :param max_count: 最多返回条数，已取到的条目够数后不再请求后续页
+    :param prefetch: 是否预取下一页
+    :return: 条目异步迭代器
+    """
+    if not _remaining(max_count, 0):
+        return
+    count = 0
+    fetched = 0
+    data = await fetch("")
+    while True:
+        items = data.get("data", {}).get(items_key) or []
+        fetched += len(items)
+        page_token = next_page_token(data) if _remaining(max_count, fetched) else ""
+        task = asyncio.ensure_future(fetch(page_token)) if page_token and prefetch else None
+        consumed = False
+        try:
+            for item in items:
+                yield item
+                count += 1
+                if not _remaining(max_count, count):
+                    return
+            consumed = True
+        finally:
+            if task is not None and not consumed:
+                task.cancel()
+        if not page_token:
+            return
+        data = await task if task is not None else await fetch(page_token)
+
+
+async def acollect(items: AsyncIterator[dict]) -> list[dict]:
+    """把异步迭代器收集成列表"""
+    return [item async for item in items]
@@ -0,0 +1,205 @@
+"""频控模块：按接口族的令牌桶限流，根据飞书频控响应自适应调整速率"""
+
+import asyncio
+import re
+import threading
+import time
+
+RATE_LIMIT_CODE = 99991400  # 飞书频控错误码
+RATE_LIMIT_HEADER = "x-ogw-ratelimit-limit"
+RATE_RESET_HEADER = "x-ogw-ratelimit-reset"
+
+# 已知接口的默认速率 (method, 路径正则, 每秒请求数)，按顺序匹配，未命中用 DEFAULT_RATE
+DEFAULT_LIMITS = [
+    ("POST", r"^/im/v1/messages$", 50),
+    ("POST", r"^/im/v1/messages/:id/reply$", 50),
+    ("DELETE", r"^/im/v1/messages/:id$", 50),
+    ("POST", r"^/message/v4/batch_send/?$", 1),
+    ("POST", r"^/bitable/v1/apps/:id/tables/:id/records", 10),
+    ("PUT", r"^/bitable/v1/apps/:id/tables/:id/records", 10),
+    ("DELETE", r"^/bitable/v1/apps/:id/tables/:id/records", 10),
+    ("POST", r"^/drive/v1/permissions/:id/members$", 10),
+    ("POST", r"^/docx/v1/documents/:id/blocks/:id/children$", 3),
+    ("POST", r"^/contact/v3/users/batch_get_id$", 50),
+]
+DEFAULT_RATE = 20
+
+_KEEP_SEGMENT = re.compile(r"^(v\d+|[a-z_]+)$")
+
+
+def endpoint_family(method: str, path: str) -> str:
+    """
+    由请求路径推导接口族，路径中的 ID/token 段统一替换为 :id
+
+    如 GET /im/v1/chats/oc_xxx/members -> "GET /im/v1/chats/:id/members"
+    """
+    path = path.split("?", 1)[0]
+    segments = [seg if _KEEP_SEGMENT.match(seg) else ":id" for seg in path.strip("/").split("/")]
+    return f"{method.upper()} /{'/'.join(segments)}"
+
+
+class TokenBucket:
+    """
+    令牌桶。令牌可以透支为负数：每个调用方预定一个令牌并按到达顺序排队等待，
+    保证先到先得，不会出现并发线程同时醒来争抢。
+    """
+
+    def __init__(self, rate: float, burst: float | None = None, min_rate: float = 0.5):
+        self.max_rate = rate  # 配置的速率上限，自适应调整不会超过它
+        self.rate = rate
+        self.min_rate = min_rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # 被服务端频控时，在重置前整体暂停
+        self.success_streak = 0
+        self.limited_count = 0
+        self.wait_count = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """预定一个令牌，返回需要等待的秒数（调用方需持锁）"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        wait = max(-self.tokens / self.rate if self.tokens < 0 else 0.0, self.blocked_until - now)
+        if wait > 0:
+            self.wait_count += 1
+            self.total_wait += wait
+        return wait
+
+    def on_success(self, server_limit: float | None = None):
+        """请求成功：服务端给出阈值时以其为上限，否则逐步恢复速率（加性增）"""
+        if server_limit:
+            self._lower_max_rate(server_limit)
+        self.success_streak += 1
+        if self.rate < self.max_rate and self.success_streak >= 10:
+            self.rate = min(self.max_rate, self.rate + max(self.max_rate * 0.1, 0.5))
+            self.success_streak = 0
+
+    def _lower_max_rate(self, limit: float):
+        self.max_rate = min(self.max_rate, limit)
+        self.rate = min(self.rate, self.max_rate)
+        self.burst = min(self.burst, max(self.max_rate, 1))
+
+    def on_limited(self, reset_seconds: float, server_limit: float | None = None):
+        """
+        被服务端频控：在频控重置前暂停发放令牌，并下调速率。
+
+        服务端给出阈值时直接采用，否则速率减半（乘性减）；同一暂停窗口内
+        陆续返回的频控响应来自此前已发出的请求，不再重复下调。
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self.limited_count += 1
+        self.success_streak = 0
+        if server_limit:
+            self._lower_max_rate(server_limit)
+        elif now >= self.blocked_until:
+            self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0)
+        self.blocked_until = max(self.blocked_until, now + reset_seconds)
+
+
+class RateLimiter:
+    """
+    按接口族限流的令牌桶集合，FeishuAuth / AsyncFeishuAuth 在每次请求前调用。
+
+    被频控（HTTP 429 或错误码 99991400）的请求未被服务端处理，可以安全重排队，
+    最多重排 max_requeues 次后才向调用方报错。
+    """
+
+    def __init__(self, limits: list[tuple[str, str, float]] = None, default_rate: float = DEFAULT_RATE,
+                 max_requeues: int = 5):
+        """
+        :param limits: 自定义速率表 [(method, 路径正则, 每秒请求数)]，默认使用 DEFAULT_LIMITS
+        :param default_rate: 未匹配接口的默认每秒请求数
+        :param max_requeues: 被频控后最多重新排队的次数
+        """
+        self._limits = [
+            (method, re.compile(pattern), rate)
+            for method, pattern, rate in (limits if limits is not None else DEFAULT_LIMITS)
+        ]
+        self.default_rate = default_rate
+        self.max_requeues = max_requeues
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, family: str) -> TokenBucket:
+        bucket = self._buckets.get(family)
+        if bucket is None:
+            method, path = family.split(" ", 1)
+            rate = self.default_rate
+            for limit_method, pattern, limit_rate in self._limits:
+                if limit_method == method and pattern.search(path):
+                    rate = limit_rate
+                    break
+            bucket = self._buckets[family] = TokenBucket(rate)
+        return bucket
+
+    def _reserve(self, method: str, path: str) -> tuple[str, float]:
+        family = endpoint_family(method, path)
+        with self._lock:
+            return family, self._bucket(family).reserve()
+
+    def acquire(self, method: str, path: str) -> str:
+        """阻塞直到允许发送，返回接口族（用于回报结果）"""
+        family, wait = self._reserve(method, path)
+        if wait > 0:
+            time.sleep(wait)
+        return family
+
+    async def acquire_async(self, method: str, path: str) -> str:
+        """acquire 的协程版本，等待期间不阻塞事件循环"""
+        family, wait = self._reserve(method, path)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return family
+
+    def feedback(self, family: str, status_code: int, headers, data: dict | None) -> bool:
+        """
+        根据响应调整速率
+
+        :param family: acquire 返回的接口族
+        :param status_code: HTTP 状态码
+        :param headers: 响应头（大小写不敏感的映射）
+        :param data: 已解析的响应 JSON，解析失败传 None
+        :return: 是否被频控（被频控时调用方应重新 acquire 后重发）
+        """
+        limited = status_code == 429 or (data is not None and data.get("code") == RATE_LIMIT_CODE)
+        with self._lock:
+            bucket = self._bucket(family)
+            if limited:
+                bucket.on_limited(
+                    _header_float(headers, RATE_RESET_HEADER) or 1.0,
+                    _header_float(headers, RATE_LIMIT_HEADER),
+                )
+            else:
+                bucket.on_success(_header_float(headers, RATE_LIMIT_HEADER))
+        return limited
+
+    def stats(self) -> dict:
+        """各接口族的当前速率与等待统计"""
+        with self._lock:
+            return {
+                family: {
+                    "rate": round(bucket.rate, 2),
+                    "max_rate": bucket.max_rate,
+                    "limited": bucket.limited_count,
+                    "waits": bucket.wait_count,
+                    "total_wait": round(bucket.total_wait, 3),
+                }
+                for family, bucket in self._buckets.items()
+            }
+
+
+def _header_float(headers, name: str) -> float | None:
+    try:
+        value = headers.get(name)
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,133 @@
+"""重试模块：指数退避 + 抖动的重试策略，只自动重试幂等或确定未被处理的请求"""
+
+import random
+import threading
+
+# 幂等的 HTTP 方法，失败后重发不会产生副作用
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# 可重试的 HTTP 状态码
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+# 可重试的飞书错误码（临时性错误）
+RETRYABLE_CODES = frozenset({
+    99991400,  # 应用频控（频控器重排次数用尽后仍未成功）
+    1254290,   # 多维表格请求过快
+    1254291,   # 多维表格写冲突
+    1255040,   # 多维表格请求超时
+    230020,    # 消息发送频控
+})
+
+
+class RetryStats:
+    """重试计数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retried_requests = 0  # 至少重试过一次的请求数
+        self.retries = 0  # 重试总次数
+        self.recovered = 0  # 重试后最终成功的请求数
+        self.gave_up = 0  # 重试次数或预算用尽仍失败的请求数
+        self.by_reason: dict[str, int] = {}
+
+    def record_retry(self, reason: str, first: bool):
+        with self._lock:
+            self.retries += 1
+            if first:
+                self.retried_requests += 1
+            self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+
+    def record_result(self, success: bool):
+        with self._lock:
+            if success:
+                self.recovered += 1
+            else:
+                self.gave_up += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "retried_requests": self.retried_requests,
+                "retries": self.retries,
+                "recovered": self.recovered,
+                "gave_up": self.gave_up,
+                "by_reason": dict(self.by_reason),
+            }
+
+
+class RetryPolicy:
+    """
+    重试策略
+
+    第 n 次重试前等待 min(max_delay, base_delay * multiplier^(n-1))，再按 jitter 比例随机缩短，
+    避免大量并发请求在同一时刻重发。单个请求累计等待超过 retry_budget 秒后不再重试。
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        multiplier: float = 2.0,
+        jitter: float = 0.5,
+        retry_budget: float = 30.0,
+        retryable_codes: frozenset = RETRYABLE_CODES,
+        retryable_status: frozenset = RETRYABLE_STATUS,
+    ):
+        """
+        :param max_attempts: 最大尝试次数（含首次请求），1 表示不重试
+        :param base_delay: 首次重试前的基础等待秒数
+        :param max_delay: 单次等待上限
+        :param multiplier: 退避倍数
+        :param jitter: 抖动比例 (0-1)，实际等待在 [delay*(1-jitter), delay] 内随机
+        :param retry_budget: 单个请求的累计重试时间预算（秒）
+        :param retryable_codes: 可重试的飞书错误码
+        :param retryable_status: 可重试的 HTTP 状态码
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.retry_budget = retry_budget
+        self.retryable_codes = retryable_codes
+        self.retryable_status = retryable_status
+        self.stats = RetryStats()
+
+    @staticmethod
+    def is_idempotent(method: str) -> bool:
+        return method.upper() in IDEMPOTENT_METHODS
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后应等待的秒数"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+    def api_error_reason(self, code: int | None, status_code: int) -> str | None:
+        """飞书接口错误是否可重试，可重试时返回原因标签"""
+        if code is not None and code in self.retryable_codes:
+            return f"code_{code}"
+        if status_code in self.retryable_status:
+            return f"http_{status_code}"
+        return None
+
+    def retry_delay(self, reason: str | None, attempt: int, elapsed: float,
+                    idempotent: bool, safe: bool = False) -> float | None:
+        """
+        判断是否重试
+
+        :param reason: 错误原因标签，None 表示不可重试的错误
+        :param attempt: 已尝试次数
+        :param elapsed: 已在重试等待上花费的秒数
+        :param idempotent: 请求是否幂等
+        :param safe: 请求确定未被服务端处理（如建连失败、被频控），非幂等请求也可重发
+        :return: 需要等待的秒数，不重试时返回 None
+        """
+        if reason is None or attempt >= self.max_attempts:
+            return None
+        if not (idempotent or safe):
+            return None
+        delay = self.backoff(attempt)
+        if elapsed + delay > self.retry_budget:
+            return None
+        return delay
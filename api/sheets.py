@@ -1,6 +1,7 @@
 """飞书表格 (Spreadsheet) API 封装"""
 
 from api.auth import FeishuAuth
+from api.async_auth import AsyncFeishuAuth
 
 
 class SheetsAPI:
@@ -162,3 +163,14 @@ class SheetsAPI:
             f"/sheets/v2/spreadsheets/{spreadsheet_token}/values_batch_update",
             json=payload,
         )
+
+
+class AsyncSheetsAPI(SheetsAPI):
+    """
+    表格接口的异步版本，需配合 AsyncFeishuAuth 使用。
+
+    SheetsAPI 的方法均为单次请求，直接复用其路径与参数构建，返回值需 await。
+    """
+
+    def __init__(self, auth: AsyncFeishuAuth):
+        super().__init__(auth)
@@ -0,0 +1,153 @@
+"""用户资料缓存：LRU + TTL，批量接口补齐缺失用户，并发查询同一用户只请求一次"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from api.contacts import ContactsAPI
+
+USER_BATCH_LIMIT = 50  # /contact/v3/users/batch 每次最多 50 个 ID
+USER_CACHE_SIZE = 5000
+USER_CACHE_TTL = 1800  # 用户资料缓存有效期（秒）
+FETCH_WORKERS = 4  # 同时在途的批量请求数
+
+
+class UserProfileCache:
+    """
+    按 open_id 缓存用户资料（线程安全）
+
+    get_many 先取缓存，未命中的 ID 若已有其他线程在请求则等待其结果，
+    其余按 50 个一批调用批量接口。查不到的用户（离职、无权限等）也会缓存为 None，
+    避免重复请求。
+    """
+
+    def __init__(self, contacts_api: ContactsAPI, max_size: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        """
+        :param contacts_api: 联系人接口
+        :param max_size: 最多缓存的用户数，超出后淘汰最久未使用的
+        :param ttl: 缓存有效期（秒）
+        """
+        self.api = contacts_api
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, dict | None]] = OrderedDict()  # open_id -> (过期时间, 用户)
+        self._inflight: dict[str, Future] = {}  # 正在请求中的 open_id
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+
+    def peek(self, open_id: str) -> dict | None:
+        """只读缓存，不发请求（可在 UI 线程调用）"""
+        with self._lock:
+            return self._get_cached(open_id, time.time())[1]
+
+    def get(self, open_id: str) -> dict | None:
+        """获取单个用户资料，查不到时返回 None"""
+        return self.get_many([open_id]).get(open_id)
+
+    def get_many(self, open_ids: list[str]) -> dict[str, dict | None]:
+        """
+        批量获取用户资料
+
+        :param open_ids: open_id 列表，可重复
+        :return: open_id -> 用户资料（查不到为 None）
+        """
+        result: dict[str, dict | None] = {}
+        waiting: dict[str, Future] = {}
+        to_fetch: list[str] = []
+        now = time.time()
+
+        with self._lock:
+            for open_id in dict.fromkeys(open_ids):
+                if not open_id:
+                    continue
+                found, user = self._get_cached(open_id, now)
+                if found:
+                    self.hits += 1
+                    result[open_id] = user
+                elif open_id in self._inflight:
+                    waiting[open_id] = self._inflight[open_id]
+                else:
+                    self.misses += 1
+                    self._inflight[open_id] = waiting[open_id] = Future()
+                    to_fetch.append(open_id)
+
+        if to_fetch:
+            self._fetch(to_fetch)
+        for open_id, future in waiting.items():
+            result[open_id] = future.result()
+        return result
+
+    def put(self, users: list[dict]):
+        """写入其他接口已经拿到的用户资料"""
+        expire = time.time() + self.ttl
+        with self._lock:
+            for user in users:
+                if user.get("open_id"):
+                    self._store(user["open_id"], expire, user)
+
+    def invalidate(self, open_id: str | None = None):
+        with self._lock:
+            if open_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(open_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "requests": self.requests}
+
+    def _get_cached(self, open_id: str, now: float) -> tuple[bool, dict | None]:
+        """调用方需持锁，返回 (是否命中, 用户)"""
+        entry = self._entries.get(open_id)
+        if entry is None:
+            return False, None
+        if entry[0] <= now:
+            del self._entries[open_id]
+            return False, None
+        self._entries.move_to_end(open_id)
+        return True, entry[1]
+
+    def _store(self, open_id: str, expire: float, user: dict | None):
+        """调用方需持锁"""
+        self._entries[open_id] = (expire, user)
+        self._entries.move_to_end(open_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _fetch(self, open_ids: list[str]):
+        """请求缺失的用户并唤醒等待者；出错时等待者收到同一个异常"""
+        chunks = [open_ids[i:i + USER_BATCH_LIMIT] for i in range(0, len(open_ids), USER_BATCH_LIMIT)]
+        try:
+            if len(chunks) == 1:
+                pages = [self._fetch_chunk(chunks[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(chunks))) as pool:
+                    pages = list(pool.map(self._fetch_chunk, chunks))
+        except Exception as e:
+            with self._lock:
+                for open_id in open_ids:
+                    self._inflight.pop(open_id).set_exception(e)
+            return
+
+        users = {user["open_id"]: user for page in pages for user in page if user.get("open_id")}
+        expire = time.time() + self.ttl
+        with self._lock:
+            for open_id in open_ids:
+                user = users.get(open_id)
+                self._store(open_id, expire, user)
+                self._inflight.pop(open_id).set_result(user)
+
+    def _fetch_chunk(self, open_ids: list[str]) -> list[dict]:
+        with self._lock:
+            self.requests += 1
+        return self.api.batch_get_users(open_ids).get("data", {}).get("items", [])
+
+
+def display_name(user: dict | None, fallback: str = "") -> str:
+    """用户的显示名：姓名，其次英文名，都没有时用 fallback"""
+    if not user:
+        return fallback
+    return user.get("name") or user.get("en_name") or fallback
@@ -0,0 +1,99 @@
+"""
+卡片模板基准：模拟给 N 个用户群发个性化卡片，对比每条都 CardBuilder.build + json.dumps 的旧方式
+与预编译模板渲染（无缓存 / 变量值重复时命中缓存）的耗时
+
+用法: python benchmarks/bench_card_template.py [用户数]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import card_template  # noqa: E402
+from api.messages import CardBuilder  # noqa: E402
+
+SURNAMES = "赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨"
+DEPARTMENTS = [f"部门{i:02d}" for i in range(40)]
+
+CARD = dict(
+    title="{{dept}} 月度报告",
+    template="blue",
+    content="**{{name}}**，你好：\n你本月的绩效结果已发布，请在 3 个工作日内确认。",
+    fields=[
+        {"title": "部门", "value": "{{dept}}"},
+        {"title": "评级", "value": "{{grade}}"},
+        {"title": "截止日期", "value": "2024-07-05"},
+        {"title": "负责人", "value": "HRBP"},
+    ],
+    buttons=[{"text": "查看详情", "url": "https://example.com/review?dept={{dept}}"}],
+    note="如有疑问请联系 HRBP",
+)
+
+
+def make_recipients(count: int, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "name": rng.choice(SURNAMES) + "".join(rng.choice(SURNAMES) for _ in range(rng.randint(1, 2))),
+            "dept": rng.choice(DEPARTMENTS),
+            "grade": rng.choice("ABC"),
+        }
+        for _ in range(count)
+    ]
+
+
+def legacy_render(values: dict) -> str:
+    """旧方式：每个接收者构建一次卡片字典再序列化（即 send_interactive_message 内部的做法）"""
+    return json.dumps(CardBuilder.build(
+        title=f"{values['dept']} 月度报告",
+        template="blue",
+        content=f"**{values['name']}**，你好：\n你本月的绩效结果已发布，请在 3 个工作日内确认。",
+        fields=[
+            {"title": "部门", "value": values["dept"]},
+            {"title": "评级", "value": values["grade"]},
+            {"title": "截止日期", "value": "2024-07-05"},
+            {"title": "负责人", "value": "HRBP"},
+        ],
+        buttons=[{"text": "查看详情", "url": f"https://example.com/review?dept={values['dept']}"}],
+        note="如有疑问请联系 HRBP",
+    ))
+
+
+def timed(label: str, func, items: list[dict], baseline: float | None = None, rounds: int = 3) -> float:
+    """取 rounds 轮中最快的一轮"""
+    elapsed = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for values in items:
+            func(values)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    speedup = f"  ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"{label:<30}{elapsed * 1000:8.1f} ms  {elapsed / len(items) * 1e6:6.2f} µs/条{speedup}")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    recipients = make_recipients(count)
+    template = CardBuilder.compile(cache_size=0, **CARD)
+    for values in recipients[:2000]:
+        assert json.loads(template.render(**values)) == json.loads(legacy_render(values)), values
+
+    backend = "orjson" if card_template.orjson is not None else "json"
+    print(f"{count} 个接收者，模板变量: {', '.join(template.variables)}，转义后端: {backend}")
+    baseline = timed("build + json.dumps", legacy_render, recipients)
+    timed("模板渲染（无缓存）", lambda values: template.render(**values), recipients, baseline)
+
+    # 不含姓名的卡片：变量只有部门和评级，大部分接收者命中缓存
+    shared = CardBuilder.compile(**{**CARD, "content": "你本月的绩效结果已发布，请在 3 个工作日内确认。"})
+    timed("模板渲染（按部门+评级缓存）", lambda values: shared.render(dept=values["dept"], grade=values["grade"]),
+          recipients, baseline)
+    print(shared.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+部门遍历基准：对比深度优先逐个请求（_recursive_get_departments）与广度优先并发遍历（iter_departments）
+
+在本地起一个模拟通讯录接口的 HTTP 服务，每个请求固定延迟，模拟真实网络往返。
+
+用法: python benchmarks/bench_departments.py [部门数] [每请求延迟毫秒]
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.auth import FeishuAuth  # noqa: E402
+from api.contacts import ContactsAPI  # noqa: E402
+from api.ratelimit import RateLimiter  # noqa: E402
+
+PAGE_SIZE = 50
+
+
+def build_tree(count: int, seed: int = 1) -> dict[str, list[dict]]:
+    """随机生成部门树，返回 父部门 ID -> 直接子部门列表"""
+    rng = random.Random(seed)
+    children: dict[str, list[dict]] = {"0": []}
+    ids = ["0"]
+    for i in range(1, count + 1):
+        # 偏向挂在较新的部门下，树更深
+        parent = ids[max(0, len(ids) - 1 - int(rng.expovariate(0.05)))]
+        dept_id = f"od-{i}"
+        children.setdefault(parent, []).append(
+            {"department_id": dept_id, "parent_department_id": parent, "name": f"部门 {i}"}
+        )
+        children[dept_id] = []
+        ids.append(dept_id)
+    return children
+
+
+def descendants(children: dict[str, list[dict]], parent: str) -> list[dict]:
+    result = []
+    stack = [parent]
+    while stack:
+        for dept in children.get(stack.pop(), []):
+            result.append(dept)
+            stack.append(dept["department_id"])
+    return result
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 128  # 并发建连较多，默认 backlog 5 会被重置
+
+
+def make_handler(children: dict[str, list[dict]], delay: float, counter: list[int]):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, body: dict):
+            raw = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self._reply({"code": 0, "tenant_access_token": "t-bench", "expire": 7200})
+
+        def do_GET(self):
+            counter[0] += 1
+            time.sleep(delay)
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            parent = url.path.rstrip("/").split("/")[-2]
+            if query.get("fetch_child") == ["true"]:
+                items = descendants(children, parent)
+            else:
+                items = children.get(parent, [])
+            start = int(query.get("page_token", ["0"])[0])
+            page = items[start:start + PAGE_SIZE]
+            has_more = start + PAGE_SIZE < len(items)
+            self._reply({"code": 0, "data": {
+                "items": page,
+                "has_more": has_more,
+                "page_token": str(start + PAGE_SIZE) if has_more else "",
+            }})
+
+    return Handler
+
+
+def run(label: str, func, counter: list[int]):
+    counter[0] = 0
+    start = time.perf_counter()
+    departments = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {len(departments):>6} 个部门  {counter[0]:>6} 次请求  {elapsed:>7.2f}s")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+
+    children = build_tree(count)
+    counter = [0]
+    server = _Server(("127.0.0.1", 0), make_handler(children, delay, counter))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    auth = FeishuAuth("bench", "bench", use_token_cache=False, rate_limiter=RateLimiter(default_rate=10000))
+    auth.BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    api = ContactsAPI(auth)
+
+    print(f"部门数 {count}，每请求延迟 {delay * 1000:.0f}ms")
+    baseline = run("递归（深度优先，串行）", lambda: _recursive(api), counter)
+    for workers in (4, 8, 16):
+        elapsed = run(f"广度优先 workers={workers}", lambda: api.get_all_departments(max_workers=workers), counter)
+        print(f"{'':<24} 加速 {baseline / elapsed:.1f}x")
+    run("fetch_child=true", lambda: api.get_all_departments(fetch_child=True), counter)
+
+    auth.close()
+    server.shutdown()
+
+
+def _recursive(api: ContactsAPI) -> list[dict]:
+    result = []
+    api._recursive_get_departments("0", result)
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+文档写入基准：把 N 行 Markdown 写入文档，对比旧实现（一次请求提交全部子块）与分批写入（append_blocks）
+
+在本地起一个模拟 docx 创建子块接口的 HTTP 服务：每次最多 50 个子块、按 client_token 去重、
+每个请求固定延迟；频控使用 DEFAULT_LIMITS 中该接口的速率（可用第 3 个参数覆盖）。
+
+用法: python benchmarks/bench_doc_writer.py [行数] [每请求延迟毫秒] [每秒请求数]
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.auth import FeishuAPIError, FeishuAuth  # noqa: E402
+from api.doc_blocks import markdown_blocks  # noqa: E402
+from api.documents import CHILDREN_BATCH_LIMIT, DocumentsAPI  # noqa: E402
+from api.ratelimit import DEFAULT_LIMITS, RateLimiter  # noqa: E402
+
+DOCUMENT_ID = "doxcnBench7Kq2Xv9Lm"
+WORDS = ["今天", "会议", "项目", "进度", "确认", "上线", "周报", "需求", "评审", "发布", "接口", "文档"]
+
+
+def make_markdown(lines: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    out = []
+    while len(out) < lines:
+        words = "".join(rng.choice(WORDS) for _ in range(rng.randint(3, 20)))
+        kind = rng.random()
+        if kind < 0.05:
+            out.append(f"{'#' * rng.randint(1, 3)} {words[:12]}")
+        elif kind < 0.25:
+            out.append(f"- {words}")
+        elif kind < 0.35:
+            out.append(f"{rng.randint(1, 9)}. {words}")
+        elif kind < 0.38:
+            out.extend(["```", f"print('{words}')", "x = 1", "```"])
+        elif kind < 0.40:
+            out.append("---")
+        else:
+            out.append(words)
+    return "\n".join(out[:lines])
+
+
+class DocServer(ThreadingHTTPServer):
+    """模拟文档：记录根块下的子块顺序与每个 client_token 的结果"""
+
+    def __init__(self, delay: float):
+        super().__init__(("127.0.0.1", 0), make_handler())
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.children: list[dict] = []
+        self.revision = 1
+        self.tokens: dict[str, dict] = {}
+        self.requests = 0
+
+
+def make_handler():
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, body: dict, status: int = 200):
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if "tenant_access_token" in self.path:
+                self._reply({"code": 0, "tenant_access_token": "t-bench", "expire": 7200})
+                return
+            server: DocServer = self.server
+            time.sleep(server.delay)
+            children = json.loads(body)["children"]
+            token = parse_qs(urlparse(self.path).query).get("client_token", [""])[0]
+            with server.lock:
+                server.requests += 1
+                if len(children) > CHILDREN_BATCH_LIMIT:
+                    self._reply({"code": 1770001, "msg": "invalid param: children 超过 50 个"}, 400)
+                    return
+                if token in server.tokens:
+                    self._reply(server.tokens[token])
+                    return
+                server.children.extend(children)
+                server.revision += 1
+                data = {"code": 0, "data": {"children": children, "document_revision_id": server.revision}}
+                if token:
+                    server.tokens[token] = data
+            self._reply(data)
+
+    return Handler
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    limits = DEFAULT_LIMITS
+    if len(sys.argv) > 3:
+        limits = [(m, p, float(sys.argv[3]) if "docx" in p else r) for m, p, r in DEFAULT_LIMITS]
+    rate = next(r for m, p, r in limits if "docx" in p)
+
+    content = make_markdown(lines)
+    start = time.perf_counter()
+    blocks = markdown_blocks(content)
+    parse_elapsed = time.perf_counter() - start
+    print(f"{lines} 行 Markdown -> {len(blocks)} 个块，解析 {parse_elapsed * 1000:.1f} ms；"
+          f"每请求延迟 {delay * 1000:.0f}ms，接口限速 {rate:g} 次/秒")
+
+    server = DocServer(delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    auth = FeishuAuth("bench", "bench", use_token_cache=False, rate_limiter=RateLimiter(limits))
+    auth.BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    api = DocumentsAPI(auth)
+
+    # 旧实现：所有子块放在一个请求里
+    try:
+        api.create_children(DOCUMENT_ID, DOCUMENT_ID, blocks)
+        print("旧实现（单次请求）            成功")
+    except FeishuAPIError as e:
+        print(f"旧实现（单次请求）            失败: {e}")
+
+    def progress(done: int, total: int):
+        if done % (CHILDREN_BATCH_LIMIT * 40) == 0 or done == total:
+            print(f"  {done}/{total}")
+
+    report = api.append_blocks(DOCUMENT_ID, blocks, on_progress=progress)
+    assert server.children == blocks, "写入顺序与原文不一致"
+    print(f"分批写入                      {report['batches']} 批  {report['elapsed']:.1f}s  "
+          f"{report['blocks_per_sec']:.0f} 块/秒  （理论上限 {rate * CHILDREN_BATCH_LIMIT:.0f} 块/秒）")
+
+    auth.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
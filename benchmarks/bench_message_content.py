@@ -0,0 +1,151 @@
+"""
+消息内容解析基准：生成 N 条模拟消息，对比逐条 json.loads + if/elif 的旧解析方式
+与查表解析（标准库 json / orjson）、按 message_id 缓存后的重复解析耗时
+
+用法: python benchmarks/bench_message_content.py [消息数]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import message_content  # noqa: E402
+from api.message_content import MessageContentCache, decode_content  # noqa: E402
+
+WORDS = ["今天", "会议", "项目", "进度", "请", "确认", "上线", "周报", "需求", "评审", "OK", "收到", "明天", "发布"]
+
+
+def make_messages(count: int, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+    kinds = ["text"] * 60 + ["post"] * 15 + ["interactive"] * 8 + ["image"] * 8 + ["file"] * 4 + ["sticker"] * 5
+    messages = []
+    for i in range(count):
+        msg_type = rng.choice(kinds)
+        words = "".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30)))
+        if msg_type == "text":
+            content = {"text": words}
+        elif msg_type == "post":
+            content = {"zh_cn": {"title": words[:8], "content": [
+                [{"tag": "text", "text": words}, {"tag": "at", "user_id": "ou_x", "user_name": "张三"}],
+                [{"tag": "a", "text": "链接", "href": "https://example.com"}, {"tag": "img", "image_key": "k"}],
+            ] * rng.randint(1, 3)}}
+        elif msg_type == "interactive":
+            content = {"header": {"title": {"tag": "plain_text", "content": words[:10]}},
+                       "elements": [{"tag": "div", "text": {"tag": "lark_md", "content": words}}]}
+        elif msg_type == "file":
+            content = {"file_key": "file_v2_x", "file_name": f"{words[:6]}.pdf"}
+        else:
+            content = {"image_key": "img_v2_x"}
+        messages.append({
+            "message_id": f"om_{i:010x}",
+            "msg_type": msg_type,
+            "update_time": "1700000000000",
+            "body": {"content": json.dumps(content, ensure_ascii=False)},
+        })
+    return messages
+
+
+def legacy_parse(msg: dict) -> str:
+    """原 ui/messages_tab.py 中的 _parse_msg_content，作为对照"""
+    msg_type = msg.get("msg_type", "")
+    body = msg.get("body", {})
+    content_str = body.get("content", "{}")
+
+    try:
+        content = json.loads(content_str)
+    except (json.JSONDecodeError, TypeError):
+        content = {}
+
+    if msg_type == "text":
+        return content.get("text", content_str)
+    elif msg_type == "post":
+        parts = []
+        zh = content.get("zh_cn", content.get("en_us", {}))
+        title = zh.get("title", "")
+        if title:
+            parts.append(f"[{title}]")
+        for paragraph in zh.get("content", []):
+            line_parts = []
+            for elem in paragraph:
+                tag = elem.get("tag", "")
+                if tag == "text":
+                    line_parts.append(elem.get("text", ""))
+                elif tag == "a":
+                    line_parts.append(elem.get("text", "") + f"({elem.get('href', '')})")
+                elif tag == "at":
+                    line_parts.append(f"@{elem.get('user_name', elem.get('user_id', ''))}")
+                elif tag == "img":
+                    line_parts.append("[图片]")
+                elif tag == "media":
+                    line_parts.append("[媒体]")
+            parts.append("".join(line_parts))
+        return "\n".join(parts)
+    elif msg_type == "image":
+        return "[图片消息]"
+    elif msg_type == "file":
+        return f"[文件] {content.get('file_name', '')}"
+    elif msg_type == "audio":
+        return "[语音消息]"
+    elif msg_type == "sticker":
+        return "[表情]"
+    elif msg_type == "interactive":
+        header = content.get("header", {})
+        title = header.get("title", {}).get("content", "")
+        return f"[卡片] {title}" if title else "[卡片消息]"
+    elif msg_type == "share_chat":
+        return f"[分享群聊] {content.get('chat_name', '')}"
+    elif msg_type == "share_user":
+        return "[分享名片]"
+    elif msg_type == "system":
+        return "[系统消息]"
+    elif msg_type == "merge_forward":
+        return "[合并转发]"
+    else:
+        return f"[{msg_type}]"
+
+
+def timed(label: str, func, messages: list[dict], baseline: float | None = None, rounds: int = 3) -> float:
+    """取 rounds 轮中最快的一轮"""
+    elapsed = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for msg in messages:
+            func(msg)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    speedup = f"  ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"{label:<28}{elapsed * 1000:8.1f} ms  {elapsed / len(messages) * 1e6:6.2f} µs/条{speedup}")
+    return elapsed
+
+
+def decode(msg: dict) -> str:
+    return decode_content(msg.get("msg_type", ""), (msg.get("body") or {}).get("content", "{}"))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    messages = make_messages(count)
+    for msg in messages[:2000]:
+        assert decode(msg) == legacy_parse(msg), msg["message_id"]
+
+    print(f"{count} 条消息，JSON 后端: {message_content.JSON_BACKEND}")
+    baseline = timed("旧解析 (json + if/elif)", legacy_parse, messages)
+
+    backend = message_content._loads
+    message_content._loads = json.loads
+    timed("查表解析 (json)", decode, messages, baseline)
+    message_content._loads = backend
+    if message_content.JSON_BACKEND != "json":
+        timed(f"查表解析 ({message_content.JSON_BACKEND})", decode, messages, baseline)
+
+    cache = MessageContentCache(max_size=count)
+    timed("缓存首次解析", cache.text, messages, baseline, rounds=1)
+    timed("缓存命中（刷新重绘）", cache.text, messages, baseline)
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
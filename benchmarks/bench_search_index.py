@@ -0,0 +1,84 @@
+"""
+用户搜索索引基准：构建 N 个模拟用户的索引，测量各类查询的平均耗时
+
+用法: python benchmarks/bench_search_index.py [用户数]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.search_index import UserSearchIndex, lazy_pinyin  # noqa: E402
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈"
+GIVEN = "伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超秀兰霞平刚桂英华建国志红玉兰晓东海燕文斌子涵雨轩浩宇欣怡"
+EN_FIRST = ["alice", "bob", "carol", "david", "emma", "frank", "grace", "henry", "ivy", "jack", "kevin", "lily"]
+
+
+def make_users(count: int, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+    users = []
+    for i in range(count):
+        name = rng.choice(SURNAMES) + "".join(rng.choice(GIVEN) for _ in range(rng.randint(1, 2)))
+        en = f"{rng.choice(EN_FIRST)} {rng.choice(EN_FIRST)}{i}"
+        users.append({
+            "open_id": f"ou_{i:08x}",
+            "name": name,
+            "en_name": en,
+            "email": f"{en.replace(' ', '.')}@example.com",
+            "mobile": f"13{rng.randint(0, 999999999):09d}",
+        })
+    return users
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    users = make_users(count)
+
+    index = UserSearchIndex()
+    start = time.perf_counter()
+    index.build(users)
+    print(f"构建 {count} 个用户的索引: {time.perf_counter() - start:.2f}s"
+          f"（拼音{'已启用' if lazy_pinyin else '未启用，安装 pypinyin 后支持'}）")
+
+    queries = {
+        "姓名前缀": ["王", "李娜", "张伟"],
+        "姓名片段": ["明", "晓东", "子涵"],
+        "英文名": ["alice", "bob c", "gr"],
+        "邮箱": ["kevin.lily", "emma.f"],
+        "手机号": ["138", "13912"],
+        "拼音": ["wang", "zhangw", "lm"],
+    }
+    rounds = 200
+    for label, items in queries.items():
+        start = time.perf_counter()
+        hits = 0
+        for _ in range(rounds):
+            for query in items:
+                hits += len(index.search(query, limit=20))
+        avg_ms = (time.perf_counter() - start) / (rounds * len(items)) * 1000
+        print(f"{label:<6} 平均 {avg_ms:.3f}ms/次  平均命中 {hits / (rounds * len(items)):.0f} 条")
+
+    # 增量更新：模拟反复点击部门（500 人，其中 50 人资料有变化）后立即搜索
+    rng = random.Random(2)
+    worst_add = worst_search = 0.0
+    for round_no in range(50):
+        department = [dict(user) for user in rng.sample(users, 500)]
+        for user in department[:50]:
+            user["name"] += "新"
+            user["en_name"] += f" x{round_no}"
+        start = time.perf_counter()
+        index.add_users(department)
+        worst_add = max(worst_add, time.perf_counter() - start)
+        start = time.perf_counter()
+        index.search("王", limit=20)
+        worst_search = max(worst_search, time.perf_counter() - start)
+    print(f"增量更新 50 轮：add_users 最长 {worst_add * 1000:.1f}ms，其后首次搜索最长 {worst_search * 1000:.1f}ms，"
+          f"索引用户数 {len(index)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""任务日志：崩溃时写了一半的末行不能吞掉恢复后追加的结果"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.jobs import STATUS_OK, JobJournal  # noqa: E402
+
+
+def test_torn_last_line_is_truncated_on_load(tmp_path):
+    path = str(tmp_path / "job.jsonl")
+    items = [{"key": "a"}, {"key": "b"}, {"key": "c"}]
+    journal = JobJournal.create(path, {"kind": "test"}, items)
+    journal.record("a", {"status": STATUS_OK})
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "b", "sta')  # 写第二条结果时崩溃
+
+    journal = JobJournal.load(path)
+    assert [item["key"] for item in journal.pending_items()] == ["b", "c"]
+    journal.record("b", {"status": STATUS_OK})
+    journal.close()
+
+    journal = JobJournal.load(path)
+    journal.close()
+    assert [item["key"] for item in journal.pending_items()] == ["c"]
+    with open(path, encoding="utf-8") as f:
+        assert f.read().endswith("\n")
@@ -0,0 +1,119 @@
+"""头像服务：内存中缓存预缩放的头像，磁盘缓存下载结果，限制同时下载数，过期后用 ETag 条件请求校验"""
+
+import time
+from collections import deque
+
+from PySide6.QtCore import QObject, Qt, QUrl, Signal
+from PySide6.QtGui import QPixmap
+from PySide6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+
+from utils.avatar_store import AvatarStore
+
+AVATAR_MAX_DOWNLOADS = 6  # 同时进行的下载数
+AVATAR_REVALIDATE_AFTER = 24 * 3600  # 磁盘缓存超过这个秒数后向服务端校验一次
+
+
+class AvatarService(QObject):
+    """
+    共享头像服务（在 UI 线程使用）
+
+    avatar() 立即返回内存或磁盘中已有的头像；没有缓存或缓存需要校验时排队下载，
+    下载完成（或校验发现头像已变化）后发出 avatar_ready(url, size, pixmap)。
+    同一 URL 同时只下载一次，按请求过的所有尺寸各缩放一次后缓存。
+    """
+
+    avatar_ready = Signal(str, int, QPixmap)
+
+    def __init__(self, store: AvatarStore | None = None, max_downloads: int = AVATAR_MAX_DOWNLOADS,
+                 revalidate_after: float = AVATAR_REVALIDATE_AFTER, parent=None):
+        """
+        :param store: 磁盘缓存，默认使用 config.json 同目录的 avatars/
+        :param max_downloads: 同时进行的下载数
+        :param revalidate_after: 磁盘缓存的校验间隔（秒）
+        """
+        super().__init__(parent)
+        self.store = store or AvatarStore()
+        self.max_downloads = max_downloads
+        self.revalidate_after = revalidate_after
+        self._net = QNetworkAccessManager(self)
+        self._pixmaps: dict[tuple[str, int], QPixmap] = {}  # (url, 尺寸) -> 缩放后的头像
+        self._sizes: dict[str, set[int]] = {}  # url -> 请求过的尺寸
+        self._queue: deque[str] = deque()
+        self._pending: set[str] = set()  # 排队或下载中的 url
+        self._active = 0
+
+    def avatar(self, url: str, size: int = 32) -> QPixmap | None:
+        """
+        获取头像
+
+        :param url: 头像 URL
+        :param size: 边长（像素）
+        :return: 已缓存的头像，没有时返回 None（下载完成后通过 avatar_ready 通知）
+        """
+        if not url:
+            return None
+        self._sizes.setdefault(url, set()).add(size)
+        pixmap = self._pixmaps.get((url, size))
+        if pixmap is not None:
+            return pixmap
+
+        entry = self.store.lookup(url)
+        if entry is not None:
+            pixmap = self._scaled(url, QPixmap(entry["path"]), size)
+        if entry is None or pixmap is None or time.time() - entry["checked_at"] > self.revalidate_after:
+            self._enqueue(url)
+        return pixmap
+
+    def _scaled(self, url: str, source: QPixmap, size: int) -> QPixmap | None:
+        if source.isNull():
+            return None
+        pixmap = source.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self._pixmaps[(url, size)] = pixmap
+        return pixmap
+
+    # ── 下载队列 ──────────────────────────
+
+    def _enqueue(self, url: str):
+        if url in self._pending:
+            return
+        self._pending.add(url)
+        self._queue.append(url)
+        self._pump()
+
+    def _pump(self):
+        while self._queue and self._active < self.max_downloads:
+            self._start_download(self._queue.popleft())
+
+    def _start_download(self, url: str):
+        request = QNetworkRequest(QUrl(url))
+        entry = self.store.lookup(url)
+        if entry is not None:
+            # 已有缓存时发条件请求，头像未变时服务端返回 304，不再传输图片
+            if entry["etag"]:
+                request.setRawHeader(b"If-None-Match", entry["etag"].encode())
+            if entry["last_modified"]:
+                request.setRawHeader(b"If-Modified-Since", entry["last_modified"].encode())
+        self._active += 1
+        reply = self._net.get(request)
+        reply.finished.connect(lambda: self._on_finished(reply, url))
+
+    def _on_finished(self, reply: QNetworkReply, url: str):
+        self._active -= 1
+        self._pending.discard(url)
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        if status == 304:
+            self.store.touch(url)
+        elif reply.error() == QNetworkReply.NoError:
+            data = bytes(reply.readAll())
+            source = QPixmap()
+            source.loadFromData(data)
+            if not source.isNull():
+                self.store.save(
+                    url, data,
+                    etag=bytes(reply.rawHeader(b"ETag")).decode(errors="ignore"),
+                    last_modified=bytes(reply.rawHeader(b"Last-Modified")).decode(errors="ignore"),
+                )
+                for size in self._sizes.get(url, {32}):
+                    self.avatar_ready.emit(url, size, self._scaled(url, source, size))
+        reply.deleteLater()
+        self._pump()
@@ -0,0 +1,168 @@
+"""会话列表模型：预先计算每个会话的搜索键（小写 + 拼音），过滤时只做字符串包含判断"""
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+from PySide6.QtGui import QColor, QFont, QIcon
+
+from utils.search_index import pinyin_keys
+
+# 与原 QListWidgetItem 的数据角色保持一致
+CHAT_ID_ROLE = Qt.UserRole  # chat_id，单聊联系人为 open_id
+CHAT_NAME_ROLE = Qt.UserRole + 1
+CHAT_TYPE_ROLE = Qt.UserRole + 2  # group / p2p / separator
+
+TYPE_GROUP = "group"
+TYPE_P2P = "p2p"
+TYPE_SEPARATOR = "separator"
+
+FILTER_ALL = 0
+FILTER_GROUP = 1
+FILTER_P2P = 2
+
+
+def chat_search_key(text: str, name: str = "", chat_id: str = "") -> str:
+    """会话的搜索键：显示文本与 ID 的小写，中文名另加全拼与首字母（需要 pypinyin）"""
+    keys = [text.lower(), chat_id.lower()]
+    suffixes, initials = pinyin_keys(name)
+    if suffixes:
+        keys.extend((suffixes[0], initials))
+    return "\x1f".join(keys)
+
+
+def _fill_key(row: dict):
+    """行缺少 "key" 时按名称与 ID 生成搜索键"""
+    if "key" not in row:
+        row["key"] = chat_search_key(row["text"], row["name"], row["id"])
+
+
+class ChatListModel(QAbstractListModel):
+    """
+    会话列表
+
+    每行是一个字典：{"id", "name", "type", "text", "tooltip", "key"}，
+    头像另存于 chat_id -> QIcon，按 chat_id 定位行为 O(1)。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: list[dict] = []
+        self._row_of: dict[str, int] = {}  # id -> 行号
+        self._icons: dict[str, QIcon] = {}
+        self._separator_font = QFont()
+        self._separator_font.setBold(True)
+        self._separator_font.setPointSize(10)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def row(self, row: int) -> dict:
+        return self._rows[row]
+
+    def set_rows(self, rows: list[dict]):
+        """
+        替换全部会话
+
+        :param rows: 行字典列表，"key" 缺省时按名称与 ID 生成
+        """
+        self.beginResetModel()
+        self._rows = rows
+        for row in rows:
+            _fill_key(row)
+        self._row_of = {row["id"]: i for i, row in enumerate(rows) if row["type"] != TYPE_SEPARATOR}
+        self._icons = {}
+        self.endResetModel()
+
+    def replace_from(self, first: int, rows: list[dict]):
+        """
+        替换第 first 行及之后的行，之前的行（及其头像、选中状态）保持不变
+
+        :param first: 起始行号
+        :param rows: 新的行字典列表
+        """
+        first = min(first, len(self._rows))
+        if first < len(self._rows):
+            self.beginRemoveRows(QModelIndex(), first, len(self._rows) - 1)
+            for row in self._rows[first:]:
+                if row["type"] != TYPE_SEPARATOR:
+                    self._row_of.pop(row["id"], None)
+                    self._icons.pop(row["id"], None)
+            del self._rows[first:]
+            self.endRemoveRows()
+        if rows:
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            for i, row in enumerate(rows, first):
+                _fill_key(row)
+                if row["type"] != TYPE_SEPARATOR:
+                    self._row_of[row["id"]] = i
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def clear(self):
+        self.set_rows([])
+
+    def set_icon(self, chat_id: str, icon: QIcon):
+        row = self._row_of.get(chat_id)
+        if row is None:
+            return
+        self._icons[chat_id] = icon
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def flags(self, index):
+        if not index.isValid() or self._rows[index.row()]["type"] == TYPE_SEPARATOR:
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return row["text"]
+        if role == CHAT_ID_ROLE:
+            return row["id"]
+        if role == CHAT_NAME_ROLE:
+            return row["name"]
+        if role == CHAT_TYPE_ROLE:
+            return row["type"]
+        if role == Qt.ToolTipRole:
+            return row.get("tooltip")
+        if role == Qt.DecorationRole:
+            return self._icons.get(row["id"])
+        if row["type"] == TYPE_SEPARATOR:
+            if role == Qt.ForegroundRole:
+                return QColor("#999")
+            if role == Qt.FontRole:
+                return self._separator_font
+        return None
+
+
+class ChatFilterProxy(QSortFilterProxyModel):
+    """按搜索文本与会话类型过滤，直接读取源模型预先计算的搜索键"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._text = ""
+        self._type_filter = FILTER_ALL
+
+    def set_filter(self, text: str, type_filter: int):
+        """
+        :param text: 搜索文本（不区分大小写）
+        :param type_filter: FILTER_ALL / FILTER_GROUP / FILTER_P2P
+        """
+        text = text.strip().lower()
+        if text == self._text and type_filter == self._type_filter:
+            return
+        self._text = text
+        self._type_filter = type_filter
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        row = self.sourceModel().row(source_row)
+        chat_type = row["type"]
+        if chat_type == TYPE_SEPARATOR:
+            return self._type_filter != FILTER_GROUP  # 分隔线跟随单聊联系人的可见性
+        if self._type_filter == FILTER_GROUP and chat_type == TYPE_P2P:
+            return False
+        if self._type_filter == FILTER_P2P and chat_type != TYPE_P2P:
+            return False
+        return not self._text or self._text in row["key"]
@@ -0,0 +1,264 @@
+"""聊天记录视图：QListView + 自绘 delegate，只绘制可见的消息，支持增量追加与向上翻页"""
+
+from PySide6.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize, Signal
+from PySide6.QtGui import QFont, QFontMetrics, QColor, QPainter
+
+MESSAGE_ROLE = Qt.UserRole + 1
+
+_PADDING_X = 8
+_PADDING_Y = 5
+_LINE_GAP = 2
+_TEXT_INDENT = 4
+_TEXT_FLAGS = Qt.TextWordWrap | Qt.AlignLeft | Qt.AlignTop
+
+
+class ChatMessageModel(QAbstractListModel):
+    """
+    聊天消息列表模型
+
+    每行是一个字典：{"message_id", "create_time"(毫秒), "time", "sender", "text", "is_app"}，
+    按 create_time 正序排列，message_id 相同的消息只保留一条。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: list[dict] = []
+        self._index: dict[str, int] = {}  # message_id -> 行号
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == MESSAGE_ROLE:
+            return row
+        if role == Qt.DisplayRole:
+            return row["text"]
+        return None
+
+    def first_time(self) -> int | None:
+        """最早一条消息的时间（毫秒）"""
+        return self._rows[0]["create_time"] if self._rows else None
+
+    def set_messages(self, rows: list[dict]):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._reindex()
+        self.endResetModel()
+
+    def clear(self):
+        self.set_messages([])
+
+    def merge(self, rows: list[dict]) -> tuple[int, int]:
+        """
+        合并一批消息：已有的就地更新，比现有都新的追加到末尾，比现有都早的插到开头，
+        其余情况（中间插入）整体重置
+
+        :return: (插到开头的条数, 追加到末尾的条数)
+        """
+        if not self._rows:
+            self.set_messages(rows)
+            return 0, len(rows)
+
+        new_rows = []
+        for row in rows:
+            pos = self._index.get(row["message_id"])
+            if pos is None:
+                new_rows.append(row)
+            elif self._rows[pos] != row:
+                self._rows[pos] = row
+                index = self.index(pos)
+                self.dataChanged.emit(index, index)
+        if not new_rows:
+            return 0, 0
+
+        first, last = self._rows[0]["create_time"], self._rows[-1]["create_time"]
+        older = [row for row in new_rows if row["create_time"] < first]
+        newer = [row for row in new_rows if row["create_time"] >= last]
+        if len(older) + len(newer) != len(new_rows):
+            self.set_messages(sorted(self._rows + new_rows, key=lambda row: row["create_time"]))
+            return 0, len(new_rows)
+
+        if older:
+            self.beginInsertRows(QModelIndex(), 0, len(older) - 1)
+            self._rows[:0] = older
+            self._reindex()
+            self.endInsertRows()
+        if newer:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(newer) - 1)
+            self._rows.extend(newer)
+            self._reindex(start)
+            self.endInsertRows()
+        return len(older), len(newer)
+
+    def _reindex(self, start: int = 0):
+        if start == 0:
+            self._index.clear()
+        for i in range(start, len(self._rows)):
+            self._index[self._rows[i]["message_id"]] = i
+
+
+class ChatMessageDelegate(QStyledItemDelegate):
+    """绘制单条消息：时间、发送者、正文，高度按视图宽度折行计算并缓存"""
+
+    def __init__(self, view: QListView):
+        super().__init__(view)
+        self._view = view
+        self._size_cache: dict[tuple[str, int], int] = {}  # (message_id, 宽度) -> 行高
+        base = view.font()
+        self._time_font = QFont(base)
+        self._time_font.setPointSizeF(max(base.pointSizeF() - 2, 7))
+        self._sender_font = QFont(base)
+        self._sender_font.setBold(True)
+        self._text_font = QFont(base)
+
+    def clear_cache(self):
+        self._size_cache.clear()
+
+    def _text_width(self) -> int:
+        return max(self._view.viewport().width() - 2 * _PADDING_X - _TEXT_INDENT, 50)
+
+    def _heights(self, row: dict, width: int) -> tuple[int, int, int]:
+        time_h = QFontMetrics(self._time_font).height()
+        sender_h = QFontMetrics(self._sender_font).height()
+        text_h = QFontMetrics(self._text_font).boundingRect(
+            QRect(0, 0, width, 100000), _TEXT_FLAGS, row["text"]
+        ).height()
+        return time_h, sender_h, text_h
+
+    def sizeHint(self, option, index):
+        row = index.data(MESSAGE_ROLE)
+        width = self._text_width()
+        key = (row["message_id"], width)
+        height = self._size_cache.get(key)
+        if height is None:
+            time_h, sender_h, text_h = self._heights(row, width)
+            height = _PADDING_Y * 2 + time_h + sender_h + text_h + _LINE_GAP * 2
+            self._size_cache[key] = height
+        return QSize(self._view.viewport().width(), height)
+
+    def paint(self, painter: QPainter, option, index):
+        row = index.data(MESSAGE_ROLE)
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, QColor("#e6f0ff"))
+
+        width = self._text_width()
+        time_h, sender_h, text_h = self._heights(row, width)
+        x = option.rect.x() + _PADDING_X
+        y = option.rect.y() + _PADDING_Y
+
+        painter.setFont(self._time_font)
+        painter.setPen(QColor("#999"))
+        painter.drawText(QRect(x, y, width, time_h), Qt.AlignLeft | Qt.AlignVCenter, row["time"])
+        y += time_h + _LINE_GAP
+
+        painter.setFont(self._sender_font)
+        painter.setPen(QColor("#1677ff" if row["is_app"] else "#333"))
+        painter.drawText(QRect(x, y, width, sender_h), Qt.AlignLeft | Qt.AlignVCenter, row["sender"])
+        y += sender_h + _LINE_GAP
+
+        painter.setFont(self._text_font)
+        painter.setPen(QColor("#333"))
+        painter.drawText(QRect(x + _TEXT_INDENT, y, width, text_h), _TEXT_FLAGS, row["text"])
+        painter.restore()
+
+
+class ChatView(QListView):
+    """
+    聊天记录视图
+
+    - 只为可见行调用 delegate 绘制，数千条消息也不会整体重排
+    - 追加消息时若原本停在底部则自动滚到底部，否则保持当前位置
+    - 滚动到顶部时发出 load_older_requested，调用方加载更早的消息后 merge_messages 插到开头，
+      视图保持在原来的消息上
+    """
+
+    load_older_requested = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._model = ChatMessageModel(self)
+        self.setModel(self._model)
+        self._delegate = ChatMessageDelegate(self)
+        self.setItemDelegate(self._delegate)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setResizeMode(QListView.Adjust)
+        self.setWordWrap(True)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self._placeholder = ""
+        self._bottom_distance: int | None = None  # 布局更新后要恢复的“距底部距离”
+        self._older_enabled = False
+        self.verticalScrollBar().rangeChanged.connect(self._on_range_changed)
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+
+    # ── 数据 ──────────────────────────
+
+    def message_model(self) -> ChatMessageModel:
+        return self._model
+
+    def set_messages(self, rows: list[dict]):
+        """替换全部消息并滚动到底部"""
+        self._delegate.clear_cache()
+        self._bottom_distance = 0
+        self._model.set_messages(rows)
+        self.scrollToBottom()
+
+    def merge_messages(self, rows: list[dict]) -> tuple[int, int]:
+        """
+        合并消息（见 ChatMessageModel.merge），保持视图位置：
+        原来在底部则继续贴底，否则停留在原来的消息上
+
+        :return: (插到开头的条数, 追加到末尾的条数)
+        """
+        bar = self.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum()
+        self._bottom_distance = 0 if at_bottom else bar.maximum() - bar.value()
+        prepended, appended = self._model.merge(rows)
+        if at_bottom:
+            self.scrollToBottom()
+        elif not prepended:
+            self._bottom_distance = None  # 只在末尾追加时保持当前滚动位置即可
+        return prepended, appended
+
+    def set_older_enabled(self, enabled: bool):
+        """是否还能向上加载更早的消息（加载中或已到开头时关闭）"""
+        self._older_enabled = enabled
+
+    def clear(self):
+        self._model.clear()
+        self._older_enabled = False
+
+    def setPlaceholderText(self, text: str):
+        self._placeholder = text
+        self.viewport().update()
+
+    # ── 视图 ──────────────────────────
+
+    def _on_range_changed(self, _minimum: int, maximum: int):
+        if self._bottom_distance is not None:
+            self.verticalScrollBar().setValue(max(0, maximum - self._bottom_distance))
+            self._bottom_distance = None
+
+    def _on_scrolled(self, value: int):
+        if value == 0 and self._older_enabled and self._model.rowCount() > 0 \
+                and self.verticalScrollBar().maximum() > 0:
+            self._older_enabled = False
+            self.load_older_requested.emit()
+
+    def resizeEvent(self, event):
+        self._delegate.clear_cache()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._model.rowCount() == 0 and self._placeholder:
+            painter = QPainter(self.viewport())
+            painter.setPen(QColor("#999"))
+            rect = self.viewport().rect().adjusted(12, 12, -12, -12)
+            painter.drawText(rect, Qt.TextWordWrap | Qt.AlignLeft | Qt.AlignTop, self._placeholder)
@@ -1,5 +1,7 @@
 """联系人 Tab：部门树 + 用户列表 + 搜索"""
 
+import re
+
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -17,6 +19,11 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, QThread, Signal
 
+from api.directory import DIRECTORY_EVENTS, DirectoryCache
+from utils.search_index import UserSearchIndex
+
+_MOBILE_RE = re.compile(r"^\+?[\d-]{5,20}$")
+
 
 class ApiWorker(QThread):
     """通用异步 API 调用线程"""
@@ -44,12 +51,43 @@ class ContactsTab(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._contacts_api = None
+        self._directory = None  # 本地通讯录缓存，认证后按 app_id 打开
+        self._search_index = UserSearchIndex()  # 本地用户搜索索引，有数据时搜索不再请求接口
         self._worker = None
+        self._index_worker = None  # 后台同步全部用户并建索引，与 _worker 互不影响
         self._setup_ui()
 
     def set_api(self, contacts_api):
         """设置 API 实例（认证成功后调用）"""
         self._contacts_api = contacts_api
+        if self._directory is not None:
+            self._directory.close()
+        self._directory = DirectoryCache(contacts_api)
+
+        # 本地有未过期的通讯录时直接展示，无需等待接口
+        departments = self._directory.cached_departments()
+        if departments:
+            self._on_departments_loaded(departments)
+            self.status_label.setText(f"已从本地加载 {len(departments)} 个部门")
+        self._start_index_worker(self._build_search_index)
+
+    def set_event_bus(self, event_bus):
+        """订阅通讯录变更事件，本地通讯录与搜索索引随之更新"""
+        for event_type in DIRECTORY_EVENTS:
+            event_bus.subscribe(event_type, self._on_directory_event)
+
+    def _on_directory_event(self, event_type: str, event: dict):
+        """通讯录变更事件（在事件总线线程中调用）"""
+        directory = self._directory
+        if directory is None or not directory.apply_event(event_type, event):
+            return
+        if not len(self._search_index):
+            return  # 索引尚未建立，建立时会读取本地通讯录
+        user = event.get("object") or {}
+        if event_type == "contact.user.deleted_v3":
+            self._search_index.remove_user(user.get("open_id", ""))
+        elif event_type.startswith("contact.user."):
+            self._search_index.add_users([user])
 
     def _setup_ui(self):
         layout = QVBoxLayout(self)
@@ -59,6 +97,7 @@ class ContactsTab(QWidget):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("搜索用户（姓名/手机号/邮箱）...")
         self.search_input.returnPressed.connect(self._on_search)
+        self.search_input.textChanged.connect(self._on_search_text_changed)
         self.search_btn = QPushButton("搜索")
         self.search_btn.clicked.connect(self._on_search)
         search_layout.addWidget(self.search_input)
@@ -114,7 +153,7 @@ class ContactsTab(QWidget):
         layout.addWidget(self.status_label)
 
     def _load_departments(self):
-        """加载部门列表"""
+        """从接口重新拉取部门列表并更新本地缓存"""
         if not self._contacts_api:
             QMessageBox.warning(self, "提示", "请先完成认证")
             return
@@ -122,11 +161,36 @@ class ContactsTab(QWidget):
         self.status_label.setText("正在加载部门列表...")
         self.refresh_dept_btn.setEnabled(False)
 
-        self._worker = ApiWorker(self._contacts_api.get_all_departments, "0")
+        self._worker = ApiWorker(self._directory.get_departments, force=True)
         self._worker.finished.connect(self._on_departments_loaded)
+        self._worker.finished.connect(lambda _: self._start_index_worker(self._sync_and_build_search_index))
         self._worker.error.connect(self._on_api_error)
         self._worker.start()
 
+    # ── 本地搜索索引 ──────────────────────────
+
+    def _start_index_worker(self, func):
+        if self._index_worker is not None and self._index_worker.isRunning():
+            return
+        self._index_worker = ApiWorker(func)
+        self._index_worker.finished.connect(self._on_search_index_built)
+        self._index_worker.error.connect(lambda msg: self.status_label.setText(f"同步用户失败: {msg}"))
+        self._index_worker.start()
+
+    def _build_search_index(self) -> int:
+        """用本地通讯录中已有的用户建索引（在后台线程执行）"""
+        self._search_index.build(self._directory.store.get_all_users())
+        return len(self._search_index)
+
+    def _sync_and_build_search_index(self) -> int:
+        """拉取所有部门的成员后重建索引（在后台线程执行）"""
+        self._search_index.build(self._directory.sync_all_users())
+        return len(self._search_index)
+
+    def _on_search_index_built(self, count):
+        if count:
+            self.search_input.setPlaceholderText(f"搜索用户（姓名/拼音/手机号/邮箱，本地 {count} 人）...")
+
     def _on_departments_loaded(self, departments):
         """部门数据加载完成"""
         self.dept_tree.clear()
@@ -165,14 +229,20 @@ class ContactsTab(QWidget):
         if not dept_id:
             return
 
+        users = self._directory.cached_department_users(dept_id)
+        if users is not None:
+            self._on_users_loaded(users)
+            return
+
         self.status_label.setText(f"正在加载部门 [{item.text(0)}] 的用户...")
-        self._worker = ApiWorker(self._contacts_api.get_all_department_users, dept_id)
+        self._worker = ApiWorker(self._directory.get_department_users, dept_id)
         self._worker.finished.connect(self._on_users_loaded)
         self._worker.error.connect(self._on_api_error)
         self._worker.start()
 
     def _on_users_loaded(self, users):
         """用户数据加载完成"""
+        self._search_index.add_users(users)
         self.user_table.setRowCount(0)
         self.user_table.setRowCount(len(users))
 
@@ -198,38 +268,82 @@ class ContactsTab(QWidget):
         self.status_label.setText(f"正在搜索 [{query}]...")
         self.search_btn.setEnabled(False)
 
-        # 尝试通过手机号/邮箱批量查询
-        if "@" in query:
-            self._worker = ApiWorker(self._contacts_api.batch_get_user_by_id, emails=[query])
-        elif query.isdigit():
-            self._worker = ApiWorker(self._contacts_api.batch_get_user_by_id, mobiles=[query])
+        # 输入的是邮箱/手机号（可用逗号、空格分隔多个）时批量解析 open_id
+        terms = [term for term in re.split(r"[,;，；\s]+", query) if term]
+        emails = [term for term in terms if "@" in term]
+        mobiles = [term for term in terms if _MOBILE_RE.match(term)]
+        if len(emails) + len(mobiles) == len(terms):
+            self._worker = ApiWorker(self._contacts_api.resolve_user_ids, emails=emails, mobiles=mobiles)
+            self._worker.finished.connect(self._on_resolve_result)
+        elif len(self._search_index) and self._show_local_results(query):
+            self.search_btn.setEnabled(True)
+            return
         else:
             self._worker = ApiWorker(self._contacts_api.search_user, query)
+            self._worker.finished.connect(self._on_search_result)
 
-        self._worker.finished.connect(self._on_search_result)
         self._worker.error.connect(self._on_api_error)
         self._worker.start()
 
+    def _on_search_text_changed(self, text):
+        """边输入边搜索，只查本地索引，不请求接口"""
+        query = text.strip()
+        if query and len(self._search_index):
+            self._show_local_results(query)
+
+    def _show_local_results(self, query: str) -> bool:
+        """在本地索引中搜索并展示，有结果时返回 True"""
+        users = self._search_index.search(query)
+        if not users:
+            self.status_label.setText(f"本地未找到 [{query}]，按回车在线搜索")
+            return False
+        self.user_table.setRowCount(0)
+        self.user_table.setRowCount(len(users))
+        for row, user in enumerate(users):
+            self.user_table.setItem(row, 0, QTableWidgetItem(user.get("name", "")))
+            self.user_table.setItem(row, 1, QTableWidgetItem(user.get("en_name", "")))
+            self.user_table.setItem(row, 2, QTableWidgetItem(user.get("mobile", "")))
+            self.user_table.setItem(row, 3, QTableWidgetItem(user.get("email", "")))
+            self.user_table.setItem(row, 4, QTableWidgetItem(user.get("open_id", "")))
+        self.user_count_label.setText(f"搜索结果 ({len(users)} 人)")
+        self.status_label.setText(f"本地找到 {len(users)} 个匹配用户")
+        return True
+
+    def _on_resolve_result(self, result):
+        """邮箱/手机号批量解析结果返回"""
+        self.search_btn.setEnabled(True)
+        mapping, unresolved, failed = result
+
+        rows = list(mapping.items()) + [(value, "") for value in unresolved] + [(value, "") for value in failed]
+        self.user_table.setRowCount(0)
+        self.user_table.setRowCount(len(rows))
+        for row, (value, open_id) in enumerate(rows):
+            # 本地通讯录里有该用户时补全姓名
+            user = self._directory.find_user(open_id=open_id) if open_id else None
+            user = user or {}
+            is_email = "@" in value
+            missing = "查询失败" if value in failed else "未找到"
+            self.user_table.setItem(row, 0, QTableWidgetItem(user.get("name", "" if open_id else missing)))
+            self.user_table.setItem(row, 1, QTableWidgetItem(user.get("en_name", "")))
+            self.user_table.setItem(row, 2, QTableWidgetItem("" if is_email else value))
+            self.user_table.setItem(row, 3, QTableWidgetItem(value if is_email else ""))
+            self.user_table.setItem(row, 4, QTableWidgetItem(open_id))
+
+        self.user_count_label.setText(f"搜索结果 ({len(mapping)} 人)")
+        status = f"找到 {len(mapping)} 个匹配用户"
+        if unresolved:
+            status += f"，{len(unresolved)} 个未找到"
+        if failed:
+            status += f"，{len(failed)} 个查询失败: {next(iter(failed.values()))}"
+        self.status_label.setText(status)
+
     def _on_search_result(self, result):
         """搜索结果返回"""
         self.search_btn.setEnabled(True)
         data = result.get("data", {})
 
-        # 处理 batch_get_user_by_id 结果
-        if "user_list" in data:
-            users = data["user_list"]
-            self.user_table.setRowCount(0)
-            self.user_table.setRowCount(len(users))
-            for row, user in enumerate(users):
-                self.user_table.setItem(row, 0, QTableWidgetItem(""))
-                self.user_table.setItem(row, 1, QTableWidgetItem(""))
-                self.user_table.setItem(row, 2, QTableWidgetItem(user.get("mobile", "")))
-                self.user_table.setItem(row, 3, QTableWidgetItem(user.get("email", "")))
-                self.user_table.setItem(row, 4, QTableWidgetItem(user.get("user_id", "")))
-            self.user_count_label.setText(f"搜索结果 ({len(users)} 人)")
-            self.status_label.setText(f"找到 {len(users)} 个匹配用户")
         # 处理 search_user 结果
-        elif "users" in data:
+        if "users" in data:
             users = data["users"]
             self.user_table.setRowCount(0)
             self.user_table.setRowCount(len(users))
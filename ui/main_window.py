@@ -16,7 +16,6 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, QThread, Signal, QSize
 from PySide6.QtGui import QFont, QIcon, QPixmap
-from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
 
 from api.auth import FeishuAuth
 from api.contacts import ContactsAPI
@@ -26,6 +25,10 @@ from api.sheets import SheetsAPI
 from api.bitable import BitableAPI
 from api.drive import DriveAPI
 from api.calendar import CalendarAPI
+from api.event_receiver import EventReceiver, LongConnectionReceiver
+from api.events import EventBus
+from api.user_cache import UserProfileCache
+from ui.avatar_service import AvatarService
 from ui.contacts_tab import ContactsTab
 from ui.messages_tab import MessagesTab
 from ui.documents_tab import DocumentsTab
@@ -34,7 +37,7 @@ from ui.bitable_tab import BitableTab
 from ui.drive_tab import DriveTab
 from ui.calendar_tab import CalendarTab
 from ui.permissions_tab import PermissionsTab
-from utils.config_manager import get_credentials, save_credentials
+from utils.config_manager import get_credentials, get_event_config, save_credentials
 
 
 class PasswordLineEdit(QLineEdit):
@@ -120,6 +123,9 @@ class MainWindow(QMainWindow):
         super().__init__()
         self._auth = None
         self._auth_worker = None
+        self._event_bus = EventBus()  # 事件订阅推送的事件在这里分发给各 Tab
+        self._event_receiver = None
+        self._long_receiver = None  # 长连接接收器在各次认证间复用
         self._setup_ui()
         self._load_saved_credentials()
 
@@ -198,14 +204,19 @@ class MainWindow(QMainWindow):
 
         main_layout.addWidget(auth_group)
 
-        # 用于异步加载头像的网络管理器
-        self._net_manager = QNetworkAccessManager(self)
+        # 共享头像服务（磁盘缓存 + 限制并发下载）
+        self._avatar_service = AvatarService(parent=self)
+        self._avatar_service.avatar_ready.connect(self._on_avatar_ready)
+        self._bot_avatar_url = ""
 
         # --- Tab 容器 ---
         self.tabs = QTabWidget()
 
         self.contacts_tab = ContactsTab()
+        self.contacts_tab.set_event_bus(self._event_bus)
         self.messages_tab = MessagesTab()
+        self.messages_tab.set_avatar_service(self._avatar_service)
+        self.messages_tab.set_event_bus(self._event_bus)
         self.documents_tab = DocumentsTab()
         self.sheets_tab = SheetsTab()
         self.bitable_tab = BitableTab()
@@ -263,7 +274,11 @@ class MainWindow(QMainWindow):
         self.auth_status.setText("⏳ 认证中...")
         self.statusBar().showMessage("正在验证凭证...")
 
-        self._auth = FeishuAuth(app_id, app_secret)
+        if self._auth is not None:
+            # 停止旧实例的后台续期并释放其连接池
+            self._auth.close()
+        # 后台续期 token，各 Tab 的请求不会因换 token 而卡顿
+        self._auth = FeishuAuth(app_id, app_secret, auto_refresh=True)
         self._auth_worker = AuthWorker(self._auth)
         self._auth_worker.success.connect(self._on_auth_success)
         self._auth_worker.error.connect(self._on_auth_error)
@@ -304,6 +319,7 @@ class MainWindow(QMainWindow):
 
         self.contacts_tab.set_api(contacts_api)
         self.messages_tab.set_api(messages_api)
+        self.messages_tab.set_user_cache(UserProfileCache(contacts_api))
         self.documents_tab.set_api(documents_api)
         self.sheets_tab.set_api(sheets_api)
         self.sheets_tab.set_drive_api(drive_api)
@@ -312,25 +328,48 @@ class MainWindow(QMainWindow):
         self.drive_tab.set_api(drive_api)
         self.calendar_tab.set_api(calendar_api)
         self.permissions_tab.set_auth(self._auth)
+        self._start_event_receiver()
+
+    def _start_event_receiver(self):
+        """按 config.json 的 "event" 配置启动事件接收（HTTP 回调或长连接）"""
+        if self._event_receiver is not None:
+            self._event_receiver.stop()
+            self._event_receiver = None
+        cfg = get_event_config()
+        if cfg["mode"] == "http":
+            receiver = EventReceiver(
+                self._event_bus, cfg["verification_token"], cfg["encrypt_key"], cfg["host"], cfg["port"]
+            )
+            where = f"，回调地址 {receiver.url}"
+        elif cfg["mode"] == "long":
+            # 长连接 SDK 同一进程只能运行一个客户端，重新认证时复用同一个实例并按新凭证重连
+            if self._long_receiver is None:
+                self._long_receiver = LongConnectionReceiver(self._event_bus, self._auth.app_id, self._auth.app_secret)
+            receiver = self._long_receiver
+            receiver.app_id = self._auth.app_id
+            receiver.app_secret = self._auth.app_secret
+            where = "（长连接）"
+        else:
+            return
+        try:
+            receiver.start()
+        except Exception as e:
+            self.statusBar().showMessage(f"⚠️ 事件接收未启动: {e}")
+            return
+        self._event_receiver = receiver
+        self.statusBar().showMessage(f"✅ 认证成功，正在接收事件推送{where}")
 
     def _load_bot_avatar(self, url: str):
-        """异步加载机器人头像"""
-        from PySide6.QtCore import QUrl
-        request = QNetworkRequest(QUrl(url))
-        reply = self._net_manager.get(request)
-        reply.finished.connect(lambda: self._on_avatar_loaded(reply))
+        """加载机器人头像：有缓存时立即显示，否则等头像服务下载完成"""
+        self._bot_avatar_url = url
+        pixmap = self._avatar_service.avatar(url, 32)
+        if pixmap is not None:
+            self.bot_avatar_label.setPixmap(pixmap)
 
-    def _on_avatar_loaded(self, reply: QNetworkReply):
+    def _on_avatar_ready(self, url: str, size: int, pixmap: QPixmap):
         """头像下载完成"""
-        if reply.error() == QNetworkReply.NoError:
-            data = reply.readAll()
-            pixmap = QPixmap()
-            pixmap.loadFromData(data)
-            if not pixmap.isNull():
-                self.bot_avatar_label.setPixmap(
-                    pixmap.scaled(32, 32, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                )
-        reply.deleteLater()
+        if url == self._bot_avatar_url and size == 32:
+            self.bot_avatar_label.setPixmap(pixmap)
 
     def _on_auth_error(self, error_msg):
         """认证失败"""
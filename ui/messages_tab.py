@@ -13,8 +13,7 @@ from PySide6.QtWidgets import (
     QTextEdit,
     QLabel,
     QGroupBox,
-    QListWidget,
-    QListWidgetItem,
+    QListView,
     QMessageBox,
     QSplitter,
     QScrollArea,
@@ -22,9 +21,24 @@ from PySide6.QtWidgets import (
     QFrame,
     QDialog,
 )
-from PySide6.QtCore import Qt, QThread, Signal, QTimer, QSize, QUrl
-from PySide6.QtGui import QFont, QColor, QTextCursor, QIcon, QPixmap
-from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply
+from PySide6.QtCore import Qt, QThread, Signal, QTimer, QSize
+from PySide6.QtGui import QFont, QIcon
+
+from api.chat_roster import ROSTER_EVENTS, ChatRoster
+from api.message_archive import ARCHIVE_EVENTS, MESSAGE_RECALLED_EVENT, MessageArchive
+from api.message_content import message_text
+from api.user_cache import display_name
+from ui.chat_list_model import (
+    CHAT_ID_ROLE,
+    CHAT_NAME_ROLE,
+    CHAT_TYPE_ROLE,
+    TYPE_GROUP,
+    TYPE_P2P,
+    TYPE_SEPARATOR,
+    ChatFilterProxy,
+    ChatListModel,
+)
+from ui.chat_view import ChatView
 
 
 class ApiWorker(QThread):
@@ -68,86 +82,80 @@ def text_to_post(text: str, title: str = "") -> dict:
     }
 
 
-def _parse_msg_content(msg: dict) -> str:
-    """从消息体中提取可读文本"""
-    msg_type = msg.get("msg_type", "")
-    body = msg.get("body", {})
-    content_str = body.get("content", "{}")
-
-    try:
-        content = json.loads(content_str)
-    except (json.JSONDecodeError, TypeError):
-        content = {}
-
-    if msg_type == "text":
-        return content.get("text", content_str)
-    elif msg_type == "post":
-        # 富文本：提取所有 text 标签的文本
-        parts = []
-        zh = content.get("zh_cn", content.get("en_us", {}))
-        title = zh.get("title", "")
-        if title:
-            parts.append(f"[{title}]")
-        for paragraph in zh.get("content", []):
-            line_parts = []
-            for elem in paragraph:
-                tag = elem.get("tag", "")
-                if tag == "text":
-                    line_parts.append(elem.get("text", ""))
-                elif tag == "a":
-                    line_parts.append(elem.get("text", "") + f"({elem.get('href', '')})")
-                elif tag == "at":
-                    line_parts.append(f"@{elem.get('user_name', elem.get('user_id', ''))}")
-                elif tag == "img":
-                    line_parts.append("[图片]")
-                elif tag == "media":
-                    line_parts.append("[媒体]")
-            parts.append("".join(line_parts))
-        return "\n".join(parts)
-    elif msg_type == "image":
-        return "[图片消息]"
-    elif msg_type == "file":
-        return f"[文件] {content.get('file_name', '')}"
-    elif msg_type == "audio":
-        return "[语音消息]"
-    elif msg_type == "sticker":
-        return "[表情]"
-    elif msg_type == "interactive":
-        # 卡片消息
-        header = content.get("header", {})
-        title = header.get("title", {}).get("content", "")
-        return f"[卡片] {title}" if title else "[卡片消息]"
-    elif msg_type == "share_chat":
-        return f"[分享群聊] {content.get('chat_name', '')}"
-    elif msg_type == "share_user":
-        return "[分享名片]"
-    elif msg_type == "system":
-        return "[系统消息]"
-    elif msg_type == "merge_forward":
-        return "[合并转发]"
-    else:
-        return f"[{msg_type}]"
-
-
 class MessagesTab(QWidget):
     """消息 Tab - 左侧选择对象，右侧聊天与发送"""
 
+    message_event = Signal(str, dict)  # 事件总线线程 -> UI 线程：(事件类型, 消息)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self._messages_api = None
+        self._user_cache = None  # UserProfileCache，用于把发送者 open_id 显示为姓名
+        self._archive = None  # 本地聊天记录，认证后按 app_id 打开
+        self._roster = None  # 全部会话的成员名册，显示会话列表后在后台增量更新
+        self._roster_worker = None  # 名册刷新线程，与会话列表、消息加载互不阻塞
+        self._roster_busy = False  # 名册刷新中（结果信号在线程结束前发出，不能用 isRunning 判断）
+        self._roster_pending = None  # 名册刷新期间又加载了会话列表时，刷新完成后用它再刷新一次
+        self._group_row_count = 0  # 会话列表中群聊部分的行数，其后为单聊联系人
+        self._chat_owners = {}  # owner_id -> 第一个出现的会话 ID，名册未拉到成员时作为单聊联系人
+        self._displayed_chat_id = None  # 聊天视图当前展示的会话，刷新同一会话时只合并新消息
         self._worker = None
         self._old_workers = []  # 保持旧 worker 引用，防止被 GC 提前销毁
         self._current_chat_id = None
         self._current_chat_name = ""
         self._chat_data_cache = {}  # chat_id -> chat info
         self._p2p_contacts = {}  # owner_id(open_id) -> {chat_id, name} 去重的单聊联系人
-        self._avatar_cache = {}  # chat_id -> QIcon
-        self._net_manager = QNetworkAccessManager(self)
+        self._avatar_service = None  # 共享头像服务（AvatarService）
+        self._avatar_chats = {}  # 头像 URL -> 使用该头像的 chat_id 集合
         self._setup_ui()
+        self.message_event.connect(self._on_message_event)
 
     def set_api(self, messages_api):
         """设置 API 实例"""
         self._messages_api = messages_api
+        if self._archive is not None:
+            self._archive.close()
+        self._archive = MessageArchive(messages_api)
+        self._roster = ChatRoster(messages_api)
+
+    def set_user_cache(self, user_cache):
+        """设置用户资料缓存，用于显示发送者姓名"""
+        self._user_cache = user_cache
+
+    def set_avatar_service(self, avatar_service):
+        """设置共享头像服务，用于显示会话头像"""
+        self._avatar_service = avatar_service
+        avatar_service.avatar_ready.connect(self._on_avatar_ready)
+
+    def set_event_bus(self, event_bus):
+        """订阅消息事件：新消息与撤回写入本地记录，当前会话实时显示，无需手动刷新"""
+        for event_type in ARCHIVE_EVENTS:
+            event_bus.subscribe(event_type, self._handle_message_event)
+        for event_type in ROSTER_EVENTS:
+            event_bus.subscribe(event_type, self._handle_roster_event)
+
+    def _handle_roster_event(self, event_type: str, event: dict):
+        """会话成员事件（在事件总线线程中调用），下次显示会话列表时生效"""
+        if self._roster is not None:
+            self._roster.apply_event(event_type, event)
+
+    def _handle_message_event(self, event_type: str, event: dict):
+        """消息事件（在事件总线线程中调用）"""
+        archive = self._archive
+        if archive is None:
+            return
+        msg = archive.apply_event(event_type, event)
+        if msg is not None:
+            self.message_event.emit(event_type, msg)
+
+    def _on_message_event(self, event_type: str, msg: dict):
+        if msg.get("chat_id") != self._displayed_chat_id:
+            return
+        self.chat_display.merge_messages([self._message_row(msg)])
+        if event_type == MESSAGE_RECALLED_EVENT:
+            self.status_label.setText(f"有一条消息被撤回 - {self._current_chat_name}")
+        else:
+            self.status_label.setText(f"收到新消息 - {self._current_chat_name}")
 
     def _start_new_worker(self, worker):
         """
@@ -187,7 +195,11 @@ class MessagesTab(QWidget):
         self.load_chats_btn.clicked.connect(self._load_chats)
         left_layout.addWidget(self.load_chats_btn)
 
-        # 会话类型过滤 + 搜索框（横排）
+        # 会话类型过滤 + 搜索框（横排），输入停顿 150ms 后再过滤
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(150)
+        self._filter_timer.timeout.connect(self._filter_chat_list)
         filter_row = QHBoxLayout()
         self.chat_type_filter = QComboBox()
         self.chat_type_filter.addItems(["全部", "群聊", "单聊"])
@@ -197,32 +209,37 @@ class MessagesTab(QWidget):
 
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("🔍 搜索会话...")
-        self.search_input.textChanged.connect(self._filter_chat_list)
+        self.search_input.textChanged.connect(lambda _text: self._filter_timer.start())
         filter_row.addWidget(self.search_input, 1)
         left_layout.addLayout(filter_row)
 
-        # 会话列表
-        self.chat_list = QListWidget()
+        # 会话列表：模型 + 过滤代理，搜索键在加载时预先计算
+        self._chat_model = ChatListModel(self)
+        self._chat_proxy = ChatFilterProxy(self)
+        self._chat_proxy.setSourceModel(self._chat_model)
+        self.chat_list = QListView()
+        self.chat_list.setModel(self._chat_proxy)
+        self.chat_list.setUniformItemSizes(True)
         self.chat_list.setIconSize(QSize(32, 32))
         self.chat_list.setStyleSheet("""
-            QListWidget {
+            QListView {
                 border: 1px solid #ddd;
                 border-radius: 4px;
                 background: #fafafa;
             }
-            QListWidget::item {
+            QListView::item {
                 padding: 8px 6px;
                 border-bottom: 1px solid #eee;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background: #e3f2fd;
                 color: #1565c0;
             }
-            QListWidget::item:hover {
+            QListView::item:hover {
                 background: #f0f0f0;
             }
         """)
-        self.chat_list.itemClicked.connect(self._on_chat_selected)
+        self.chat_list.clicked.connect(self._on_chat_selected)
         left_layout.addWidget(self.chat_list)
 
         # 手动输入 ID 区域
@@ -280,10 +297,10 @@ class MessagesTab(QWidget):
         right_layout.addWidget(line)
 
         # 聊天记录显示区域（上方大区域）
-        self.chat_display = QTextEdit()
-        self.chat_display.setReadOnly(True)
+        self.chat_display = ChatView()
+        self.chat_display.load_older_requested.connect(self._load_older_messages)
         self.chat_display.setStyleSheet("""
-            QTextEdit {
+            QListView {
                 background: #f9f9f9;
                 border: 1px solid #ddd;
                 border-radius: 6px;
@@ -391,7 +408,7 @@ class MessagesTab(QWidget):
     # ─── 左侧面板：会话列表 ─────────────────────
 
     def _load_chats(self):
-        """加载机器人所在的群列表"""
+        """加载机器人所在的群列表，显示后再在后台拉取各会话成员（只拉取新会话和过期的会话）"""
         if not self._messages_api:
             QMessageBox.warning(self, "提示", "请先完成认证")
             return
@@ -405,15 +422,13 @@ class MessagesTab(QWidget):
         self._start_new_worker(worker)
 
     def _on_chats_loaded(self, chats):
-        """会话列表加载完成"""
-        self.chat_list.clear()
+        """会话列表加载完成：立即显示群聊与群主，单聊联系人在名册刷新后补全"""
         self._chat_data_cache.clear()
-        self._p2p_contacts.clear()
+        self._avatar_chats.clear()
+        self._chat_owners.clear()
+        rows = []
+        avatars = []  # (头像 URL, chat_id)，模型填充后再加载
 
-        group_count = 0
-        all_owner_ids = {}  # owner_id -> 第一个出现的 chat 信息（用于去重）
-
-        # ── 第一轮：显示所有会话，同时收集所有 owner_id ──
         for chat in chats:
             name = chat.get("name", "未命名会话")
             chat_id = chat.get("chat_id", "")
@@ -423,145 +438,159 @@ class MessagesTab(QWidget):
             member_count = chat.get("user_count", "") or chat.get("member_count", "")
             avatar_url = chat.get("avatar", "")
 
-            # 收集所有会话的 owner_id（群聊 + 单聊）
-            if owner_id and owner_id not in all_owner_ids:
-                all_owner_ids[owner_id] = {
-                    "owner_id": owner_id,
-                    "first_chat_name": name,
-                    "first_chat_id": chat_id,
-                }
+            # 收集所有会话的 owner_id（群聊 + 单聊），去重保留第一个会话
+            if owner_id:
+                self._chat_owners.setdefault(owner_id, chat_id)
 
             # 显示会话条目
             if not chat_mode:
                 chat_mode = "group"
-            group_count += 1
             display_text = f"👥 {name}"
             if member_count:
                 display_text += f" ({member_count}人)"
 
-            item = QListWidgetItem(display_text)
-            item.setData(Qt.UserRole, chat_id)
-            item.setData(Qt.UserRole + 1, name)
-            item.setData(Qt.UserRole + 2, "group")  # 会话类型
-            item.setToolTip(
-                f"会话名: {name}\n"
-                f"chat_id: {chat_id}\n"
-                f"owner_id: {owner_id}\n"
-                f"类型: 群聊\n"
-                f"描述: {description}\n"
-                f"成员数: {member_count}"
-            )
-            self.chat_list.addItem(item)
+            rows.append({
+                "id": chat_id,
+                "name": name,
+                "type": TYPE_GROUP,
+                "text": display_text,
+                "tooltip": (
+                    f"会话名: {name}\n"
+                    f"chat_id: {chat_id}\n"
+                    f"owner_id: {owner_id}\n"
+                    f"类型: 群聊\n"
+                    f"描述: {description}\n"
+                    f"成员数: {member_count}"
+                ),
+            })
 
             # 缓存
             chat["_resolved_chat_mode"] = chat_mode
             self._chat_data_cache[chat_id] = chat
 
-            # 异步加载头像
             if avatar_url:
-                self._load_chat_avatar(avatar_url, chat_id)
-
-        # ── 第二轮：添加去重后的单聊联系人区域 ──
-        if all_owner_ids:
-            # 分隔线
-            separator = QListWidgetItem("──── 单聊联系人 ────")
-            separator.setFlags(Qt.NoItemFlags)  # 不可点击
-            separator.setForeground(QColor("#999"))
-            font = QFont()
-            font.setBold(True)
-            font.setPointSize(10)
-            separator.setFont(font)
-            self.chat_list.addItem(separator)
-
-            for oid, info in all_owner_ids.items():
-                display_text = f"👤 {oid}"
-                item = QListWidgetItem(display_text)
-                # 以 owner_id 作为数据，后面点击时走 open_id 发送模式
-                item.setData(Qt.UserRole, oid)
-                item.setData(Qt.UserRole + 1, oid)
-                item.setData(Qt.UserRole + 2, "p2p")  # 标记为单聊联系人
-                item.setToolTip(
+                avatars.append((avatar_url, chat_id))
+
+        self._group_row_count = len(rows)
+        self._chat_model.set_rows(rows + self._contact_rows())
+        self._filter_chat_list()
+        # 异步加载头像
+        for avatar_url, chat_id in avatars:
+            self._load_chat_avatar(avatar_url, chat_id)
+
+        self.left_status.setText(f"已加载 {len(chats)} 个会话，正在获取会话成员...")
+        self.load_chats_btn.setEnabled(True)
+        self._refresh_roster(chats)
+
+    def _refresh_roster(self, chats: list[dict]):
+        """在独立线程中刷新会话成员名册，完成后更新单聊联系人"""
+        if self._roster is None:
+            return
+        if self._roster_busy:
+            self._roster_pending = chats
+            return
+        worker = ApiWorker(self._roster.refresh, chats=chats)
+        worker.finished.connect(self._on_roster_loaded)
+        worker.error.connect(self._on_roster_error)
+        if self._roster_worker is not None:
+            self._old_workers.append(self._roster_worker)  # 可能尚未退出 run()，保持引用
+        self._roster_worker = worker
+        self._roster_busy = True
+        worker.start()
+
+    def _on_roster_loaded(self, report: dict):
+        self._chat_model.replace_from(self._group_row_count, self._contact_rows())
+        status = f"已加载 {report['chats']} 个会话, 单聊联系人 {len(self._p2p_contacts)} 个 (跨会话去重)"
+        if report["failed"]:
+            status += f", {report['failed']} 个会话成员获取失败"
+        self.left_status.setText(status)
+        self._refresh_pending_roster()
+
+    def _on_roster_error(self, error_msg: str):
+        self.left_status.setText(f"会话成员获取失败，单聊联系人仅显示群主: {error_msg}")
+        self._refresh_pending_roster()
+
+    def _refresh_pending_roster(self):
+        self._roster_busy = False
+        chats, self._roster_pending = self._roster_pending, None
+        if chats is not None:
+            self._refresh_roster(chats)
+
+    def _contact_rows(self) -> list[dict]:
+        """
+        去重后的单聊联系人行（含分隔线）：名册中的成员带名称与所在会话，
+        名册尚未拉取或拉取失败的会话退回使用群主
+        """
+        previous = self._p2p_contacts
+        self._p2p_contacts = {}
+        contacts = {}
+        for member in self._roster.members() if self._roster is not None else []:
+            contacts[member["open_id"]] = (member["name"] or member["open_id"], member["chat_ids"])
+        for oid, chat_id in self._chat_owners.items():
+            if oid not in contacts:
+                contacts[oid] = (oid, [chat_id])
+        if not contacts:
+            return []
+
+        # 分隔线（不可点击）
+        rows = [{"id": "", "name": "", "type": TYPE_SEPARATOR, "text": "──── 单聊联系人 ────", "key": ""}]
+        for oid, (contact_name, chat_ids) in contacts.items():
+            chat_names = [self._chat_data_cache.get(cid, {}).get("name", cid) for cid in chat_ids]
+            source = "、".join(chat_names[:3]) + (f" 等 {len(chat_names)} 个会话" if len(chat_names) > 3 else "")
+            # 以 open_id 作为数据，后面点击时走 open_id 发送模式
+            rows.append({
+                "id": oid,
+                "name": contact_name,
+                "type": TYPE_P2P,
+                "text": f"👤 {contact_name}",
+                "tooltip": (
                     f"open_id: {oid}\n"
-                    f"来源会话: {info['first_chat_name']}\n"
+                    f"所在会话: {source}\n"
                     f"💡 点击自动获取单聊会话并加载历史消息"
-                )
-                self.chat_list.addItem(item)
-
-                # 缓存到 p2p 联系人
-                self._p2p_contacts[oid] = {
-                    "owner_id": oid,
-                    "name": oid,
-                    "chat_id": None,  # 尚无 p2p chat_id
-                }
-
-        unique_contacts = len(self._p2p_contacts)
-        self.left_status.setText(
-            f"已加载 {len(chats)} 个会话, "
-            f"单聊联系人 {unique_contacts} 个 (从 owner_id 去重)"
-        )
-        self.load_chats_btn.setEnabled(True)
+                ),
+            })
+
+            # 缓存到 p2p 联系人
+            self._p2p_contacts[oid] = {
+                "owner_id": oid,
+                "name": contact_name,
+                "chat_id": previous.get(oid, {}).get("chat_id"),  # 已获取过的 p2p chat_id 保留
+            }
+        return rows
 
     def _load_chat_avatar(self, url: str, chat_id: str):
-        """异步加载会话头像"""
-        request = QNetworkRequest(QUrl(url))
-        reply = self._net_manager.get(request)
-        reply.finished.connect(lambda: self._on_avatar_loaded(reply, chat_id))
-
-    def _on_avatar_loaded(self, reply: QNetworkReply, chat_id: str):
-        """头像下载完成，设置到对应的列表项"""
-        if reply.error() == QNetworkReply.NoError:
-            data = reply.readAll()
-            pixmap = QPixmap()
-            pixmap.loadFromData(data)
-            if not pixmap.isNull():
-                icon = QIcon(pixmap.scaled(32, 32, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                self._avatar_cache[chat_id] = icon
-                # 找到对应的列表项并设置图标
-                for i in range(self.chat_list.count()):
-                    item = self.chat_list.item(i)
-                    if item and item.data(Qt.UserRole) == chat_id:
-                        item.setIcon(icon)
-                        break
-        reply.deleteLater()
+        """设置会话头像：有缓存时立即显示，否则等头像服务下载完成"""
+        if self._avatar_service is None:
+            return
+        self._avatar_chats.setdefault(url, set()).add(chat_id)
+        pixmap = self._avatar_service.avatar(url, 32)
+        if pixmap is not None:
+            self._chat_model.set_icon(chat_id, QIcon(pixmap))
+
+    def _on_avatar_ready(self, url: str, size: int, pixmap):
+        """头像下载完成，设置到使用该头像的列表项"""
+        if size != 32:
+            return
+        icon = QIcon(pixmap)
+        for chat_id in self._avatar_chats.get(url, ()):
+            self._chat_model.set_icon(chat_id, icon)
 
     def _filter_chat_list(self, *_args):
         """搜索并按类型过滤会话列表"""
-        text = self.search_input.text().strip().lower()
-        type_filter = self.chat_type_filter.currentIndex()  # 0=全部, 1=群聊, 2=单聊
-
-        for i in range(self.chat_list.count()):
-            item = self.chat_list.item(i)
-
-            # 分隔线：跟随单聊联系人的可见性
-            if item.flags() == Qt.NoItemFlags:
-                item.setHidden(type_filter == 1)  # 群聊模式下隐藏分隔线
-                continue
-
-            chat_mode = item.data(Qt.UserRole + 2) or ""
-            visible = True
+        self._filter_timer.stop()
+        # 0=全部, 1=群聊, 2=单聊
+        self._chat_proxy.set_filter(self.search_input.text(), self.chat_type_filter.currentIndex())
 
-            # 文本过滤
-            if text and text not in item.text().lower():
-                visible = False
-
-            # 类型过滤
-            if type_filter == 1 and chat_mode == "p2p":
-                visible = False  # 群聊模式下隐藏单聊联系人
-            elif type_filter == 2 and chat_mode != "p2p":
-                visible = False  # 单聊模式下隐藏群聊
-
-            item.setHidden(not visible)
-
-    def _on_chat_selected(self, item):
+    def _on_chat_selected(self, index):
         """选择一个会话"""
-        if not item or item.flags() == Qt.NoItemFlags:
+        if not index.isValid() or index.flags() == Qt.NoItemFlags:
             return  # 分隔线不可点击
 
-        item_id = item.data(Qt.UserRole)
-        chat_name = item.data(Qt.UserRole + 1)
-        chat_type = item.data(Qt.UserRole + 2) or ""
+        item_id = index.data(CHAT_ID_ROLE)
+        chat_name = index.data(CHAT_NAME_ROLE)
+        chat_type = index.data(CHAT_TYPE_ROLE) or ""
 
-        if chat_type == "p2p":
+        if chat_type == TYPE_P2P:
             # 单聊联系人：item_id 是 owner_id (open_id)
             self._open_p2p_chat_for_user(item_id)
         else:
@@ -597,6 +626,7 @@ class MessagesTab(QWidget):
             self._current_id_type = id_type
             self.chat_title_label.setText(f"📨 {self._current_chat_name}")
             self.chat_display.clear()
+            self._displayed_chat_id = None
             self.chat_display.setPlaceholderText(
                 f"已选择 {id_type} 类型的接收者: {raw_id}\n\n"
                 "提示：该类型无法直接加载历史消息，但可以发送消息。\n"
@@ -765,6 +795,7 @@ class MessagesTab(QWidget):
         self._pending_msg_content = msg_content
         self.chat_title_label.setText(f"📨 {self._current_chat_name}")
         self.chat_display.clear()
+        self._displayed_chat_id = None
         self.send_btn.setEnabled(False)
         self.refresh_btn.setEnabled(False)
 
@@ -841,102 +872,126 @@ class MessagesTab(QWidget):
         if getattr(self, '_current_id_type', 'chat_id') != "chat_id":
             return
 
-        self.status_label.setText("正在加载历史消息...")
+        chat_id = self._current_chat_id
+
+        # 本地有记录时先展示，再增量拉取新消息
+        cached = self._archive.cached_messages(chat_id, limit=100)
+        if cached:
+            self._on_messages_loaded((chat_id, cached))
+        self.status_label.setText("正在同步新消息..." if cached else "正在加载历史消息...")
         self.refresh_btn.setEnabled(False)
 
-        worker = ApiWorker(
-            self._messages_api.get_all_chat_messages,
-            self._current_chat_id,
-            max_count=100,
-        )
+        def fetch_messages():
+            messages = self._archive.get_messages(chat_id, limit=100)
+            # 一次批量解析所有发送者，渲染时只读缓存
+            if self._user_cache is not None:
+                sender_ids = [
+                    msg.get("sender", {}).get("id", "") for msg in messages
+                    if msg.get("sender", {}).get("sender_type") == "user"
+                ]
+                try:
+                    self._user_cache.get_many(sender_ids)
+                except Exception:
+                    pass  # 无通讯录权限时退回显示 ID
+            return chat_id, messages
+
+        worker = ApiWorker(fetch_messages)
         worker.finished.connect(self._on_messages_loaded)
         worker.error.connect(self._on_api_error)
         self._start_new_worker(worker)
 
-    @staticmethod
-    def _escape_html(text: str) -> str:
-        """转义 HTML 特殊字符"""
-        return (
-            text.replace("&", "&amp;")
-            .replace("<", "&lt;")
-            .replace(">", "&gt;")
-            .replace('"', "&quot;")
-            .replace("\n", "<br/>")
-        )
-
-    def _format_message_html(self, time_str: str, sender_display: str, text: str, is_app: bool = False) -> str:
-        """将单条消息格式化为 HTML 片段"""
-        escaped_text = self._escape_html(text)
-        sender_color = "#1677ff" if is_app else "#333"
-        return (
-            f'<div style="margin-bottom:10px;">'
-            f'  <div style="font-size:11px; color:#999;">{self._escape_html(time_str)}</div>'
-            f'  <div style="font-size:13px; font-weight:bold; color:{sender_color}; margin:2px 0;">'
-            f'    {self._escape_html(sender_display)}'
-            f'  </div>'
-            f'  <div style="font-size:13px; color:#333; line-height:1.6; padding-left:4px;">'
-            f'    {escaped_text}'
-            f'  </div>'
-            f'</div>'
-        )
+    def _message_row(self, msg: dict) -> dict:
+        """把一条消息转换为聊天视图的一行"""
+        sender = msg.get("sender", {})
+        sender_type = sender.get("sender_type", "")
+        sender_id = sender.get("id", "未知")
+        create_time = msg.get("create_time", "")
+
+        # 时间戳转可读时间（固定 UTC+8 中国时间）
+        time_str = ""
+        create_ms = 0
+        if create_time:
+            try:
+                ts_val = int(create_time)
+                # 自动判断秒级(10位)或毫秒级(13位)时间戳
+                create_ms = ts_val if ts_val > 1e12 else ts_val * 1000
+                cn_tz = timezone(timedelta(hours=8))
+                dt = datetime.fromtimestamp(create_ms / 1000, tz=cn_tz)
+                time_str = dt.strftime("%Y-%m-%d %H:%M:%S")
+            except (ValueError, OSError):
+                time_str = create_time
+
+        # 发送者显示
+        is_app = sender_type == "app"
+        if is_app:
+            sender_display = "🤖 应用"
+        else:
+            user = self._user_cache.peek(sender_id) if self._user_cache is not None else None
+            sender_display = f"👤 {display_name(user, sender_id[:12] + '...')}"
+
+        return {
+            "message_id": msg.get("message_id", ""),
+            "create_time": create_ms,
+            "time": time_str,
+            "sender": sender_display,
+            "text": "[消息已撤回]" if msg.get("deleted") else message_text(msg),
+            "is_app": is_app,
+        }
 
-    def _on_messages_loaded(self, messages):
-        """历史消息加载完成"""
-        self.chat_display.clear()
+    def _on_messages_loaded(self, result):
+        """历史消息加载完成：切换会话时整体替换，刷新同一会话时只合并新消息"""
+        chat_id, messages = result
+        if chat_id != self._current_chat_id:
+            return  # 已切换到其他会话，丢弃迟到的结果
         self.refresh_btn.setEnabled(True)
 
         if not messages:
-            self.chat_display.setPlainText("（暂无消息记录）")
+            self.chat_display.clear()
+            self._displayed_chat_id = None
+            self.chat_display.setPlaceholderText("（暂无消息记录）")
             self.status_label.setText(f"会话 [{self._current_chat_name}] 暂无消息")
             return
 
-        html_parts = [
-            '<div style="font-family: -apple-system, \'Segoe UI\', \'PingFang SC\', '
-            '\'Microsoft YaHei\', sans-serif;">'
-        ]
-
-        # 按时间正序显示
-        for msg in messages:
-            sender = msg.get("sender", {})
-            sender_type = sender.get("sender_type", "")
-            sender_id = sender.get("id", "未知")
-            create_time = msg.get("create_time", "")
-
-            # 时间戳转可读时间（固定 UTC+8 中国时间）
-            time_str = ""
-            if create_time:
-                try:
-                    ts_val = int(create_time)
-                    # 自动判断秒级(10位)或毫秒级(13位)时间戳
-                    if ts_val > 1e12:
-                        ts_val = ts_val / 1000  # 毫秒 -> 秒
-                    cn_tz = timezone(timedelta(hours=8))
-                    dt = datetime.fromtimestamp(ts_val, tz=cn_tz)
-                    time_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-                except (ValueError, OSError):
-                    time_str = create_time
-
-            # 发送者显示
-            is_app = sender_type == "app"
-            if is_app:
-                sender_display = "🤖 应用"
-            else:
-                sender_display = f"👤 {sender_id[:12]}..."
-
-            # 消息内容
-            text = _parse_msg_content(msg)
-
-            html_parts.append(self._format_message_html(time_str, sender_display, text, is_app))
-
-        html_parts.append('</div>')
-        self.chat_display.setHtml("".join(html_parts))
-
-        # 滚动到底部
-        cursor = self.chat_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.chat_display.setTextCursor(cursor)
-
-        self.status_label.setText(f"已加载 {len(messages)} 条消息 - {self._current_chat_name}")
+        rows = [self._message_row(msg) for msg in messages]
+        if self._displayed_chat_id == chat_id:
+            _, appended = self.chat_display.merge_messages(rows)
+            status = f"新增 {appended} 条消息" if appended else "没有新消息"
+        else:
+            self.chat_display.set_messages(rows)
+            self._displayed_chat_id = chat_id
+            status = f"已加载 {len(rows)} 条消息"
+        self.chat_display.set_older_enabled(True)
+        self.status_label.setText(f"{status} - {self._current_chat_name}")
+
+    def _load_older_messages(self):
+        """聊天视图滚动到顶部：先读本地更早的记录，本地没有时再向接口补齐"""
+        chat_id = self._displayed_chat_id
+        before = self.chat_display.message_model().first_time()
+        if not chat_id or before is None or self._archive is None:
+            return
+        self.status_label.setText("正在加载更早的消息...")
+
+        def fetch_older():
+            messages = self._archive.store.get_messages(chat_id, limit=100, before=before)
+            if not messages and self._archive.fetch_older(chat_id, 100):
+                messages = self._archive.store.get_messages(chat_id, limit=100, before=before)
+            return chat_id, messages
+
+        worker = ApiWorker(fetch_older)
+        worker.finished.connect(self._on_older_messages_loaded)
+        worker.error.connect(self._on_api_error)
+        self._start_new_worker(worker)
+
+    def _on_older_messages_loaded(self, result):
+        chat_id, messages = result
+        if chat_id != self._displayed_chat_id:
+            return
+        if not messages:
+            self.status_label.setText(f"已到会话开头 - {self._current_chat_name}")
+            return  # 不再开启向上加载
+        prepended, _ = self.chat_display.merge_messages([self._message_row(msg) for msg in messages])
+        self.chat_display.set_older_enabled(True)
+        self.status_label.setText(f"已加载更早的 {prepended} 条消息 - {self._current_chat_name}")
 
     # ─── 消息类型切换 ─────────────────────
 
@@ -1030,20 +1085,18 @@ class MessagesTab(QWidget):
         msg_id = data.get("message_id", "未知")
         response_chat_id = data.get("chat_id", "")
 
-        # 在聊天框中以 HTML 格式追加发送的消息
+        # 在聊天视图末尾追加发送的消息（刷新时按 message_id 与服务端记录合并）
         content = self.msg_input.toPlainText().strip()
         cn_tz = timezone(timedelta(hours=8))
-        now_str = datetime.now(tz=cn_tz).strftime("%Y-%m-%d %H:%M:%S")
-        msg_html = self._format_message_html(now_str, "🤖 我（应用）", content, is_app=True)
-        # 移动到末尾并插入 HTML
-        cursor = self.chat_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.chat_display.setTextCursor(cursor)
-        self.chat_display.insertHtml(msg_html)
-
-        # 滚动到底部
-        cursor.movePosition(QTextCursor.End)
-        self.chat_display.setTextCursor(cursor)
+        now = datetime.now(tz=cn_tz)
+        self.chat_display.merge_messages([{
+            "message_id": data.get("message_id", ""),
+            "create_time": int(data.get("create_time") or now.timestamp() * 1000),
+            "time": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "sender": "🤖 我（应用）",
+            "text": content,
+            "is_app": True,
+        }])
 
         # 清空输入框
         self.msg_input.clear()
@@ -0,0 +1,108 @@
+"""头像磁盘缓存：图片按内容哈希存放，索引记录 URL 对应的文件及 ETag / Last-Modified 供条件请求"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from utils.config_manager import data_file
+
+AVATAR_DIR = data_file("avatars")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS avatars (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    etag TEXT NOT NULL DEFAULT '',
+    last_modified TEXT NOT NULL DEFAULT '',
+    checked_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_avatars_sha256 ON avatars(sha256);
+"""
+
+
+class AvatarStore:
+    """
+    头像磁盘缓存（线程安全）
+
+    图片文件保存在 <目录>/<哈希前两位>/<sha256>，内容相同的头像只存一份；
+    index.db 记录 URL -> 文件哈希、ETag、Last-Modified 与上次校验时间。
+    """
+
+    def __init__(self, root: str = AVATAR_DIR):
+        """
+        :param root: 缓存目录
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def lookup(self, url: str) -> dict | None:
+        """
+        查询 URL 的缓存记录
+
+        :return: {"path", "etag", "last_modified", "checked_at"}，没有缓存或文件已丢失时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM avatars WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        path = self._blob_path(row["sha256"])
+        if not os.path.exists(path):
+            return None
+        return {"path": path, "etag": row["etag"], "last_modified": row["last_modified"],
+                "checked_at": row["checked_at"]}
+
+    def save(self, url: str, data: bytes, etag: str = "", last_modified: str = "") -> str:
+        """
+        保存下载到的头像
+
+        :return: 图片文件路径
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO avatars (url, sha256, etag, last_modified, checked_at) VALUES (?, ?, ?, ?, ?)",
+                (url, sha256, etag, last_modified, time.time()),
+            )
+        return path
+
+    def touch(self, url: str):
+        """记录一次校验通过（服务端返回 304）"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE avatars SET checked_at = ? WHERE url = ?", (time.time(), url))
+
+    def prune(self) -> int:
+        """删除索引中已不再引用的图片文件，返回删除数量"""
+        with self._lock:
+            used = {row["sha256"] for row in self._conn.execute("SELECT DISTINCT sha256 FROM avatars")}
+        removed = 0
+        for prefix in os.listdir(self.root):
+            folder = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if name not in used:
+                    os.remove(os.path.join(folder, name))
+                    removed += 1
+        return removed
@@ -6,6 +6,11 @@ import os
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
 
 
+def data_file(name: str) -> str:
+    """本地数据文件（缓存、数据库等）的路径，统一放在 config.json 同目录"""
+    return os.path.join(os.path.dirname(CONFIG_FILE), name)
+
+
 def load_config() -> dict:
     """从 config.json 加载配置，文件不存在则返回空字典"""
     if os.path.exists(CONFIG_FILE):
@@ -35,3 +40,20 @@ def save_credentials(app_id: str, app_secret: str) -> None:
     cfg["app_id"] = app_id
     cfg["app_secret"] = app_secret
     save_config(cfg)
+
+
+def get_event_config() -> dict:
+    """
+    事件订阅配置（config.json 的 "event" 字段）
+
+    :return: {"mode": "" / "http" / "long", "verification_token", "encrypt_key", "host", "port"}，
+             mode 为空表示不接收事件
+    """
+    event = load_config().get("event") or {}
+    return {
+        "mode": event.get("mode", ""),
+        "verification_token": event.get("verification_token", ""),
+        "encrypt_key": event.get("encrypt_key", ""),
+        "host": event.get("host", "127.0.0.1"),
+        "port": int(event.get("port", 9000)),
+    }
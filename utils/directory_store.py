@@ -0,0 +1,305 @@
+"""通讯录本地存储：用 SQLite 保存部门、用户及部门成员关系，按应用区分数据库文件"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from utils.config_manager import data_file
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS departments (
+    department_id TEXT PRIMARY KEY,
+    parent_department_id TEXT NOT NULL DEFAULT '0',
+    name TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_departments_parent ON departments(parent_department_id);
+
+CREATE TABLE IF NOT EXISTS users (
+    open_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL DEFAULT '',
+    en_name TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL DEFAULT '',
+    mobile TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_users_mobile ON users(mobile);
+CREATE INDEX IF NOT EXISTS idx_users_name ON users(name);
+
+CREATE TABLE IF NOT EXISTS department_users (
+    department_id TEXT NOT NULL,
+    open_id TEXT NOT NULL,
+    PRIMARY KEY (department_id, open_id)
+);
+CREATE INDEX IF NOT EXISTS idx_department_users_user ON department_users(open_id);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL
+);
+"""
+
+DEPARTMENTS_KEY = "departments"
+DEPARTMENT_USERS_PREFIX = "department_users:"
+
+
+def directory_db_file(app_id: str) -> str:
+    """按 app_id 区分的通讯录数据库路径"""
+    safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", app_id) or "default"
+    return data_file(f"directory_{safe_id}.db")
+
+
+def department_users_key(department_id: str) -> str:
+    return f"{DEPARTMENT_USERS_PREFIX}{department_id}"
+
+
+class DirectoryStore:
+    """
+    通讯录本地存储（线程安全）
+
+    查询均为本地读取；各部分数据的同步时间记录在 sync_state 中，
+    由调用方（DirectoryCache）决定何时从接口刷新。
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: 数据库文件路径，传 ":memory:" 使用内存数据库
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # UI 线程与 ApiWorker 线程共用一个连接，由 _lock 串行化
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ── 同步状态 ──────────────────────────
+
+    def synced_at(self, key: str) -> float:
+        """返回某部分数据上次同步的时间戳，从未同步返回 0"""
+        with self._lock:
+            row = self._conn.execute("SELECT synced_at FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["synced_at"] if row else 0.0
+
+    def is_fresh(self, key: str, ttl: float) -> bool:
+        """数据是否在 ttl 秒内同步过"""
+        return time.time() - self.synced_at(key) < ttl
+
+    def invalidate(self, key: str | None = None):
+        """标记数据过期，key 为空时全部过期"""
+        with self._lock, self._conn:
+            if key is None:
+                self._conn.execute("DELETE FROM sync_state")
+            else:
+                self._conn.execute("DELETE FROM sync_state WHERE key = ?", (key,))
+
+    def stale_keys(self, prefix: str, ttl: float) -> list[str]:
+        """以 prefix 开头、超过 ttl 秒未同步的 key"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM sync_state WHERE key LIKE ? AND synced_at < ?",
+                (f"{prefix}%", time.time() - ttl),
+            ).fetchall()
+        return [row["key"] for row in rows]
+
+    def _mark_synced(self, key: str, now: float):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sync_state (key, synced_at) VALUES (?, ?)", (key, now)
+        )
+
+    # ── 部门 ──────────────────────────
+
+    def replace_departments(self, departments: list[dict]):
+        """用完整的部门列表替换本地部门表"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM departments")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO departments VALUES (?, ?, ?, ?, ?)",
+                [self._department_row(dept, now) for dept in departments if dept.get("department_id")],
+            )
+            self._mark_synced(DEPARTMENTS_KEY, now)
+
+    def upsert_department(self, department: dict):
+        """新增或更新单个部门（用于通讯录变更事件）"""
+        if not department.get("department_id"):
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO departments VALUES (?, ?, ?, ?, ?)",
+                self._department_row(department, time.time()),
+            )
+
+    def delete_department(self, department_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM departments WHERE department_id = ?", (department_id,))
+            self._conn.execute("DELETE FROM department_users WHERE department_id = ?", (department_id,))
+            self._conn.execute("DELETE FROM sync_state WHERE key = ?", (department_users_key(department_id),))
+
+    def department_ids_by_open_id(self, open_department_ids: list[str]) -> dict[str, str]:
+        """
+        open_department_id（od- 开头，事件中使用）到 department_id 的映射，本地没有的部门不出现在结果中
+        """
+        ids = list(dict.fromkeys(open_department_ids))
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT department_id, json_extract(data, '$.open_department_id') AS open_department_id "
+                f"FROM departments WHERE json_extract(data, '$.open_department_id') IN ({','.join('?' * len(ids))})",
+                ids,
+            ).fetchall()
+        return {row["open_department_id"]: row["department_id"] for row in rows}
+
+    def get_departments(self) -> list[dict]:
+        """返回本地所有部门"""
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM departments").fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def get_child_departments(self, parent_department_id: str) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM departments WHERE parent_department_id = ?", (parent_department_id,)
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    @staticmethod
+    def _department_row(dept: dict, now: float) -> tuple:
+        return (
+            dept["department_id"],
+            dept.get("parent_department_id") or "0",
+            dept.get("name", ""),
+            json.dumps(dept, ensure_ascii=False),
+            now,
+        )
+
+    # ── 用户 ──────────────────────────
+
+    def replace_department_users(self, department_id: str, users: list[dict]):
+        """用接口返回的完整成员列表替换某部门的成员关系，并更新用户信息"""
+        now = time.time()
+        users = [user for user in users if user.get("open_id")]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._user_row(user, now) for user in users],
+            )
+            self._conn.execute("DELETE FROM department_users WHERE department_id = ?", (department_id,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO department_users VALUES (?, ?)",
+                [(department_id, user["open_id"]) for user in users],
+            )
+            self._mark_synced(department_users_key(department_id), now)
+
+    def upsert_users(self, users: list[dict]):
+        """
+        新增或更新用户（用于通讯录变更事件或其他接口返回的用户信息）
+
+        用户带 department_ids 时同步更新其所属部门关系，部门 ID 须为 department_id（而非 open_department_id）。
+        """
+        now = time.time()
+        users = [user for user in users if user.get("open_id")]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._user_row(user, now) for user in users],
+            )
+            for user in users:
+                if "department_ids" not in user:
+                    continue
+                self._conn.execute("DELETE FROM department_users WHERE open_id = ?", (user["open_id"],))
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO department_users VALUES (?, ?)",
+                    [(dept_id, user["open_id"]) for dept_id in user["department_ids"] or []],
+                )
+
+    def delete_user(self, open_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM users WHERE open_id = ?", (open_id,))
+            self._conn.execute("DELETE FROM department_users WHERE open_id = ?", (open_id,))
+
+    def get_user_department_ids(self, open_id: str) -> list[str]:
+        """本地记录的用户所属部门"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT department_id FROM department_users WHERE open_id = ?", (open_id,)
+            ).fetchall()
+        return [row["department_id"] for row in rows]
+
+    def get_department_users(self, department_id: str) -> list[dict]:
+        """返回本地记录的部门成员"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT u.data FROM department_users du JOIN users u ON u.open_id = du.open_id "
+                "WHERE du.department_id = ? ORDER BY u.name",
+                (department_id,),
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def get_user(self, open_id: str) -> dict | None:
+        return self._fetch_one("SELECT data FROM users WHERE open_id = ?", (open_id,))
+
+    def find_user_by_email(self, email: str) -> dict | None:
+        return self._fetch_one("SELECT data FROM users WHERE email = ?", (normalize_email(email),))
+
+    def find_user_by_mobile(self, mobile: str) -> dict | None:
+        return self._fetch_one("SELECT data FROM users WHERE mobile = ?", (normalize_mobile(mobile),))
+
+    def find_users_by_name(self, name: str, limit: int = 50) -> list[dict]:
+        """按姓名前缀查找用户（走 name 索引）"""
+        escaped = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM users WHERE name LIKE ? ESCAPE '\\' ORDER BY name LIMIT ?",
+                (f"{escaped}%", limit),
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def get_all_users(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM users").fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def count_users(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def _fetch_one(self, sql: str, params: tuple) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    @staticmethod
+    def _user_row(user: dict, now: float) -> tuple:
+        return (
+            user["open_id"],
+            user.get("user_id", ""),
+            user.get("name", ""),
+            user.get("en_name", ""),
+            normalize_email(user.get("email") or user.get("enterprise_email") or ""),
+            normalize_mobile(user.get("mobile", "")),
+            json.dumps(user, ensure_ascii=False),
+            now,
+        )
+
+
+def normalize_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+def normalize_mobile(mobile: str) -> str:
+    """手机号统一去掉空格、横线和中国大陆 +86 前缀，便于比对（接口默认按大陆号码解析）"""
+    mobile = re.sub(r"[\s-]", "", mobile or "")
+    return mobile[3:] if mobile.startswith("+86") else mobile
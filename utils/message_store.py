@@ -0,0 +1,160 @@
+"""聊天记录本地存储：用 SQLite 按会话保存历史消息，按应用区分数据库文件"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from utils.config_manager import data_file
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    message_id TEXT PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    create_time INTEGER NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_chat_time ON messages(chat_id, create_time);
+
+CREATE TABLE IF NOT EXISTS chat_sync (
+    chat_id TEXT PRIMARY KEY,
+    latest_time INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+def message_db_file(app_id: str) -> str:
+    """按 app_id 区分的聊天记录数据库路径"""
+    safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", app_id) or "default"
+    return data_file(f"messages_{safe_id}.db")
+
+
+def message_time(msg: dict) -> int:
+    """消息的 create_time（毫秒），缺失或格式错误时为 0"""
+    try:
+        return int(msg.get("create_time") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class MessageStore:
+    """
+    聊天记录本地存储（线程安全）
+
+    消息以 message_id 去重；chat_sync 记录每个会话已同步到的最新消息时间，
+    由调用方（MessageArchive）据此只请求更新的消息。
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: 数据库文件路径，传 ":memory:" 使用内存数据库
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def latest_time(self, chat_id: str) -> int | None:
+        """会话已同步到的最新消息时间（毫秒），从未同步返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT latest_time FROM chat_sync WHERE chat_id = ?", (chat_id,)).fetchone()
+        return row["latest_time"] if row else None
+
+    def earliest_time(self, chat_id: str) -> int | None:
+        """本地最早一条消息的时间（毫秒），没有消息返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(create_time) AS t FROM messages WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        return row["t"]
+
+    def save_messages(self, chat_id: str, messages: list[dict], advance_sync: bool = True) -> int:
+        """
+        写入会话消息（已存在的 message_id 覆盖为新内容），并推进会话的同步时间
+
+        :param advance_sync: 是否推进同步时间；事件推送的单条消息不能保证之前的消息都已收到，应传 False
+        :return: 新增的消息数
+        """
+        now = time.time()
+        rows = [
+            (msg["message_id"], chat_id, message_time(msg), 1 if msg.get("deleted") else 0,
+             json.dumps(msg, ensure_ascii=False))
+            for msg in messages if msg.get("message_id")
+        ]
+        latest = max((row[2] for row in rows), default=0)
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?, ?)", rows)
+            added = self._conn.total_changes - before
+            self._conn.executemany(
+                "UPDATE messages SET deleted = ?, data = ? WHERE message_id = ?",
+                [(row[3], row[4], row[0]) for row in rows],
+            )
+            if not advance_sync:
+                return added
+            self._conn.execute(
+                "INSERT INTO chat_sync (chat_id, latest_time, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET latest_time = MAX(latest_time, excluded.latest_time), "
+                "synced_at = excluded.synced_at",
+                (chat_id, latest, now),
+            )
+        return added
+
+    def get_messages(self, chat_id: str, limit: int = 100, before: int | None = None) -> list[dict]:
+        """
+        读取会话最新的 limit 条消息（按时间正序返回）
+
+        :param chat_id: 会话 ID
+        :param limit: 最多条数
+        :param before: 只取早于该时间（毫秒）的消息，用于向上翻页
+        :return: 消息列表
+        """
+        sql = "SELECT data FROM messages WHERE chat_id = ?"
+        params: list = [chat_id]
+        if before is not None:
+            sql += " AND create_time < ?"
+            params.append(before)
+        sql += " ORDER BY create_time DESC, message_id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row["data"]) for row in reversed(rows)]
+
+    def count_messages(self, chat_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) AS n FROM messages WHERE chat_id = ?", (chat_id,)).fetchone()
+        return row["n"]
+
+    def mark_deleted(self, message_id: str) -> dict | None:
+        """
+        标记消息已撤回
+
+        :return: 更新后的消息，本地没有该消息时返回 None
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT data FROM messages WHERE message_id = ?", (message_id,)).fetchone()
+            if row is None:
+                return None
+            msg = json.loads(row["data"])
+            msg["deleted"] = True
+            self._conn.execute(
+                "UPDATE messages SET deleted = 1, data = ? WHERE message_id = ?",
+                (json.dumps(msg, ensure_ascii=False), message_id),
+            )
+        return msg
+
+    def clear_chat(self, chat_id: str):
+        """删除会话的本地记录，下次从头同步"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE chat_id = ?", (chat_id,))
+            self._conn.execute("DELETE FROM chat_sync WHERE chat_id = ?", (chat_id,))
@@ -0,0 +1,177 @@
+"""发件箱本地存储：用 SQLite 保存待发送的消息及其发送状态，进程重启后继续发送"""
+
+import re
+import sqlite3
+import threading
+import time
+
+from utils.config_manager import data_file
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    uuid TEXT PRIMARY KEY,
+    receive_id TEXT NOT NULL,
+    receive_id_type TEXT NOT NULL,
+    msg_type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT NOT NULL DEFAULT '',
+    message_id TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+"""
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+def outbox_db_file(app_id: str) -> str:
+    """按 app_id 区分的发件箱数据库路径"""
+    safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", app_id) or "default"
+    return data_file(f"outbox_{safe_id}.db")
+
+
+class OutboxStore:
+    """
+    发件箱存储（线程安全）
+
+    每条消息以去重键 uuid 为主键，重复入队同一 uuid 会被忽略。
+    状态流转：pending -> sending -> sent / failed，发送失败可重试时回到 pending 并设置下次尝试时间。
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: 数据库文件路径，传 ":memory:" 使用内存数据库
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def enqueue(self, uuid: str, receive_id: str, receive_id_type: str, msg_type: str, content: str) -> bool:
+        """
+        加入一条待发送消息
+
+        :return: 是否新加入（uuid 已存在时返回 False）
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (uuid, receive_id, receive_id_type, msg_type, content, status,"
+                " next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (uuid, receive_id, receive_id_type, msg_type, content, STATUS_PENDING, now, now, now),
+            )
+        return cursor.rowcount == 1
+
+    def claim(self, limit: int) -> list[dict]:
+        """取出最多 limit 条到期的待发送消息并标记为 sending"""
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT * FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (STATUS_PENDING, now, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, updated_at = ? WHERE uuid = ?",
+                [(STATUS_SENDING, now, row["uuid"]) for row in rows],
+            )
+        return [{**dict(row), "attempts": row["attempts"] + 1} for row in rows]
+
+    def mark_sent(self, uuid: str, message_id: str):
+        self._update(uuid, status=STATUS_SENT, message_id=message_id, last_error="")
+
+    def mark_retry(self, uuid: str, error: str, next_attempt_at: float):
+        self._update(uuid, status=STATUS_PENDING, last_error=error, next_attempt_at=next_attempt_at)
+
+    def mark_failed(self, uuid: str, error: str):
+        self._update(uuid, status=STATUS_FAILED, last_error=error)
+
+    def _update(self, uuid: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE outbox SET {columns} WHERE uuid = ?", (*fields.values(), uuid))
+
+    def requeue_sending(self, max_age: float | None = None) -> int:
+        """
+        把上次进程退出时仍在发送中的消息放回待发送（带同一 uuid 重发，服务端会去重）
+
+        :param max_age: 加入时间超过该秒数的消息已不在服务端去重有效期内，重发可能重复送达，
+                        改为标记失败（投递状态未知）；None 为全部放回
+        :return: 放回的条数
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            if max_age is not None:
+                self._conn.execute(
+                    "UPDATE outbox SET status = ?, last_error = ?, updated_at = ? WHERE status = ? AND created_at < ?",
+                    (STATUS_FAILED, "进程中断时正在发送，投递状态未知，已超过去重有效期，不再自动重发",
+                     now, STATUS_SENDING, now - max_age),
+                )
+            cursor = self._conn.execute(
+                "UPDATE outbox SET status = ?, next_attempt_at = ? WHERE status = ?",
+                (STATUS_PENDING, now, STATUS_SENDING),
+            )
+        return cursor.rowcount
+
+    def retry_failed(self) -> int:
+        """把发送失败的消息重新放回待发送，返回条数"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ? WHERE status = ?",
+                (STATUS_PENDING, time.time(), STATUS_FAILED),
+            )
+        return cursor.rowcount
+
+    def get(self, uuid: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM outbox WHERE uuid = ?", (uuid,)).fetchone()
+        return dict(row) if row else None
+
+    def list_messages(self, status: str | None = None, limit: int = 1000) -> list[dict]:
+        """按加入顺序列出消息，status 为空时列出全部"""
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute("SELECT * FROM outbox ORDER BY created_at LIMIT ?", (limit,)).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT * FROM outbox WHERE status = ? ORDER BY created_at LIMIT ?", (status, limit)
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self) -> dict[str, int]:
+        """各状态的消息数"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        counts = {STATUS_PENDING: 0, STATUS_SENDING: 0, STATUS_SENT: 0, STATUS_FAILED: 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def next_due(self) -> float | None:
+        """最早一条待发送消息的计划时间，没有待发送消息时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) AS t FROM outbox WHERE status = ?", (STATUS_PENDING,)
+            ).fetchone()
+        return row["t"]
+
+    def purge_sent(self, older_than: float) -> int:
+        """删除 older_than 秒之前已发送成功的记录，返回删除条数"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM outbox WHERE status = ? AND updated_at < ?", (STATUS_SENT, time.time() - older_than)
+            )
+        return cursor.rowcount
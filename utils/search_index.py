@@ -0,0 +1,284 @@
+"""用户搜索索引：内存中的前缀 + 拼音 + n-gram 索引，支持边输入边搜索"""
+
+import re
+import threading
+from bisect import bisect_left, insort
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # pypinyin 为可选依赖，未安装时不支持拼音搜索
+    lazy_pinyin = None
+
+from utils.directory_store import normalize_email, normalize_mobile
+
+# 各字段前缀命中的基础分，完全相等额外加 EXACT_BONUS
+SCORE_NAME = 100
+SCORE_EN_NAME = 80
+SCORE_PINYIN = 70
+SCORE_INITIALS = 60
+SCORE_EMAIL = 50
+SCORE_MOBILE = 50
+SCORE_SUBSTRING = 30  # 姓名或英文名中间包含（n-gram 命中）
+EXACT_BONUS = 20
+_CANDIDATE_FACTOR = 5  # 候选数达到 limit 的这个倍数后停止扫描，短查询也能即时返回
+
+_WORD_SPLIT = re.compile(r"[\s._\-@]+")
+
+
+def pinyin_keys(name: str) -> tuple[list[str], str]:
+    """
+    姓名的拼音检索词
+
+    :return: (从每个音节开始的全拼后缀列表, 首字母缩写)，未安装 pypinyin 时为 ([], "")
+    """
+    if lazy_pinyin is None or not name:
+        return [], ""
+    syllables = [s.lower() for s in lazy_pinyin(name) if s.strip()]
+    if not syllables or "".join(syllables) == name.lower():
+        return [], ""  # 纯英文姓名无需拼音
+    suffixes = ["".join(syllables[i:]) for i in range(len(syllables))]
+    return suffixes, "".join(s[0] for s in syllables)
+
+
+class UserSearchIndex:
+    """
+    用户搜索索引（线程安全）
+
+    - 前缀索引：姓名、英文名（及其中每个单词）、拼音、拼音首字母、邮箱、手机号，
+      检索词排序后用二分查找定位前缀区间
+    - n-gram 索引：姓名与英文名的单字与双字，用于匹配中间的片段（如 "小明" 命中 "王小明"）。
+      邮箱和手机号只做前缀匹配：数字双字只有 100 种，每种几乎覆盖一半用户，
+      建 n-gram 既筛不掉候选又会让索引内存增加数倍
+
+    结果按命中字段的分数排序，分数相同时姓名短的在前。
+
+    build() 在锁外构建新索引后整体替换，期间的增删在替换后重放，构建不阻塞搜索。
+    add_users() 新出现的检索词二分插入一个较小的有序增量表，攒够 MERGE_THRESHOLD 个再并入主表，
+    不需要每次重排全部检索词；已索引的用户原位更新，内容未变时直接跳过。
+    """
+
+    MERGE_THRESHOLD = 65536  # 增量检索词达到该数量后并入主表（约 1 万个资料有变化的用户）
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users: list[dict | None] = []  # doc_id -> 用户，删除后置为 None，位置可复用
+        self._free: list[int] = []  # 可复用的 doc_id
+        self._doc_ids: dict[str, int] = {}  # open_id -> doc_id
+        self._postings: dict[str, dict[int, int]] = {}  # 检索词 -> {doc_id: 分数}
+        self._grams: dict[str, set[int]] = {}  # 单字/双字 -> doc_id 集合
+        self._terms: list[str] = []  # 排序后的检索词（可能含已无用户的词，查询时跳过）
+        self._new_terms: list[str] = []  # 主表之外新增的检索词，保持有序
+        self._replay: list[tuple[str, object]] | None = None  # build() 期间的增删，替换后重放
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def build(self, users: list[dict]):
+        """清空并用 users 重建索引（在调用线程中构建，只在最后替换时持锁）"""
+        with self._lock:
+            self._replay = []
+        fresh = UserSearchIndex()
+        for user in users:
+            fresh._add(user, track_terms=False)
+        fresh._terms = sorted(fresh._postings)
+        with self._lock:
+            replay, self._replay = self._replay or [], None
+            self._users, self._free, self._doc_ids = fresh._users, fresh._free, fresh._doc_ids
+            self._postings, self._grams = fresh._postings, fresh._grams
+            self._terms, self._new_terms = fresh._terms, []
+            for op, arg in replay:
+                if op == "add":
+                    self._add(arg)
+                else:
+                    self._remove(arg)
+            self._merge_new_terms()
+
+    def add_users(self, users: list[dict]):
+        """新增或更新用户（按 open_id 替换）"""
+        with self._lock:
+            for user in users:
+                self._add(user)
+                if self._replay is not None:
+                    self._replay.append(("add", user))
+            self._merge_new_terms()
+
+    def remove_user(self, open_id: str):
+        with self._lock:
+            self._remove(open_id)
+            if self._replay is not None:
+                self._replay.append(("remove", open_id))
+
+    def _add(self, user: dict, track_terms: bool = True):
+        """track_terms 为 False 时不维护有序检索词（整体构建后统一排序）"""
+        open_id = user.get("open_id")
+        if not open_id:
+            return
+        doc_id = self._doc_ids.get(open_id)
+        if doc_id is not None:
+            old = self._users[doc_id]
+            if old == user:
+                return
+            self._unindex(doc_id, old)  # 原位更新，沿用 doc_id
+        elif self._free:
+            doc_id = self._free.pop()
+        else:
+            doc_id = len(self._users)
+            self._users.append(None)
+        self._users[doc_id] = user
+        self._doc_ids[open_id] = doc_id
+
+        terms, grams = _user_terms(user)
+        for term, score in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if track_terms:
+                    self._add_term(term)
+            postings[doc_id] = score
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(doc_id)
+
+    def _remove(self, open_id: str):
+        doc_id = self._doc_ids.pop(open_id, None)
+        if doc_id is None:
+            return
+        self._unindex(doc_id, self._users[doc_id])
+        self._users[doc_id] = None
+        self._free.append(doc_id)
+
+    def _unindex(self, doc_id: int, user: dict):
+        """删除用户的倒排项（由用户内容重新计算出检索词，不额外保存）"""
+        terms, grams = _user_terms(user)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]  # 有序表中的词留到下次合并时清理
+        for gram in grams:
+            docs = self._grams.get(gram)
+            if docs is not None:
+                docs.discard(doc_id)
+                if not docs:
+                    del self._grams[gram]
+
+    def _add_term(self, term: str):
+        """新检索词：主表中还有（用户曾被删除）时无需再加"""
+        for terms in (self._terms, self._new_terms):
+            i = bisect_left(terms, term)
+            if i < len(terms) and terms[i] == term:
+                return
+        insort(self._new_terms, term)
+
+    def _merge_new_terms(self):
+        # 两段有序表拼接后排序接近线性；已无用户的检索词留到下次 build() 时清理
+        if len(self._new_terms) >= self.MERGE_THRESHOLD:
+            self._terms = sorted(self._terms + self._new_terms)
+            self._new_terms = []
+
+    def search(self, query: str, limit: int = 50) -> list[dict]:
+        """
+        搜索用户
+
+        :param query: 姓名/英文名/拼音/首字母/邮箱/手机号的开头，或姓名/英文名中的任意片段
+        :param limit: 最多返回条数
+        :return: 按相关度排序的用户列表
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        if query[0] == "+" or query[:1].isdigit():
+            query = normalize_mobile(query)
+
+        with self._lock:
+            scores: dict[int, int] = {}
+            self._match_prefix(self._new_terms, query, scores, limit)
+            self._match_prefix(self._terms, query, scores, limit)
+            if len(scores) < limit:
+                self._match_substring(query, scores, limit)
+
+            ranked = sorted(
+                (doc_id for doc_id in scores if self._users[doc_id] is not None),
+                key=lambda doc_id: (-scores[doc_id], len(self._users[doc_id].get("name", "")), doc_id),
+            )
+            return [self._users[doc_id] for doc_id in ranked[:limit]]
+
+    def _match_prefix(self, terms: list[str], query: str, scores: dict[int, int], limit: int):
+        # 前缀区间内检索词按字典序排列，完全相等的检索词排在最前
+        cap = limit * _CANDIDATE_FACTOR
+        for i in range(bisect_left(terms, query), len(terms)):
+            if len(scores) >= cap:
+                break
+            term = terms[i]
+            if not term.startswith(query):
+                break
+            postings = self._postings.get(term)
+            if postings is None:
+                continue  # 已无用户的检索词
+            bonus = EXACT_BONUS if term == query else 0
+            for doc_id, score in postings.items():
+                if scores.get(doc_id, 0) < score + bonus:
+                    scores[doc_id] = score + bonus
+
+    def _match_substring(self, query: str, scores: dict[int, int], limit: int):
+        if len(query) == 1:
+            candidates = self._grams.get(query, set())
+        else:
+            grams = [self._grams.get(query[i:i + 2]) for i in range(len(query) - 1)]
+            if not all(grams):
+                return
+            candidates = set.intersection(*sorted(grams, key=len))
+        cap = limit * _CANDIDATE_FACTOR
+        for doc_id in candidates:
+            if doc_id in scores:
+                continue
+            user = self._users[doc_id]
+            if user is not None and any(query in field for field in _substring_fields(user)):
+                scores[doc_id] = SCORE_SUBSTRING
+                if len(scores) >= cap:
+                    break
+
+
+def _substring_fields(user: dict) -> tuple[str, str]:
+    """参与片段匹配的字段：姓名、英文名"""
+    return (user.get("name") or "").strip().lower(), (user.get("en_name") or "").strip().lower()
+
+
+def _user_terms(user: dict) -> tuple[dict[str, int], set[str]]:
+    """
+    用户的检索词与 n-gram
+
+    :return: ({检索词: 分数}, {单字/双字})
+    """
+    terms: dict[str, int] = {}
+
+    def post(term: str, score: int):
+        if term and terms.get(term, 0) < score:
+            terms[term] = score
+
+    name, en_name = fields = _substring_fields(user)
+    if name:
+        post(name, SCORE_NAME)
+        for word in _WORD_SPLIT.split(name)[1:]:
+            post(word, SCORE_NAME - 10)
+        suffixes, initials = pinyin_keys(name)
+        for i, key in enumerate(suffixes):
+            post(key, SCORE_PINYIN if i == 0 else SCORE_PINYIN - 10)
+        if len(initials) > 1:
+            post(initials, SCORE_INITIALS)
+    if en_name:
+        post(en_name, SCORE_EN_NAME)
+        for word in _WORD_SPLIT.split(en_name)[1:]:
+            post(word, SCORE_EN_NAME - 10)
+    email = normalize_email(user.get("email") or user.get("enterprise_email") or "")
+    if email:
+        post(email, SCORE_EMAIL)
+    mobile = normalize_mobile(user.get("mobile") or "")
+    if mobile:
+        post(mobile, SCORE_MOBILE)
+
+    # 英文名不建单字索引：单个字母几乎命中所有人，只占内存
+    grams = set(name)
+    for text in fields:
+        grams.update([text[i:i + 2] for i in range(len(text) - 1)])
+    return terms, grams
@@ -0,0 +1,124 @@
+"""
+Token 缓存模块：将 tenant_access_token 保存到 config.json 同目录，冷启动时复用
+
+条目用 AES-GCM（cryptography）加密，密钥由 app_secret 派生。app_secret 本身以明文保存在同目录的
+config.json 中，因此加密只在缓存文件被单独拷走时起作用，主要的保护仍是文件权限（0600）。
+未安装 cryptography 时不读写缓存，每次启动重新获取 token。
+"""
+
+import base64
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # cryptography 为可选依赖，未安装时不缓存 token
+    AESGCM = None
+
+from utils.config_manager import data_file
+
+TOKEN_CACHE_FILE = data_file("token_cache.json")
+
+_lock = threading.Lock()
+
+
+def token_cache_available() -> bool:
+    """是否可以使用 token 缓存（需要安装 cryptography）"""
+    return AESGCM is not None
+
+
+def _derive_key(app_id: str, app_secret: str, salt: bytes) -> bytes:
+    """由 app_secret 派生 256 位密钥，凭证更换后旧缓存自然失效"""
+    return hashlib.pbkdf2_hmac("sha256", app_secret.encode(), salt + app_id.encode(), 10000)
+
+
+def _encrypt(plain: bytes, app_id: str, app_secret: str) -> dict:
+    salt = secrets.token_bytes(16)
+    nonce = secrets.token_bytes(12)
+    cipher = AESGCM(_derive_key(app_id, app_secret, salt)).encrypt(nonce, plain, app_id.encode())
+    return {
+        "salt": base64.b64encode(salt).decode(),
+        "nonce": base64.b64encode(nonce).decode(),
+        "data": base64.b64encode(cipher).decode(),
+    }
+
+
+def _decrypt(entry: dict, app_id: str, app_secret: str) -> bytes | None:
+    """解密并校验，密钥不对、内容被篡改或旧格式的条目返回 None"""
+    try:
+        salt = base64.b64decode(entry["salt"])
+        nonce = base64.b64decode(entry["nonce"])
+        cipher = base64.b64decode(entry["data"])
+        return AESGCM(_derive_key(app_id, app_secret, salt)).decrypt(nonce, cipher, app_id.encode())
+    except (KeyError, TypeError, ValueError, InvalidTag):
+        return None
+
+
+def _read_all() -> dict:
+    if os.path.exists(TOKEN_CACHE_FILE):
+        try:
+            with open(TOKEN_CACHE_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, IOError):
+            return {}
+    return {}
+
+
+def _write_all(entries: dict) -> None:
+    # 先写临时文件再替换，避免多个进程同时写入时文件损坏
+    tmp_path = f"{TOKEN_CACHE_FILE}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+    os.replace(tmp_path, TOKEN_CACHE_FILE)
+
+
+def load_token(app_id: str, app_secret: str) -> tuple[str | None, float]:
+    """
+    读取缓存的 token
+
+    :return: (token, 过期时间戳)，无可用缓存时返回 (None, 0)
+    """
+    if AESGCM is None:
+        return None, 0
+    entry = _read_all().get(app_id)
+    if not entry:
+        return None, 0
+
+    plain = _decrypt(entry, app_id, app_secret)
+    if plain is None:
+        return None, 0
+    try:
+        data = json.loads(plain)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None, 0
+
+    token, expire = data.get("token"), float(data.get("expire", 0))
+    if not token or expire <= time.time():
+        return None, 0
+    return token, expire
+
+
+def save_token(app_id: str, app_secret: str, token: str, expire: float) -> None:
+    """加密保存 token，按 app_id 区分；未安装 cryptography 时不保存"""
+    if AESGCM is None:
+        return
+    plain = json.dumps({"token": token, "expire": expire}).encode()
+    with _lock:
+        entries = _read_all()
+        entries[app_id] = _encrypt(plain, app_id, app_secret)
+        _write_all(entries)
+
+
+def clear_token(app_id: str) -> None:
+    """删除指定应用的 token 缓存"""
+    with _lock:
+        entries = _read_all()
+        if entries.pop(app_id, None) is not None:
+            _write_all(entries)